@@ -8,9 +8,17 @@ from classes.pressuresensor_WIKA   		import pressuresensor_WIKA
 from classes.pressuresensor_OMEGA   		import pressuresensor_OMEGA
 from classes.temperaturesensor_MAXIM   		import temperaturesensor_MAXIM
 from classes.datafile			   	import datafile
+from classes.datafile_reader		   	import datafile_reader
+from classes.digester			   	import digester
+from classes.calibrator			   	import calibrator
+from classes.asyncdevice			   	import asyncdevice
+from classes.sensorsampler			   	import sensorsampler
+from classes.sequencer			   	import sequencer
 from classes.misc			       	import misc
+from classes.ringbuffer			       	import ringbuffer
+from classes.plotservice			       	import plotservice
 
-CLASSES = [ rgams_SRS , selectorvalve_VICI , pressuresensor_WIKA , pressuresensor_OMEGA , temperaturesensor_MAXIM , datafile , misc ]
+CLASSES = [ rgams_SRS , selectorvalve_VICI , pressuresensor_WIKA , pressuresensor_OMEGA , temperaturesensor_MAXIM , datafile , datafile_reader , digester , calibrator , asyncdevice , sensorsampler , sequencer , misc , ringbuffer , plotservice ]
 
 outfile = open('python_API.tex', 'w')
 
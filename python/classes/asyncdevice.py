@@ -0,0 +1,291 @@
+# Code for the asyncdevice class
+# 
+# DISCLAIMER:
+# This file is part of ruediPy, a toolbox for operation of RUEDI mass spectrometer systems.
+# 
+# ruediPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# ruediPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with ruediPy.  If not, see <http://www.gnu.org/licenses/>.
+# 
+# ruediPy: toolbox for operation of RUEDI mass spectrometer systems
+# Copyright (C) 2016  Matthias Brennwald
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2016, 2017, Matthias Brennwald (brennmat@gmail.com)
+
+
+import sys
+import warnings
+import asyncio
+import concurrent.futures
+import functools
+
+from classes.misc	import misc
+
+# check Python version and print warning if we're running version < 3:
+if ( sys.version_info[0] < 3 ):
+	warnings.warn("ruediPy / asyncdevice class is running on Python version < 3. Version 3.0 or newer is recommended!")
+
+
+class asyncdevice:
+	"""
+	ruediPy class for using ruediPy instruments (rgams_SRS, selectorvalve_VICI, pressuresensor_WIKA, pressuresensor_OMEGA, temperaturesensor_MAXIM) with asyncio, so that several instruments can be operated at the same time from one event loop (e.g. read the pressure and temperature sensors while the RGA is reading a PEAK value).
+	
+	Each asyncdevice object has its own worker thread that talks to the instrument: the commands sent to one instrument are executed one after the other (as with the instrument object itself), while the commands sent to different instruments are executed concurrently. The event loop is not blocked while waiting for the instruments.
+	
+	The worker threads may write to the same datafile object (data lines and flushes from several threads are written one at a time, also with asynchronous writing, see datafile.set_async_write). Starting a new data file (datafile.next) waits for the lines given before, so no line goes to a half-closed file. Plotting should be done from the main thread (e.g. MS.device().plot_peakbuffer()) or by a plotservice (see plotservice class).
+	
+	EXAMPLE:
+	MS = asyncdevice( rgams_SRS( ... ) )
+	P  = asyncdevice( pressuresensor_WIKA( ... ) )
+	T  = asyncdevice( temperaturesensor_MAXIM( ... ) )
+	
+	async def cycle(f):
+		await asyncio.gather( MS.peak(28,1,f) , P.pressure(f) , T.temperature(f) )
+	
+	asyncio.run( cycle(DATAFILE) )
+	"""
+	
+	########################################################################################################
+	
+
+	def __init__(self,device):
+		"""
+		obj = asyncdevice.__init__(device)
+		
+		Initialize ASYNCDEVICE object
+		
+		INPUT:
+		device: ruediPy instrument object (e.g. rgams_SRS object)
+		
+		OUTPUT:
+		obj: asyncdevice object
+		"""
+
+		self._device = device
+		self._executor = concurrent.futures.ThreadPoolExecutor( max_workers = 1 , thread_name_prefix = 'asyncdevice-' + str(self.label()) )
+
+	
+	########################################################################################################
+	
+
+	def label(self):
+		"""
+		lab = asyncdevice.label()
+		
+		Return label / name of the instrument
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		lab: label / name (string)
+		"""
+		
+		return self._device.label()
+
+	
+	########################################################################################################
+	
+
+	def warning(self,msg):
+		"""
+		asyncdevice.warning(msg)
+		
+		Warn about issues related to ASYNCDEVICE object
+		
+		INPUT:
+		msg: warning message (string)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		misc.warnmessage ('ASYNCDEVICE ' + str(self.label()),msg)
+
+	
+	########################################################################################################
+	
+
+	def device(self):
+		"""
+		dev = asyncdevice.device()
+		
+		Return the instrument object (e.g. for plotting or for blocking calls from the main thread)
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		dev: instrument object
+		"""
+		
+		return self._device
+
+	
+	########################################################################################################
+	
+
+	async def call(self,method,*args,**kwargs):
+		"""
+		ans = await asyncdevice.call(method,*args,**kwargs)
+		
+		Call a method of the instrument in the worker thread of the instrument, and wait for the result without blocking the event loop.
+		
+		INPUT:
+		method: name of the method (string, e.g. 'peak')
+		*args,**kwargs: arguments of the method
+		
+		OUTPUT:
+		ans: return value of the method
+		"""
+		
+		loop = asyncio.get_running_loop()
+		return await loop.run_in_executor( self._executor , functools.partial( getattr(self._device,method) , *args , **kwargs ) )
+
+	
+	########################################################################################################
+	
+
+	async def peak(self,mz,gate,f,add_to_peakbuffer=True):
+		"""
+		val,unit = await asyncdevice.peak(mz,gate,f,add_to_peakbuffer=True)
+		
+		Async version of rgams_SRS.peak
+		"""
+		
+		return await self.call('peak',mz,gate,f,add_to_peakbuffer)
+
+	
+	########################################################################################################
+	
+
+	async def peaks(self,mz,gate,f,add_to_peakbuffer=True):
+		"""
+		val,unit,t = await asyncdevice.peaks(mz,gate,f,add_to_peakbuffer=True)
+		
+		Async version of rgams_SRS.peaks
+		"""
+		
+		return await self.call('peaks',mz,gate,f,add_to_peakbuffer)
+
+	
+	########################################################################################################
+	
+
+	async def zero(self,mz,mz_offset,gate,f):
+		"""
+		val,unit = await asyncdevice.zero(mz,mz_offset,gate,f)
+		
+		Async version of rgams_SRS.zero
+		"""
+		
+		return await self.call('zero',mz,mz_offset,gate,f)
+
+	
+	########################################################################################################
+	
+
+	async def scan(self,low,high,step,gate,f):
+		"""
+		M,Y,unit = await asyncdevice.scan(low,high,step,gate,f)
+		
+		Async version of rgams_SRS.scan
+		"""
+		
+		return await self.call('scan',low,high,step,gate,f)
+
+	
+	########################################################################################################
+	
+
+	async def pressure(self,f,add_to_pressbuffer=True):
+		"""
+		press,unit = await asyncdevice.pressure(f,add_to_pressbuffer=True)
+		
+		Async version of pressuresensor_WIKA.pressure / pressuresensor_OMEGA.pressure
+		"""
+		
+		return await self.call('pressure',f,add_to_pressbuffer)
+
+	
+	########################################################################################################
+	
+
+	async def temperature(self,f,add_to_tempbuffer=True):
+		"""
+		temp,unit = await asyncdevice.temperature(f,add_to_tempbuffer=True)
+		
+		Async version of temperaturesensor_MAXIM.temperature
+		"""
+		
+		return await self.call('temperature',f,add_to_tempbuffer)
+
+	
+	########################################################################################################
+	
+
+	async def setpos(self,val,f):
+		"""
+		await asyncdevice.setpos(val,f)
+		
+		Async version of selectorvalve_VICI.setpos
+		"""
+		
+		return await self.call('setpos',val,f)
+
+	
+	########################################################################################################
+	
+
+	async def getpos(self):
+		"""
+		pos = await asyncdevice.getpos()
+		
+		Async version of selectorvalve_VICI.getpos
+		"""
+		
+		return await self.call('getpos')
+
+	
+	########################################################################################################
+	
+
+	def close(self):
+		"""
+		asyncdevice.close()
+		
+		Stop the worker thread (after the pending commands are done). The instrument object is not closed.
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		self._executor.shutdown(wait=True)
+
+
+	########################################################################################################
@@ -0,0 +1,581 @@
+# Code for the calibrator class
+# 
+# DISCLAIMER:
+# This file is part of ruediPy, a toolbox for operation of RUEDI mass spectrometer systems.
+# 
+# ruediPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# ruediPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with ruediPy.  If not, see <http://www.gnu.org/licenses/>.
+# 
+# ruediPy: toolbox for operation of RUEDI mass spectrometer systems
+# Copyright (C) 2016  Matthias Brennwald
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2016, 2017, Matthias Brennwald (brennmat@gmail.com)
+
+
+import sys
+import warnings
+import os
+import re
+import time
+import numpy
+
+from classes.misc		import misc
+from classes.datafile_reader	import datafile_reader
+
+# check Python version and print warning if we're running version < 3:
+if ( sys.version_info[0] < 3 ):
+	warnings.warn("ruediPy / calibrator class is running on Python version < 3. Version 3.0 or newer is recommended!")
+
+
+# analysis types used in the data files (see datafile.next):
+_ANALYSISTYPES = { 'SAMPLE': 'SAMPLE' , 'S': 'SAMPLE' , 'STANDARD': 'STANDARD' , 'STD': 'STANDARD' , 'BLANK': 'BLANK' , 'B': 'BLANK' , 'MISC': 'MISC' }
+
+# standard gas information (see datafile.write_standard_conc):
+_STANDARD = re.compile( r'species=(.*\S) ; concentration=(\S+) vol/vol ; mz=(\S+)' )
+
+
+class calibrator:
+	"""
+	ruediPy class for calibrating a batch of analysis steps (Python version of octave/rP_calibrate_batch.m). The PEAK and ZERO data of all steps (one data file per step) are digested at once (see calibrator.digest), the mean BLANK is subtracted from the STANDARDs and SAMPLEs, and the SAMPLE peak heights are converted to partial pressures using the sensitivities of the STANDARDs (interpolated to the SAMPLE times). The data of all steps are kept in matrices (one row for each step, one column for each mz / detector combination), so that each calculation is done for all steps at once. Note that the partial pressures are NOT normalised to the total gas pressure.
+	
+	EXAMPLE:
+	C = calibrator( '~/ruedi_data/*.txt' , standardgas_pressure = 970 , standardgas_pressure_unit = 'hPa' )
+	C.write_csv('~/ruedi_data/results.csv')
+	P_val,P_err,TIME = C.partial_pressures()
+	"""
+	
+	########################################################################################################
+	
+
+	def __init__(self,data,MS_names=[],SENSOR_names=[],standardgas_pressure=None,standardgas_pressure_unit='?',processes=None):
+		"""
+		obj = calibrator.__init__(data,MS_names=[],SENSOR_names=[],standardgas_pressure=None,standardgas_pressure_unit='?',processes=None)
+		
+		Initialize CALIBRATOR object, read the data files and calibrate the data.
+		
+		INPUT:
+		data: data files to be processed (file name pattern with wildcards, or list of file names, see datafile_reader), or datafile_reader object with the data
+		MS_names (optional): names / labels of the mass spectrometers for which data should be processed (list of strings, e.g. ['MS'] or ['RGA_SRS[MS]']). If MS_names = [], the data of all RGA_SRS objects are used. Default: MS_names = []
+		SENSOR_names (optional): names / labels of the sensors (pressure, temperature) for which data should be processed (list of strings). If SENSOR_names = [], the data of all sensors are used. Default: SENSOR_names = []
+		standardgas_pressure (optional): gas inlet pressure of all STANDARD analyses (float). Default: standardgas_pressure = None (unknown pressure)
+		standardgas_pressure_unit (optional): unit of standardgas_pressure (string). This is also the unit of the partial pressures. Default: standardgas_pressure_unit = '?'
+		processes (optional): number of processes used to read the data files (see datafile_reader). Default: processes = None
+		
+		OUTPUT:
+		obj: calibrator object
+		"""
+
+		if isinstance(data,datafile_reader):
+			R = data
+		else:
+			R = datafile_reader( data , processes = processes , select = [ (None,typ) for typ in ('ANALYSISTYPE','SAMPLENAME','STANDARD','PEAK','ZERO','PRESSURE','TEMPERATURE') ] )
+		self._files = R.files()
+		
+		if standardgas_pressure is None:
+			standardgas_pressure = numpy.nan
+		self._unit = standardgas_pressure_unit
+		
+		# analysis type, name and standard gas information of each step:
+		N = len(self._files)
+		self._type = numpy.array( [ 'UNKNOWN' ] * N , dtype='U8' )
+		self._time = numpy.full( N , numpy.nan )
+		self._name = [ '' ] * N
+		standard = [ [] for i in range(N) ]
+		for source,typ in R.keys():
+			X = R.table(source,typ)
+			if typ == 'ANALYSISTYPE':
+				for x in X:
+					self._type[x['file']] = _ANALYSISTYPES.get( x['data'].strip().upper() , 'UNKNOWN' )
+					self._time[x['file']] = x['t']
+			elif typ == 'SAMPLENAME':
+				for x in X:
+					self._name[x['file']] = x['data'].strip()
+			elif typ == 'STANDARD':
+				for x in X:
+					u = _STANDARD.match(x['data'])
+					if u is None:
+						self.warning ('could not parse STANDARD information in file ' + self._files[x['file']] + ' (' + x['data'] + ').')
+					else:
+						standard[x['file']].append( ( u.group(1) , float(u.group(2)) , float(u.group(3)) ) )
+		for i in range(N):
+			if not self._type[i] == 'SAMPLE':
+				self._name[i] = time.strftime( '%Y-%m-%d_%H:%M:%S' , time.gmtime(self._time[i]) ) if not numpy.isnan(self._time[i]) else 'UNKNOWN'
+			elif self._name[i] == '':
+				self._name[i] = 'UNKNOWN SAMPLE'
+		
+		# digest PEAK and ZERO data of all steps:
+		sources = [ k[0] for k in R.keys() if k[1] == 'PEAK' and calibrator._match(k[0],MS_names) ]
+		if len(sources) == 0:
+			raise ValueError( 'Found no mass spectrometer data. Aborting...' )
+		D = [ calibrator.digest( R.table(s,'PEAK') , R.table(s,'ZERO') if (s,'ZERO') in R.keys() else None ) for s in sources ]
+		
+		# only use steps with data from exactly one mass spectrometer:
+		n = numpy.zeros( N , dtype=int )
+		for d in D:
+			n[numpy.unique(d['file'])] += 1
+		if numpy.any( n > 1 ):
+			self.warning ('there are data from different mass spectrometers in ' + str(numpy.count_nonzero(n>1)) + ' file(s). Skipping these files...')
+		if numpy.any( n == 0 ):
+			self.warning ('found no mass spectrometer data in ' + str(numpy.count_nonzero(n==0)) + ' file(s). Skipping these files...')
+		u = numpy.flatnonzero( ( n == 1 ) & ~numpy.isin( self._type , ('SAMPLE','STANDARD','BLANK') ) )
+		if len(u) > 0:
+			self.warning ('unknown analysis type in ' + str(len(u)) + ' file(s) (e.g. ' + self._files[u[0]] + '). Ignoring these steps...')
+		D = numpy.concatenate( D )
+		D = D[ n[D['file']] == 1 ]
+		
+		# mz / detector combinations (matrix columns):
+		mz_det = numpy.array( [ '%i_%s' % (m,d) for m,d in zip(D['mz'],D['det']) ] )
+		self._mz_det,col = numpy.unique( mz_det , return_inverse = True )
+		M = len(self._mz_det)
+		self._mz = numpy.array( [ float(u.split('_')[0]) for u in self._mz_det ] )
+		
+		# step x mz_det matrices with digested data (mean, error of the mean, and time):
+		v = numpy.full( (N,M) , numpy.nan ); v[D['file'],col] = D['mean']
+		e = numpy.full( (N,M) , numpy.nan ); e[D['file'],col] = D['mean_err']
+		t = numpy.full( (N,M) , numpy.nan ); t[D['file'],col] = D['time']
+		
+		iSTANDARD = numpy.flatnonzero( ( n == 1 ) & ( self._type == 'STANDARD' ) )
+		iBLANK    = numpy.flatnonzero( ( n == 1 ) & ( self._type == 'BLANK' ) )
+		iSAMPLE   = numpy.flatnonzero( ( n == 1 ) & ( self._type == 'SAMPLE' ) )
+		if len(iSTANDARD) == 0:
+			raise ValueError( 'There are no STANDARDs! Aborting...' )
+		if len(iBLANK) == 0:
+			raise ValueError( 'There are no BLANKs! Aborting...' )
+		for i,j in zip( *numpy.nonzero( numpy.isnan( v[numpy.concatenate((iSTANDARD,iBLANK,iSAMPLE))] ) ) ):
+			self.warning ('there are no data for ' + self._mz_det[j] + ' in file ' + self._files[numpy.concatenate((iSTANDARD,iBLANK,iSAMPLE))[i]] + '!')
+
+		# mean BLANK and its uncertainty:
+		nb = len(iBLANK)
+		Bmean = numpy.mean( v[iBLANK] , axis=0 )
+		if nb > 1:
+			Berr = numpy.std( v[iBLANK] , axis=0 , ddof=1 ) / numpy.sqrt(nb-1)
+		else:
+			self.warning ('not enough BLANKs to determine uncertainty of BLANKs.')
+			Berr = numpy.full( M , numpy.nan )
+		
+		# blank-corrected STANDARDs and SAMPLEs:
+		V_standard = v[iSTANDARD] - Bmean
+		E_standard = numpy.sqrt( e[iSTANDARD]**2 + Berr**2 )
+		V_sample   = v[iSAMPLE] - Bmean
+		
+		# standard gas partial pressures (STANDARD steps x mz_det), and species names:
+		self._species = [ '?' ] * M
+		pi = numpy.full( (len(iSTANDARD),M) , numpy.nan )
+		for j in range(len(iSTANDARD)):
+			for species,conc,mz in standard[iSTANDARD[j]]:
+				if sum( [ s[2] == mz for s in standard[iSTANDARD[j]] ] ) > 1:
+					raise ValueError( 'There are multiple STANDARD entries for the same mz value in STANDARD step ' + self._files[iSTANDARD[j]] + '. Aborting...' )
+				for k in numpy.flatnonzero( self._mz == mz ):
+					self._species[k] = species + ' (' + self._mz_det[k] + ')'
+					pi[j,k] = standardgas_pressure * conc
+		if numpy.isnan(standardgas_pressure):
+			self.warning ('Total gas pressure unknown for STANDARD!')
+
+		# sensitivities:
+		with numpy.errstate(divide='ignore',invalid='ignore'):
+			self._S_val = V_standard / pi
+			self._S_err = E_standard / pi
+		self._S_time = t[iSTANDARD]
+		
+		# sensitivities at SAMPLE times (linear interpolation, use first / last STANDARD before / after the first / last STANDARD) and SAMPLE partial pressures:
+		t_sample = t[iSAMPLE]
+		S_smpl_val = numpy.full( t_sample.shape , numpy.nan )
+		S_smpl_err = numpy.full( t_sample.shape , numpy.nan )
+		for i in range(M):
+			k = numpy.flatnonzero( ~numpy.isnan(self._S_val[:,i]) & ~numpy.isnan(self._S_time[:,i]) )
+			if len(k) == 0:
+				self.warning ('no valid STANDARDs data for ' + self._mz_det[i] + '. Skipping...')
+				continue
+			k = k[ numpy.argsort( self._S_time[k,i] ) ]
+			S_smpl_val[:,i] = numpy.interp( t_sample[:,i] , self._S_time[k,i] , self._S_val[k,i] )
+			S_smpl_err[:,i] = numpy.interp( t_sample[:,i] , self._S_time[k,i] , self._S_err[k,i] )
+		with numpy.errstate(divide='ignore',invalid='ignore'):
+			self._P_val = V_sample / S_smpl_val # V_sample and S_smpl_val are both blank-corrected values
+			self._P_err = numpy.sqrt( ( e[iSAMPLE] / V_sample )**2 + ( S_smpl_err / S_smpl_val )**2 ) * self._P_val # error from counting statistics (NOT overall reproducibility of analyses!)
+		self._P_time = t_sample
+		self._iSAMPLE = iSAMPLE
+		
+		# SENSOR data of the SAMPLEs:
+		self._sensors = []
+		for source,typ in R.keys():
+			if ( typ in ('PRESSURE','TEMPERATURE') ) and calibrator._match(source,SENSOR_names):
+				self._sensors.append( ( source , ) + calibrator._sensor_means( R.table(source,typ) , N ) )
+
+
+	########################################################################################################
+	
+
+	def label(self):
+		"""
+		lab = calibrator.label()
+		
+		Return label / name of the CALIBRATOR object
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		lab: label / name (string)
+		"""
+		
+		return 'CALIBRATOR'
+
+	
+	########################################################################################################
+	
+
+	def warning(self,msg):
+		"""
+		calibrator.warning(msg)
+		
+		Warn about issues related to CALIBRATOR object
+		
+		INPUT:
+		msg: warning message (string)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		misc.warnmessage ('CALIBRATOR',msg)
+
+	
+	########################################################################################################
+	
+
+	def species(self):
+		"""
+		s = calibrator.species()
+		
+		Return the species names (columns of the partial pressure and sensitivity matrices)
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		s: species names (list of strings, e.g. 'N2 (28_F)', or '?' if there is no standard gas information for an mz / detector combination)
+		"""
+		
+		return list(self._species)
+
+	
+	########################################################################################################
+	
+
+	def samples(self):
+		"""
+		s = calibrator.samples()
+		
+		Return the sample names (rows of the partial pressure matrices)
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		s: sample names (list of strings)
+		"""
+		
+		return [ self._name[i] for i in self._iSAMPLE ]
+
+	
+	########################################################################################################
+	
+
+	def partial_pressures(self):
+		"""
+		P_val,P_err,TIME = calibrator.partial_pressures()
+		
+		Return the partial pressures of the SAMPLEs
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		P_val: partial pressures (numpy array, one row for each sample, one column for each species, see calibrator.samples and calibrator.species). The unit is the unit of the standard gas pressure.
+		P_err: uncertainties of the partial pressures, taking into account ONLY the counting statistics of the data, not the overall reproducibility of the measurements (numpy array)
+		TIME: time stamps of the SAMPLE data (epoch time, numpy array)
+		"""
+		
+		return self._P_val , self._P_err , self._P_time
+
+	
+	########################################################################################################
+	
+
+	def sensitivities(self):
+		"""
+		S_val,S_err,TIME = calibrator.sensitivities()
+		
+		Return the sensitivities determined from the STANDARDs
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		S_val: blank-corrected sensitivities (numpy array, one row for each STANDARD, one column for each species, see calibrator.species). Unit: A per unit of the standard gas pressure.
+		S_err: uncertainties of the sensitivities (numpy array)
+		TIME: time stamps of the STANDARD data (epoch time, numpy array)
+		"""
+		
+		return self._S_val , self._S_err , self._S_time
+
+	
+	########################################################################################################
+	
+
+	def write_csv(self,filename):
+		"""
+		calibrator.write_csv(filename)
+		
+		Write the SAMPLE results (partial pressures and SENSOR data) to a CSV data file (same format as octave/rP_calibrate_batch.m).
+		
+		INPUT:
+		filename: file name (string). The extension .csv is added if necessary.
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		filename = os.path.expanduser(filename)
+		if not os.path.splitext(filename)[1] == '.csv':
+			filename = filename + '.csv'
+		
+		# header:
+		s = 'SAMPLE'
+		for sp in self._species:
+			s = s + ';%s TIME (EPOCH);%s PARTIALPRESSURE (%s);%s PARTIALPRESSURE ERR (%s)' % (sp,sp,self._unit,sp,self._unit)
+		for sens in self._sensors:
+			s = s + ';%s TIME (EPOCH);%s (%s);%s ERR (%s)' % (sens[0],sens[0],sens[4],sens[0],sens[4])
+		lines = [s]
+		
+		# data:
+		for i in range(len(self._iSAMPLE)):
+			s = self._name[self._iSAMPLE[i]]
+			for j in range(len(self._species)):
+				s = s + calibrator._format_triple( self._P_time[i,j] , self._P_val[i,j] , abs(self._P_err[i,j]) )
+			for sens in self._sensors:
+				k = self._iSAMPLE[i]
+				s = s + calibrator._format_triple( sens[3][k] , sens[1][k] , sens[2][k] )
+			lines.append(s)
+		
+		try:
+			with open(filename,'w') as f:
+				f.write( '\n'.join(lines) )
+		except IOError as e:
+			self.warning ('could not write file ' + filename + ': ' + str(e))
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def digest(peaks,zeros=None):
+		"""
+		X = calibrator.digest(peaks,zeros=None)
+		
+		Digest the PEAK and ZERO data of all steps at once (same results as octave/rP_digest_step_RGA_SRS.m for each step). For each step and mz / detector combination, the ZERO values are interpolated to the times of the PEAK values (using the first / last ZERO before / after the first / last ZERO) and subtracted from the PEAK values. If there are no ZEROs, the PEAK values are used without baseline correction.
+		
+		INPUT:
+		peaks: PEAK table (see datafile_reader.table)
+		zeros (optional): ZERO table (see datafile_reader.table). Default: zeros = None (no ZEROs)
+		
+		OUTPUT:
+		X: numpy structured array with one entry for each step (data file) and mz / detector combination, with the following fields:
+			file: index of the data file (see datafile_reader.files)
+			mz: mz value
+			det: detector (string)
+			mean: mean of net peak heights (PEAK-ZERO)
+			mean_err: error of the mean (standard deviation / sqrt(N-1)). NaN if N < 2.
+			unit: unit of mean and mean_err (string)
+			time: mean time of the PEAK values (epoch time)
+			N: number of PEAK values
+		"""
+		
+		if zeros is None:
+			zeros = numpy.zeros( 0 , dtype = peaks.dtype )
+		n_p = len(peaks)
+		
+		# group index of the PEAK and ZERO values (same step, mz and detector):
+		K = numpy.zeros( n_p + len(zeros) , dtype = [ ('file','i8') , ('mz','f8') , ('det','U8') ] )
+		for f in ('file','mz','det'):
+			K[f] = numpy.concatenate( ( peaks[f] , zeros[f] ) )
+		G,g = numpy.unique( K , return_inverse = True )
+		g = g.ravel()
+		
+		# sort by group and time (ZEROs before PEAKs with the same time):
+		is_peak = numpy.concatenate( ( numpy.ones(n_p,dtype=bool) , numpy.zeros(len(zeros),dtype=bool) ) )
+		t = numpy.concatenate( ( peaks['t'] , zeros['t'] ) )
+		val = numpy.concatenate( ( peaks['intensity'] , zeros['intensity'] ) )
+		o = numpy.lexsort( ( is_peak , t , g ) )
+		g = g[o] ; t = t[o] ; val = val[o] ; is_peak = is_peak[o]
+		n = len(o)
+		
+		# previous and next ZERO of each PEAK in the same group:
+		i = numpy.arange(n)
+		prv = numpy.maximum.accumulate( numpy.where( is_peak , -1 , i ) )
+		nxt = numpy.minimum.accumulate( numpy.where( is_peak , n , i )[::-1] )[::-1]
+		has_prv = ( prv >= 0 ) & ( g[numpy.maximum(prv,0)] == g )
+		has_nxt = ( nxt < n ) & ( g[numpy.minimum(nxt,n-1)] == g )
+		prv = numpy.where( has_prv , prv , nxt )
+		nxt = numpy.where( has_nxt , nxt , prv )
+		has_zero = has_prv | has_nxt
+		prv = numpy.where( has_zero , prv , 0 )
+		nxt = numpy.where( has_zero , nxt , 0 )
+		
+		# interpolate ZEROs and determine net peak heights:
+		dt = t[nxt] - t[prv]
+		w = numpy.where( dt > 0 , ( t - t[prv] ) / numpy.where( dt > 0 , dt , 1 ) , 0 )
+		z = numpy.where( has_zero , val[prv] + w * ( val[nxt] - val[prv] ) , 0 )
+		h = ( val - z )[is_peak]
+		gp = g[is_peak]
+		tp = t[is_peak]
+		
+		# no ZEROs:
+		for k in numpy.unique( gp[ ~has_zero[is_peak] ] ):
+			misc.warnmessage ('CALIBRATOR','found no ZEROs for mz=' + str(int(G['mz'][k])) + ' and detector=' + G['det'][k] + ' in file ' + str(G['file'][k]) + ', skipping baseline compensation...')
+		
+		# mean and error of the mean of each group:
+		N = numpy.bincount( gp , minlength = len(G) )
+		k = numpy.flatnonzero( N > 0 )
+		with numpy.errstate(divide='ignore',invalid='ignore'):
+			m = numpy.bincount( gp , weights = h , minlength = len(G) ) / N
+			s = numpy.bincount( gp , weights = ( h - m[gp] )**2 , minlength = len(G) )
+			err = numpy.where( N > 1 , numpy.sqrt( s / (N-1) ) / numpy.sqrt(N-1) , numpy.nan )
+			tm = numpy.bincount( gp , weights = tp , minlength = len(G) ) / N
+		unit = numpy.zeros( len(G) , dtype = peaks['unit'].dtype )
+		unit[gp[::-1]] = peaks['unit'][o[is_peak]][::-1] # unit of first PEAK
+		
+		X = numpy.zeros( len(k) , dtype = [ ('file','i8') , ('mz','f8') , ('det','U8') , ('mean','f8') , ('mean_err','f8') , ('unit',unit.dtype) , ('time','f8') , ('N','i8') ] )
+		X['file'] = G['file'][k]
+		X['mz'] = G['mz'][k]
+		X['det'] = G['det'][k]
+		X['mean'] = m[k]
+		X['mean_err'] = err[k]
+		X['unit'] = unit[k]
+		X['time'] = tm[k]
+		X['N'] = N[k]
+		
+		return X
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def _sensor_means(X,N):
+		"""
+		val,err,t,unit = calibrator._sensor_means(X,N)
+		
+		Determine mean values of SENSOR data for each step (same as octave/rP_digest_step_SENSOR.m).
+		
+		INPUT:
+		X: SENSOR data table (see datafile_reader.table)
+		N: number of steps (data files)
+		
+		OUTPUT:
+		val: mean value of each step (numpy array, NaN if there are no data)
+		err: error of the mean of each step (numpy array, NaN if there are less than two values)
+		t: mean time of each step (numpy array)
+		unit: unit of the SENSOR data (string, '?' if the data have different units)
+		"""
+		
+		f = X['file']
+		n = numpy.bincount( f , minlength = N )
+		with numpy.errstate(divide='ignore',invalid='ignore'):
+			val = numpy.bincount( f , weights = X['value'] , minlength = N ) / n
+			s = numpy.bincount( f , weights = ( X['value'] - val[f] )**2 , minlength = N )
+			err = numpy.where( n > 1 , numpy.sqrt( s / (n-1) ) / numpy.sqrt(n-1) , numpy.nan )
+			t = numpy.bincount( f , weights = X['t'] , minlength = N ) / n
+		
+		u = numpy.unique( X['unit'] )
+		if len(u) == 1:
+			unit = str(u[0])
+		else:
+			unit = '?'
+		
+		return val,err,t,unit
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def _match(source,names):
+		"""
+		m = calibrator._match(source,names)
+		
+		Check if data source matches one of the given names / labels.
+		
+		INPUT:
+		source: data source (string, e.g. 'RGA_SRS[MS]')
+		names: names / labels (list of strings, e.g. ['MS'] or ['RGA_SRS[MS]']). If names = [], all data sources match.
+		
+		OUTPUT:
+		m: True if source matches (bool)
+		"""
+		
+		if isinstance(names,str):
+			names = [names]
+		if len(names) == 0:
+			return True
+		
+		label = source
+		if source.endswith(']') and ( '[' in source ):
+			label = source[source.index('[')+1:-1]
+		
+		return ( source in names ) or ( label in names )
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def _format_triple(t,val,err):
+		"""
+		s = calibrator._format_triple(t,val,err)
+		
+		Format time, value and error for the CSV data file (NaN values are written as NA).
+		
+		INPUT:
+		t: time (epoch time)
+		val: value
+		err: error
+		
+		OUTPUT:
+		s: formatted string (';TIME;VAL;ERR')
+		"""
+		
+		s = ''
+		for x,fmt in ( (t,'%.2f') , (val,'%g') , (err,'%g') ):
+			if numpy.isnan(x):
+				s = s + ';NA'
+			else:
+				s = s + ';' + fmt % x
+		
+		return s
+
+
+	########################################################################################################
@@ -37,6 +37,18 @@
 import sys
 import warnings
 import os
+import time
+import threading
+import queue
+import struct
+import json
+import numpy
+import zlib
+import lzma
+try:
+	import zstandard # optional, only needed for zstd compression
+except ImportError:
+	zstandard = None
 from os.path 		import expanduser
 
 from classes.misc	import misc
@@ -45,6 +57,30 @@ from classes.misc	import misc
 if ( sys.version_info[0] < 3 ):
 	warnings.warn("ruediPy / rams_SRS class is running on Python version < 3. Version 3.0 or newer is recommended!")
 
+# binary data file format (see datafile.set_binary):
+_BIN_MAGIC = b'RUEDIBIN' # file header: magic string and format version (uint16)
+_BIN_VERSION = 1
+_BIN_STRING = 1		# string table entry: type, id (uint16), length (uint16), utf-8 bytes
+_BIN_PEAK = 2		# PEAK record: type, time, source, mz, intensity, unit, detector, gate
+_BIN_ZERO = 3		# ZERO record: type, time, source, mz, mz_offset, intensity, unit, detector, gate
+_BIN_PRESSURE = 4	# PRESSURE record: type, time, source, value, unit
+_BIN_TEMPERATURE = 5	# TEMPERATURE record: type, time, source, value, unit
+_BIN_SCAN = 6		# SCAN record: type, time, source, unit, detector, gate, N (uint32), N mz values (float32), N intensity values (float64)
+_BIN_DTYPES = { # record fields (after the type byte). Strings are given by their id in the string table (uint16).
+	_BIN_PEAK:        numpy.dtype([ ('t','<f8') , ('source','<u2') , ('mz','<f4') , ('intensity','<f8') , ('unit','<u2') , ('det','<u2') , ('gate','<f4') ]),
+	_BIN_ZERO:        numpy.dtype([ ('t','<f8') , ('source','<u2') , ('mz','<f4') , ('mz_offset','<f4') , ('intensity','<f8') , ('unit','<u2') , ('det','<u2') , ('gate','<f4') ]),
+	_BIN_PRESSURE:    numpy.dtype([ ('t','<f8') , ('source','<u2') , ('value','<f8') , ('unit','<u2') ]),
+	_BIN_TEMPERATURE: numpy.dtype([ ('t','<f8') , ('source','<u2') , ('value','<f8') , ('unit','<u2') ]),
+	_BIN_SCAN:        numpy.dtype([ ('t','<f8') , ('source','<u2') , ('unit','<u2') , ('det','<u2') , ('gate','<f4') , ('N','<u4') ])
+}
+_BIN_NAMES = { _BIN_PEAK: 'PEAK' , _BIN_ZERO: 'ZERO' , _BIN_PRESSURE: 'PRESSURE' , _BIN_TEMPERATURE: 'TEMPERATURE' , _BIN_SCAN: 'SCAN' }
+
+# index files (see datafile.set_index):
+_INDEX_BLOCK = 1000 # number of lines in a time block
+
+# compressed data files (see datafile.set_compression):
+_COMPRESSION_EXT = { 'gzip': '.gz' , 'lzma': '.xz' , 'zstd': '.zst' } # file name extension for each compression method
+
 class datafile:
 	"""
 	ruediPy class for handling of data files.
@@ -53,14 +89,19 @@ class datafile:
 	########################################################################################################
 	
 
-	def __init__(self,pth):
+	def __init__(self,pth,flush_lines=1,flush_interval=0,fsync=False,async_write=False,queue_size=10000,binary=False,compression=None,index=False):
 		"""
-		obj = datafile.__init__(self,pth)
+		obj = datafile.__init__(self,pth,flush_lines=1,flush_interval=0,fsync=False,async_write=False,queue_size=10000,binary=False,compression=None,index=False)
 		
 		Initialize DATAFILE object
 		
 		INPUT:
 		pth: directory path where datafiles are stored (string)
+		flush_lines, flush_interval, fsync (optional): flush policy of the data file (see datafile.set_flush_policy). Default: flush_lines=1, flush_interval=0, fsync=False (flush after every line)
+		async_write, queue_size (optional): write data lines in a separate thread (see datafile.set_async_write). Default: async_write=False, queue_size=10000
+		binary (optional): write binary data file in addition to the text file (see datafile.set_binary). Default: binary=False
+		compression (optional): compression of the data files (see datafile.set_compression). Default: compression=None (no compression)
+		index (optional): write index file with the positions of the data lines (see datafile.set_index). Default: index=False
 		
 		OUTPUT:
 		obj: dafafile object
@@ -82,6 +123,133 @@ class datafile:
 		
 		# init empty file ID:
 		self._fid = -1
+		
+		# flush policy:
+		self.set_flush_policy(flush_lines,flush_interval,fsync)
+		self._unflushed = 0 # number of lines written since last flush
+		self._last_flush = time.time() # time of last flush
+
+		# binary data file:
+		self._binary = binary
+		self._binfid = None # file object of binary data file
+		self._binstrings = {} # string table of binary data file
+
+		# index file:
+		self._index = index
+		self._idx = None # index of the current data file
+		self._offset = 0 # position of the next line in the current data file (bytes)
+
+		# compression:
+		self._compression = None
+		self._compressor = None # compressor object of the data file
+		self._bincompressor = None # compressor object of the binary data file
+		if compression is not None:
+			self.set_compression(compression)
+
+		# asynchronous writing:
+		self._lock = threading.RLock() # lock for the file objects (writing, flushing, opening and closing files), used by the writer thread and by the threads writing data
+		self._put_lock = threading.RLock() # lock for giving data lines to the datafile object (keeps the order of the lines if data are written from several threads, e.g. instruments used with asyncdevice). Never wait for the writer thread while holding self._lock.
+		self._queue = None # queue of lines waiting to be written by the writer thread (None if lines are written directly)
+		self._writer = None # writer thread
+		if async_write:
+			self.set_async_write(True,queue_size)
+
+	
+	########################################################################################################
+	
+
+	def set_flush_policy(self,flush_lines=1,flush_interval=0,fsync=False):
+		"""
+		datafile.set_flush_policy(flush_lines=1,flush_interval=0,fsync=False)
+		
+		Set the flush policy of the data file, i.e. how often the lines written to the data file are passed on to the operating system (and the disk). Flushing after every line keeps the data file up to date at all times, but costs a write operation for every line. Flushing less often is faster, but the lines written since the last flush are lost if the program or computer crashes. The data file is always flushed when it is closed (see datafile.close and datafile.next).
+		
+		INPUT:
+		flush_lines (optional): flush the file after this number of lines. If flush_lines = 0, the file is not flushed depending on the number of lines. Default: flush_lines = 1 (flush after every line)
+		flush_interval (optional): flush the file if the last flush is older than flush_interval seconds (checked when writing a line). If flush_interval = 0, the file is not flushed depending on time. Default: flush_interval = 0
+		fsync (optional): if fsync = True, the operating system is also told to write the data to the disk at each flush (os.fsync). This makes sure the data are on the disk, but may be slow. Default: fsync = False
+		
+		OUTPUT:
+		(none)
+		
+		EXAMPLES:
+		set_flush_policy() --> flush after every line
+		set_flush_policy(flush_lines=100,flush_interval=10) --> flush after 100 lines or 10 seconds, whichever comes first
+		set_flush_policy(flush_lines=0) --> flush only when closing the file
+		"""
+
+		if flush_lines < 0:
+			self.warning ('flush_lines must not be negative. Using flush_lines = 0...')
+			flush_lines = 0
+		if flush_interval < 0:
+			self.warning ('flush_interval must not be negative. Using flush_interval = 0...')
+			flush_interval = 0
+
+		self._flush_lines = int(flush_lines)
+		self._flush_interval = flush_interval
+		self._fsync = fsync
+
+	
+	########################################################################################################
+	
+
+	def flush(self,fsync=None):
+		"""
+		datafile.flush(fsync=None)
+		
+		Flush the data file now, i.e. pass the lines written to the data file on to the operating system. This can be used for a "checkpoint", e.g. at the end of a measurement step, if the flush policy does not flush after every line (see datafile.set_flush_policy).
+		
+		INPUT:
+		fsync (optional): if fsync = True, the operating system is also told to write the data to the disk (os.fsync). If fsync = None, the fsync setting of the flush policy is used. Default: fsync = None
+		
+		OUTPUT:
+		(none)
+		"""
+
+		with self._put_lock:
+			self.drain() # make sure all lines are written to the file
+
+			with self._lock:
+				self._flush_file(fsync)
+
+	
+	########################################################################################################
+	
+
+	def _flush_file(self,fsync=None):
+		"""
+		datafile._flush_file(fsync=None)
+		
+		Flush the data file (without waiting for the writer thread, see datafile.flush).
+		
+		INPUT:
+		fsync (optional): see datafile.flush
+		
+		OUTPUT:
+		(none)
+		"""
+
+		if fsync is None:
+			fsync = self._fsync
+
+		if hasattr(self.fid, 'flush'):
+			try:
+				if self._compressor is not None: # write out the data kept in the compressor (sync point)
+					self._compressor = self._compress_sync(self._compressor,self.fid)
+				self.fid.flush()
+				if fsync:
+					os.fsync(self.fid.fileno())
+				if self._binfid is not None:
+					if self._bincompressor is not None:
+						self._bincompressor = self._compress_sync(self._bincompressor,self._binfid)
+					self._binfid.flush()
+					if fsync:
+						os.fsync(self._binfid.fileno())
+			except (IOError,OSError) as e:
+				self.warning ('could not flush file ' + self.fid.name + ': ' + str(e))
+
+		self._unflushed = 0
+		self._last_flush = time.time()
 
 	
 	########################################################################################################
@@ -125,6 +293,560 @@ class datafile:
 	########################################################################################################
 	
 	
+	def set_async_write(self,async_write,queue_size=10000):
+		"""
+		datafile.set_async_write(async_write,queue_size=10000)
+		
+		Turn asynchronous writing on or off. With asynchronous writing, the data lines are put into a queue and are written to the file by a separate "writer" thread. This way, the measurement does not have to wait if writing to the disk is slow (e.g. with network drives). The lines are always written in the same order as they were given to the datafile object, also across new files (see datafile.next). If the queue is full, writing a line waits until the writer thread has made space in the queue (see datafile.async_stats).
+		
+		INPUT:
+		async_write: flag to turn asynchronous writing on (async_write = True) or off (async_write = False). When turning asynchronous writing off, the lines in the queue are written to the file first.
+		queue_size (optional): max. number of lines in the queue (default: queue_size = 10000)
+		
+		OUTPUT:
+		(none)
+		"""
+
+		with self._put_lock:
+			if async_write:
+				if self._queue is None:
+					self._async_stats = { 'lines': 0 , 'max_queued': 0 , 'blocked': 0 , 'blocked_time': 0.0 }
+					self._queue = queue.Queue(maxsize=queue_size)
+					self._writer = threading.Thread( target = self._writer_loop , args = (self._queue,) , daemon = True )
+					self._writer.start()
+			else:
+				if self._queue is not None:
+					self.drain()
+					self._queue.put(None) # tell the writer thread to stop
+					self._writer.join()
+					self._queue = None
+					self._writer = None
+
+	
+	########################################################################################################
+	
+
+	def _writer_loop(self,q):
+		"""
+		datafile._writer_loop(q)
+		
+		Writer thread for asynchronous writing (see datafile.set_async_write): write lines from the queue to the data file until None is taken from the queue.
+		
+		INPUT:
+		q: queue with lines (strings)
+		
+		OUTPUT:
+		(none)
+		"""
+
+		while True:
+			S = q.get()
+			try:
+				if S is None:
+					break
+				self._write_line(S)
+			except:
+				self.warning ('could not write to file (' + str(sys.exc_info()[0]) + ').')
+			finally:
+				q.task_done()
+
+	
+	########################################################################################################
+	
+
+	def drain(self):
+		"""
+		datafile.drain()
+		
+		Wait until the writer thread has written all lines in the queue to the data file (only relevant with asynchronous writing, see datafile.set_async_write).
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		(none)
+		"""
+
+		if self._queue is not None:
+			self._queue.join()
+
+	
+	########################################################################################################
+	
+
+	def async_stats(self):
+		"""
+		stats = datafile.async_stats()
+		
+		Return statistics of asynchronous writing (see datafile.set_async_write). This shows if the writer thread keeps up with the data lines (i.e., if the measurement had to wait for writing the data).
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		stats: dict with the following fields (or None if asynchronous writing is off):
+			'lines': number of lines put into the queue
+			'queued': number of lines currently waiting in the queue
+			'max_queued': max. number of lines that were waiting in the queue
+			'blocked': number of lines that had to wait because the queue was full
+			'blocked_time': total time (seconds) waited because the queue was full
+		"""
+
+		if self._queue is None:
+			return None
+
+		stats = dict(self._async_stats)
+		stats['queued'] = self._queue.qsize()
+		return stats
+
+	
+	########################################################################################################
+	
+
+	def set_binary(self,binary):
+		"""
+		datafile.set_binary(binary)
+		
+		Turn writing of binary data files on or off. The binary data file is written in addition to the text data file, and has the same name with the extension .bin. It contains the PEAK, ZERO, SCAN, PRESSURE and TEMPERATURE data as binary records (numbers are not converted to text, SCAN data are stored as float32 mz values and float64 intensity values). Binary data files are much smaller and much faster to read than text files (see datafile.read_bin). The change takes effect with the next data file (see datafile.next).
+		
+		Binary file format (all numbers little endian):
+		header: b'RUEDIBIN' followed by format version (uint16)
+		records: record type (uint8) followed by the record fields:
+			type 1 (string table entry): id (uint16), length (uint16), string (utf-8). Data sources ('CALLER[LABEL]'), units and detectors are stored once as string table entries; the data records refer to these strings by their id.
+			type 2 (PEAK): time (float64), source (uint16), mz (float32), intensity (float64), unit (uint16), detector (uint16), gate (float32)
+			type 3 (ZERO): time (float64), source (uint16), mz (float32), mz_offset (float32), intensity (float64), unit (uint16), detector (uint16), gate (float32)
+			type 4 (PRESSURE) and type 5 (TEMPERATURE): time (float64), source (uint16), value (float64), unit (uint16)
+			type 6 (SCAN): time (float64), source (uint16), unit (uint16), detector (uint16), gate (float32), N (uint32), followed by N mz values (float32) and N intensity values (float64)
+		
+		INPUT:
+		binary: flag to turn writing of binary data files on (binary = True) or off (binary = False)
+		
+		OUTPUT:
+		(none)
+		"""
+
+		self._binary = binary
+
+	
+	########################################################################################################
+	
+
+	def _bin_string(self,string):
+		"""
+		b = datafile._bin_string(string)
+		
+		Return string table id of a string in the binary data file, and string table entry (if the string is not yet in the string table).
+		
+		INPUT:
+		string: string
+		
+		OUTPUT:
+		b: tuple (id,entry) with the string id (integer) and the binary string table entry (bytes, empty if the string is already in the string table)
+		"""
+
+		if string in self._binstrings:
+			return ( self._binstrings[string] , b'' )
+
+		k = len(self._binstrings)
+		self._binstrings[string] = k
+		u = string.encode('utf-8')
+		return ( k , struct.pack('<BHH',_BIN_STRING,k,len(u)) + u )
+
+	
+	########################################################################################################
+	
+
+	def _bin_record(self,typ,fields,caller,label,strings,arrays=()):
+		"""
+		datafile._bin_record(typ,fields,caller,label,strings,arrays=())
+		
+		Write a record to the binary data file (if binary data files are turned on, see datafile.set_binary).
+		
+		INPUT:
+		typ: record type
+		fields: dict with the numeric fields of the record
+		caller, label: type and name/label of the calling object (data source)
+		strings: dict with the string fields of the record (other than the data source)
+		arrays (optional): numpy arrays appended to the record (SCAN data)
+		
+		OUTPUT:
+		(none)
+		"""
+
+		if self._binfid is None:
+			return
+
+		with self._put_lock: # keep string table and records consistent if several threads write data
+			B = b''
+			fields['source'],b = self._bin_string(self._source(caller,label))
+			B = B + b
+			for f in strings:
+				fields[f],b = self._bin_string(strings[f].replace(' ',''))
+				B = B + b
+			
+			r = numpy.zeros(1,dtype=_BIN_DTYPES[typ])
+			for f in fields:
+				r[f] = fields[f]
+			B = B + struct.pack('<B',typ) + r.tobytes()
+			for a in arrays:
+				B = B + a.tobytes()
+
+			self._put(B)
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def read_raw(filename):
+		"""
+		u = datafile.read_raw(filename)
+		
+		Read the contents of a data file (text or binary) as bytes. Compressed files (.gz, .xz or .zst, see datafile.set_compression) are decompressed. If a compressed file was not closed properly, the data up to the last sync point are returned.
+		
+		INPUT:
+		filename: file name (string)
+		
+		OUTPUT:
+		u: file contents (bytes)
+		"""
+
+		with open(filename,'rb') as f:
+			u = f.read()
+
+		if filename.endswith('.gz'):
+			d = zlib.decompressobj(wbits=31)
+			u = d.decompress(u)
+		
+		elif filename.endswith('.xz'):
+			# decompress all xz streams (see datafile._compress_sync):
+			v = []
+			while len(u) > 0:
+				d = lzma.LZMADecompressor(format=lzma.FORMAT_XZ)
+				try:
+					v.append( d.decompress(u) )
+				except lzma.LZMAError: # incomplete stream at the end of the file
+					break
+				u = d.unused_data
+			u = b''.join(v)
+		
+		elif filename.endswith('.zst'):
+			if zstandard is None:
+				raise ImportError( 'Reading ' + filename + ' needs the python zstandard package.' )
+			d = zstandard.ZstdDecompressor().decompressobj()
+			u = d.decompress(u)
+
+		return u
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def read_bin(filename):
+		"""
+		data = datafile.read_bin(filename)
+		
+		Read binary data file (see datafile.set_binary).
+		
+		INPUT:
+		filename: name of the binary data file (string). Compressed files (.bin.gz, .bin.xz or .bin.zst, see datafile.set_compression) are decompressed.
+		
+		OUTPUT:
+		data: dict with one numpy structured array for each record type ('PEAK', 'ZERO', 'PRESSURE', 'TEMPERATURE', 'SCAN'). The string fields (source, unit, det) contain the strings (not the string table ids). The 'SCAN' array has additional fields 'mz' and 'intensity', which contain the numpy arrays of the scan data.
+		
+		EXAMPLE:
+		data = datafile.read_bin('2017-01-01_12-00-00.bin')
+		k = data['PEAK']['mz'] == 40
+		plot( data['PEAK']['t'][k] , data['PEAK']['intensity'][k] )
+		"""
+
+		u = datafile.read_raw(filename)
+
+		n = len(_BIN_MAGIC)
+		if not u[0:n] == _BIN_MAGIC:
+			raise ValueError( filename + ' is not a ruediPy binary data file.' )
+		version = struct.unpack_from('<H',u,n)[0]
+		if version > _BIN_VERSION:
+			raise ValueError( filename + ' has unknown binary format version ' + str(version) + '.' )
+		pos = n + 2
+
+		strings = []
+		records = { typ: [] for typ in _BIN_NAMES } # positions of the records of each type
+		scans = [] # scan data arrays
+		while pos < len(u):
+			typ = u[pos]
+			if typ == _BIN_STRING:
+				if pos + 5 > len(u):
+					break
+				k,m = struct.unpack_from('<HH',u,pos+1)
+				if pos + 5 + m > len(u):
+					break
+				strings.append( u[pos+5:pos+5+m].decode('utf-8') )
+				pos = pos + 5 + m
+			elif typ in _BIN_DTYPES:
+				n = _BIN_DTYPES[typ].itemsize
+				if pos + 1 + n > len(u):
+					break
+				if typ == _BIN_SCAN:
+					N = struct.unpack_from('<I',u,pos+1+n-4)[0]
+					if pos + 1 + n + 12*N > len(u):
+						break
+					mz = numpy.frombuffer(u,dtype='<f4',count=N,offset=pos+1+n)
+					intens = numpy.frombuffer(u,dtype='<f8',count=N,offset=pos+1+n+4*N)
+					scans.append( ( mz , intens ) )
+					n = n + 12*N
+				records[typ].append(pos+1)
+				pos = pos + 1 + n
+			else:
+				raise ValueError( filename + ': unknown record type ' + str(typ) + ' at byte ' + str(pos) + '.' )
+		
+		if pos < len(u):
+			# last record is incomplete (e.g. if the file was not closed properly):
+			misc.warnmessage('DATAFILE','Ignoring incomplete record at end of ' + filename + '.')
+
+		strings = numpy.array(strings + [''])
+		buf = numpy.frombuffer(u,dtype=numpy.uint8)
+		data = {}
+		for typ in _BIN_NAMES:
+			dt = _BIN_DTYPES[typ]
+			# copy the bytes of all records of this type into one array, and view this as an array of records:
+			k = numpy.array(records[typ],dtype=int)
+			raw = buf[ k[:,None] + numpy.arange(dt.itemsize) ].copy().view(dt).ravel()
+			
+			# replace string ids by strings, use native byte order for numbers:
+			fields = []
+			for name in dt.names:
+				if name in ('source','unit','det'):
+					fields.append( ( name , strings.dtype ) )
+				elif not name == 'N':
+					fields.append( ( name , dt[name].newbyteorder('=') ) )
+			if typ == _BIN_SCAN:
+				fields = fields + [ ( 'mz' , object ) , ( 'intensity' , object ) ]
+			d = numpy.zeros(len(raw),dtype=fields)
+			for name in dt.names:
+				if name in ('source','unit','det'):
+					d[name] = strings[raw[name]]
+				elif not name == 'N':
+					d[name] = raw[name]
+			if typ == _BIN_SCAN:
+				for i in range(len(scans)):
+					d['mz'][i] = scans[i][0]
+					d['intensity'][i] = scans[i][1]
+			data[_BIN_NAMES[typ]] = d
+
+		return data
+
+	
+	########################################################################################################
+	
+
+	def set_index(self,index):
+		"""
+		datafile.set_index(index)
+		
+		Turn writing of index files on or off. The index file is written when the data file is closed. It has the same name as the data file with the additional extension .idx, and contains the positions of the data lines in the data file. This allows reading the data lines of a given data source and type, or from a given time range, without reading the whole file (see also datafile_reader). The change takes effect with the next data file (see datafile.next).
+		
+		The index file is a JSON file with the following fields:
+			'format': 'ruediPy-index'
+			'version': format version (integer)
+			'file': name of the data file (without path)
+			'lines': number of lines in the data file
+			'records': dict with one entry for each data source and type (key: 'SOURCE TYPE', e.g. 'RGA_SRS[MS] PEAK'). Each entry has the fields 'offset' (list of the positions of the lines in the data file) and 't' (list of the time stamps of the lines).
+			'blocks': list of time blocks with 1000 lines each. Each block is given as [offset,t_min,t_max,lines] with the position of the first line of the block, the min. and max. time stamps of the lines in the block, and the number of lines in the block.
+		The positions are given in bytes from the start of the file (for compressed data files: from the start of the uncompressed data).
+		
+		INPUT:
+		index: flag to turn writing of index files on (index = True) or off (index = False)
+		
+		OUTPUT:
+		(none)
+		"""
+
+		self._index = index
+
+	
+	########################################################################################################
+	
+
+	def _index_add(self,S,n):
+		"""
+		datafile._index_add(S,n)
+		
+		Add line to the index of the current data file (see datafile.set_index).
+		
+		INPUT:
+		S: line (string)
+		n: length of the line in the data file (bytes)
+		
+		OUTPUT:
+		(none)
+		"""
+
+		u = S.split(' ',3)
+		try:
+			t = float(u[0])
+		except ValueError:
+			t = None
+		key = u[1] + ' ' + u[2][:-1]
+
+		if not key in self._idx['records']:
+			self._idx['records'][key] = { 'offset': [] , 't': [] }
+		self._idx['records'][key]['offset'].append(self._offset)
+		self._idx['records'][key]['t'].append(t)
+
+		B = self._idx['blocks']
+		if ( len(B) == 0 ) or ( B[-1][3] >= _INDEX_BLOCK ):
+			B.append( [ self._offset , t , t , 0 ] )
+		if t is not None:
+			if ( B[-1][1] is None ) or ( t < B[-1][1] ):
+				B[-1][1] = t
+			if ( B[-1][2] is None ) or ( t > B[-1][2] ):
+				B[-1][2] = t
+		B[-1][3] = B[-1][3] + 1
+
+		self._idx['lines'] = self._idx['lines'] + 1
+		self._offset = self._offset + n
+
+	
+	########################################################################################################
+	
+
+	def _index_write(self):
+		"""
+		datafile._index_write()
+		
+		Write the index file of the current data file (see datafile.set_index).
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		(none)
+		"""
+
+		n = self._idx['file'] + '.idx'
+		self._idx['file'] = os.path.basename(self._idx['file'])
+		try:
+			with open(n,'w') as f:
+				json.dump(self._idx,f)
+		except IOError as e:
+			self.warning ('could not write index file ' + n + ': ' + str(e))
+		self._idx = None
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def read_index(filename):
+		"""
+		idx = datafile.read_index(filename)
+		
+		Read the index file of a data file (see datafile.set_index).
+		
+		INPUT:
+		filename: name of the data file or of the index file (string)
+		
+		OUTPUT:
+		idx: index (dict, see datafile.set_index), or None if there is no index file
+		"""
+
+		if not filename.endswith('.idx'):
+			filename = filename + '.idx'
+		if not os.path.isfile(filename):
+			return None
+		with open(filename,'r') as f:
+			return json.load(f)
+
+	
+	########################################################################################################
+	
+
+	def set_compression(self,compression):
+		"""
+		datafile.set_compression(compression)
+		
+		Set compression of the data files. The data files are compressed while writing, and get an additional file name extension (.gz, .xz or .zst). Each time the data file is flushed (see datafile.set_flush_policy), the compressor writes out all data it has received so far ("sync point"), so the file can be read up to the last flush even if it was not closed properly (e.g. after a power loss). Frequent flushing makes compression less effective, so a flush policy like set_flush_policy(flush_lines=0,flush_interval=60) is recommended with compression. The change takes effect with the next data file (see datafile.next).
+		
+		INPUT:
+		compression: compression method (string or None):
+			compression = None: no compression
+			compression = 'gzip': gzip compression (.txt.gz files), sync points are gzip "sync flushes"
+			compression = 'lzma': xz / lzma compression (.txt.xz files), each sync point ends an xz stream and starts a new one
+			compression = 'zstd': Zstandard compression (.txt.zst files, needs the python zstandard package), sync points are zstd "block flushes"
+		
+		OUTPUT:
+		(none)
+		"""
+
+		if compression is not None:
+			compression = compression.lower()
+			if not compression in _COMPRESSION_EXT:
+				self.warning ('Unknown compression method ' + compression + '. Ignoring compression...')
+				compression = None
+			elif ( compression == 'zstd' ) and ( zstandard is None ):
+				self.warning ('zstd compression needs the python zstandard package. Ignoring compression...')
+				compression = None
+
+		self._compression = compression
+
+	
+	########################################################################################################
+	
+
+	def _compressor_new(self):
+		"""
+		c = datafile._compressor_new()
+		
+		Return new compressor object for the compression method of the data file (see datafile.set_compression).
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		c: compressor object (or None if there is no compression)
+		"""
+
+		if self._compression == 'gzip':
+			return zlib.compressobj(wbits=31) # wbits=31: gzip header and trailer
+		elif self._compression == 'lzma':
+			return lzma.LZMACompressor(format=lzma.FORMAT_XZ)
+		elif self._compression == 'zstd':
+			return zstandard.ZstdCompressor().compressobj()
+		return None
+
+	
+	########################################################################################################
+	
+
+	def _compress_sync(self,c,f):
+		"""
+		c = datafile._compress_sync(c,f)
+		
+		Write out all data kept in the compressor to the file (sync point, see datafile.set_compression).
+		
+		INPUT:
+		c: compressor object
+		f: file object
+		
+		OUTPUT:
+		c: compressor object for use with the following data (lzma: new compressor object)
+		"""
+
+		if self._compression == 'gzip':
+			f.write( c.flush(zlib.Z_SYNC_FLUSH) )
+		elif self._compression == 'lzma':
+			f.write( c.flush() ) # finish the xz stream (lzma has no sync flush)...
+			c = self._compressor_new() # ...and start a new stream
+		elif self._compression == 'zstd':
+			f.write( c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK) )
+		return c
+
+	
+	########################################################################################################
+	
+
 	def basepath(self):
 			"""
 			pat = datafile.basepath()
@@ -200,13 +922,43 @@ class datafile:
 		(none)
 		"""
 		
-		#Check if file / fid has been created as a file object:
-		if hasattr(self.fid, 'close'):
-			# close current data file
-			try:
-				self.fid.close()
-			except IOError as e:
-				self.warning ('could not close file ' + self.fid.name() + ': ' + e)
+		with self._put_lock: # no new data lines while closing the file
+			# wait for the writer thread to write the lines in the queue (all lines given before closing the file go to this file):
+			self.drain()
+
+			with self._lock:
+				#Check if file / fid has been created as a file object:
+				if hasattr(self.fid, 'close'):
+					# flush unwritten lines (and sync to disk if required by the flush policy):
+					if not self.fid.closed:
+						self._flush_file()
+						# finish compressed data:
+						try:
+							if self._compressor is not None:
+								self.fid.write( self._compressor.flush() )
+							if self._bincompressor is not None:
+								self._binfid.write( self._bincompressor.flush() )
+						except IOError as e:
+							self.warning ('could not write to file ' + self.fid.name + ': ' + str(e))
+						self._compressor = None
+						self._bincompressor = None
+					# close current data file
+					try:
+						self.fid.close()
+					except IOError as e:
+						self.warning ('could not close file ' + self.fid.name() + ': ' + e)
+
+				# close binary data file:
+				if self._binfid is not None:
+					try:
+						self._binfid.close()
+					except IOError as e:
+						self.warning ('could not close file ' + self._binfid.name + ': ' + str(e))
+					self._binfid = None
+
+				# write index file:
+				if self._idx is not None:
+					self._index_write()
 	
 	
 	########################################################################################################
@@ -236,67 +988,95 @@ class datafile:
 		(none)
 		"""
 
-		# close the current datafile (if it exists and is still open)
-		self.close()
-		
-		# parse analysis type:
-		typ = typ.replace(' ','')
-		typ = typ.upper()
-		if not ( typ == '' ):
-			if not ( typ in ( 'SAMPLE' , 'STANDARD' , 'BLANK' , 'MISC' ) ):
-				self.warning ( 'Unknown analysis type ' + typ + '. Ignoring analysis type...' )
-				typ = ''
-		
-		# determine file name for new file
-		n = misc.now_string()
-		n = n.replace(':','-')
-		n = n.replace(' ','_')
-		if not ( typ == '' ):
-			n = n + '_' + typ
-		
-		# check if file exists already:
-		n0 = self.basepath() + os.sep + n
-		n = n0
-		k = 1
-		while os.path.isfile(n + '.txt'):
-			n = n0 + '+' + str(k)
-			k = k+1
-		
-		# open the file
-		n = n + '.txt'
-		try:
-			self.fid = open(n, 'w')
+		with self._put_lock: # no data lines from other threads until the new file is ready
+
+			# close the current datafile (if it exists and is still open)
+			self.close()
+
+			with self._lock:
+		
+				# parse analysis type:
+				typ = typ.replace(' ','')
+				typ = typ.upper()
+				if not ( typ == '' ):
+					if not ( typ in ( 'SAMPLE' , 'STANDARD' , 'BLANK' , 'MISC' ) ):
+						self.warning ( 'Unknown analysis type ' + typ + '. Ignoring analysis type...' )
+						typ = ''
+		
+				# determine file name for new file
+				n = misc.now_string()
+				n = n.replace(':','-')
+				n = n.replace(' ','_')
+				if not ( typ == '' ):
+					n = n + '_' + typ
+		
+				# check if file exists already:
+				n0 = self.basepath() + os.sep + n
+				n = n0
+				k = 1
+				ext = ''
+				if self._compression is not None:
+					ext = _COMPRESSION_EXT[self._compression]
+				while os.path.isfile(n + '.txt' + ext):
+					n = n0 + '+' + str(k)
+					k = k+1
+				nb = n + '.bin' + ext
+		
+				# open the file
+				n = n + '.txt' + ext
+				try:
+					if self._compression is None:
+						self.fid = open(n, 'w')
+					else:
+						self.fid = open(n, 'wb') # write compressed data as bytes
+						self._compressor = self._compressor_new()
 			    		
-		except IOError as e:
-			self.fid = -1;
-			self.warning ('could not open new file (' + n + '): ' + str(e))
-			return # exit
-
-		# write header with data format info:
-		self.write_comment(self.label(),'RUEDI data file created ' + misc.now_string() )
-		self.write_comment(self.label(),'Data format:')
-		self.write_comment(self.label(),'EPOCHTIME DATASOURCE[LABEL/NAME] TYPE: DATAFIELD-1; DATAFIELD-2; DATAFIELD-3; ...')
-		self.write_comment(self.label(),'EPOCH TIME: UNIX time (seconds after Jan 01 1970 UTC), DATASOURCE: data origin (with optional label of origin object), TYPE: type of data, DATAFIELD-i: data fields, separated by colons. The field format and number of fields depends on the DATASOURCE and TYPE of data.')
+				except IOError as e:
+					self.fid = -1;
+					self.warning ('could not open new file (' + n + '): ' + str(e))
+					return # exit
+
+				# open binary data file:
+				if self._binary:
+					try:
+						self._binfid = open(nb, 'wb')
+						self._bincompressor = self._compressor_new()
+						self._binstrings = {}
+						self._write_line( _BIN_MAGIC + struct.pack('<H',_BIN_VERSION) )
+					except IOError as e:
+						self._binfid = None
+						self.warning ('could not open new binary file (' + nb + '): ' + str(e))
+
+				# start index:
+				self._offset = 0
+				if self._index:
+					self._idx = { 'format': 'ruediPy-index' , 'version': 1 , 'file': n , 'lines': 0 , 'records': {} , 'blocks': [] }
+
+			# write header with data format info:
+			self.write_comment(self.label(),'RUEDI data file created ' + misc.now_string() )
+			self.write_comment(self.label(),'Data format:')
+			self.write_comment(self.label(),'EPOCHTIME DATASOURCE[LABEL/NAME] TYPE: DATAFIELD-1; DATAFIELD-2; DATAFIELD-3; ...')
+			self.write_comment(self.label(),'EPOCH TIME: UNIX time (seconds after Jan 01 1970 UTC), DATASOURCE: data origin (with optional label of origin object), TYPE: type of data, DATAFIELD-i: data fields, separated by colons. The field format and number of fields depends on the DATASOURCE and TYPE of data.')
 	   	
-	   	# write analysis type:
-		if typ == '':
-			typ = 'UNKNOWN'
-		self.writeln( self.label() ,'','ANALYSISTYPE' , typ , misc.now_UNIX() )
-		
-		# write sample name:
-		if typ == 'SAMPLE':
-			if samplename == '':
-				self.warning('No sample name given!')
-			else:
-				self.writeln( self.label() ,'','SAMPLENAME' , samplename , misc.now_UNIX() )
+		   	# write analysis type:
+			if typ == '':
+				typ = 'UNKNOWN'
+			self.writeln( self.label() ,'','ANALYSISTYPE' , typ , misc.now_UNIX() )
+		
+			# write sample name:
+			if typ == 'SAMPLE':
+				if samplename == '':
+					self.warning('No sample name given!')
+				else:
+					self.writeln( self.label() ,'','SAMPLENAME' , samplename , misc.now_UNIX() )
 
-		# write standard gas information:
-		if typ == 'STANDARD':
-			if len(standardconc) == 0:
-				self.warning('Standard gas information missing!')
-			else:
-				for i in range(0,len(standardconc)):
-					self.write_standard_conc(standardconc[i][0],standardconc[i][1],standardconc[i][2])
+			# write standard gas information:
+			if typ == 'STANDARD':
+				if len(standardconc) == 0:
+					self.warning('Standard gas information missing!')
+				else:
+					for i in range(0,len(standardconc)):
+						self.write_standard_conc(standardconc[i][0],standardconc[i][1],standardconc[i][2])
 
 
 
@@ -322,17 +1102,10 @@ class datafile:
 		"""
 		
 		# remove whitespace / spaces:
-		caller 		= caller.replace(' ','')
-		label 		= label.replace(' ','')
 		identifier	= identifier.replace(' ','')
 		
-		# combine CALLER and LABEL part:
-		if not (label == caller):
-			if not (label == ''):
-				caller = caller + '[' + label + ']'			
-		
 		# combine all fields:
-		S = caller + ' ' + identifier + ': ' + data
+		S = self._source(caller,label) + ' ' + identifier + ': ' + data
 		
 		# make sure the string contains no newlines and line breaks:
 		S = S.replace('\n', '').replace('\r', '')
@@ -340,12 +1113,125 @@ class datafile:
 		# format line:
 		S = str(timestmp) + ' ' + S + '\n'
 
-		# write to file:
-		try:
-			self.fid.write(S)	# write line to data file
-			self.fid.flush()	# make sure data gets written to file now, don't wait for flushing file buffer
-		except IOError as e:
-			self.warning ('could not write to file ' + self.fid.name + ': ' + e)
+		self._put(S)
+
+
+	########################################################################################################
+
+
+	def _source(self,caller,label):
+		"""
+		src = datafile._source(caller,label)
+		
+		Return data source string (format: CALLER[LABEL]). If LABEL == '' or LABEL == CALLER, the [LABEL] part is omitted.
+		
+		INPUT:
+		caller: type of calling object, i.e. the "data origin" (string)
+		label: name/label of the calling object (string)
+		
+		OUTPUT:
+		src: data source (string, without white space)
+		"""
+		
+		# remove whitespace / spaces:
+		caller 		= caller.replace(' ','')
+		label 		= label.replace(' ','')
+		
+		# combine CALLER and LABEL part:
+		if not (label == caller):
+			if not (label == ''):
+				caller = caller + '[' + label + ']'			
+
+		return caller
+
+
+	########################################################################################################
+
+
+	def _put(self,S):
+		"""
+		datafile._put(S)
+		
+		Write a formatted text line or binary record to the data file, or put it into the queue of the writer thread (see datafile.set_async_write).
+		
+		INPUT:
+		S: text line (string) or binary record (bytes)
+		
+		OUTPUT:
+		(none)
+		"""
+
+		with self._put_lock: # keep the order of the lines if data are written from several threads
+			if self._queue is None:
+				# write to file now:
+				self._write_line(S)
+			else:
+				# leave the line to the writer thread:
+				try:
+					self._queue.put_nowait(S)
+				except queue.Full: # writer thread does not keep up, wait until there is space in the queue
+					t = time.time()
+					self._queue.put(S)
+					self._async_stats['blocked'] = self._async_stats['blocked'] + 1
+					self._async_stats['blocked_time'] = self._async_stats['blocked_time'] + time.time() - t
+				self._async_stats['lines'] = self._async_stats['lines'] + 1
+				n = self._queue.qsize()
+				if n > self._async_stats['max_queued']:
+					self._async_stats['max_queued'] = n
+
+
+	########################################################################################################
+
+
+	def _write_line(self,S):
+		"""
+		datafile._write_line(S)
+		
+		Write a formatted line to the data file (or a record to the binary data file) and flush the file according to the flush policy (see datafile.writeln).
+		
+		INPUT:
+		S: line (string, including the newline character) or binary record (bytes)
+		
+		OUTPUT:
+		(none)
+		"""
+
+		with self._lock: # only one thread at a time writes to the file
+
+			if isinstance(S,bytes):
+				# write to binary file:
+				try:
+					if self._bincompressor is None:
+						self._binfid.write(S)
+					else:
+						self._binfid.write( self._bincompressor.compress(S) )
+				except (IOError,ValueError,AttributeError) as e:
+					self.warning ('could not write to binary file: ' + str(e))
+				return
+
+			# write to file:
+			try:
+				if self._compressor is None:
+					self.fid.write(S)	# write line to data file
+				else:
+					self.fid.write( self._compressor.compress(S.encode('utf-8')) )
+			except (IOError,ValueError) as e:
+				self.warning ('could not write to file ' + str(self.name()) + ': ' + str(e))
+				return
+
+			# add line to index:
+			if self._idx is not None:
+				n = len(S.encode('utf-8'))
+				if ( self._compressor is None ) and ( not os.linesep == '\n' ):
+					n = n + len(os.linesep) - 1 # newline is written as os.linesep in text mode
+				self._index_add(S,n)
+
+			# flush file buffer according to flush policy (see set_flush_policy):
+			self._unflushed = self._unflushed + 1
+			if ( self._flush_lines > 0 ) and ( self._unflushed >= self._flush_lines ):
+				self._flush_file()
+			elif ( self._flush_interval > 0 ) and ( time.time() - self._last_flush >= self._flush_interval ):
+				self._flush_file()
 
 
 	########################################################################################################
@@ -438,6 +1324,7 @@ class datafile:
 		
 		s = 'mz=' + str(mz) + ' ; intensity=' + str(intensity) + ' ' + unit + ' ; detector=' + det + ' ; gate=' + str(gate) + ' s'
 		self.writeln(caller,label,'PEAK',s,timestmp)
+		self._bin_record( _BIN_PEAK , { 't': timestmp , 'mz': mz , 'intensity': intensity , 'gate': gate } , caller , label , { 'unit': unit , 'det': det } )
 
 
 	########################################################################################################
@@ -472,6 +1359,7 @@ class datafile:
 		
 		s = 'mz=' + str(mz) + ' ; mz-offset=' + offset + ' ; intensity=' + str(intensity) + ' ' + unit + ' ; detector=' + det + ' ; gate=' + str(gate) + ' s'
 		self.writeln(caller,label,'ZERO',s,timestmp)
+		self._bin_record( _BIN_ZERO , { 't': timestmp , 'mz': mz , 'mz_offset': mz_offset , 'intensity': intensity , 'gate': gate } , caller , label , { 'unit': unit , 'det': det } )
 
 
 	########################################################################################################
@@ -486,8 +1374,8 @@ class datafile:
 		INPUT:
 		caller: type of calling object, i.e. the "data origin" (string)
 		label: name/label of the calling object (string)
-		mz: mz values (floats)
-		intensity: intensity values (floats)
+		mz: mz values (floats, list or numpy array)
+		intensity: intensity values (floats, list or numpy array)
 		unit: unit of intensity values (string)
 		det: detector (string), e.g., det='F' for Faraday or det='M' for multiplier
 		gate: gate time (float)
@@ -497,8 +1385,19 @@ class datafile:
 		(none)
 		"""
 		
+		# binary data (float32 mz values, float64 intensity values):
+		m = numpy.asarray(mz,dtype='<f4')
+		y = numpy.asarray(intensity,dtype='<f8')
+
+		# convert numpy arrays to lists (to get the same format in the data file):
+		if hasattr(mz,'tolist'):
+			mz = mz.tolist()
+		if hasattr(intensity,'tolist'):
+			intensity = intensity.tolist()
+
 		s = 'mz=' + str(mz) + ' ; intensity=' + str(intensity) + ' ' + unit + '; detector=' + det + ' ; gate=' + str(gate) + ' s'
 		self.writeln(caller,label,'SCAN',s,timestmp)
+		self._bin_record( _BIN_SCAN , { 't': timestmp , 'gate': gate , 'N': len(m) } , caller , label , { 'unit': unit , 'det': det } , ( m , y ) )
 
 
 	########################################################################################################
@@ -547,6 +1446,7 @@ class datafile:
 				
 		s = str(value) + ' ' + unit
 		self.writeln(caller,label,'PRESSURE',s,timestmp)
+		self._bin_record( _BIN_PRESSURE , { 't': timestmp , 'value': value } , caller , label , { 'unit': unit } )
 
 
 	########################################################################################################
@@ -571,3 +1471,4 @@ class datafile:
 				
 		s = str(value) + ' ' + unit
 		self.writeln(caller,label,'TEMPERATURE',s,timestmp)
+		self._bin_record( _BIN_TEMPERATURE , { 't': timestmp , 'value': value } , caller , label , { 'unit': unit } )
@@ -0,0 +1,525 @@
+# Code for the datafile_reader class
+# 
+# DISCLAIMER:
+# This file is part of ruediPy, a toolbox for operation of RUEDI mass spectrometer systems.
+# 
+# ruediPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# ruediPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with ruediPy.  If not, see <http://www.gnu.org/licenses/>.
+# 
+# ruediPy: toolbox for operation of RUEDI mass spectrometer systems
+# Copyright (C) 2016  Matthias Brennwald
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2016, 2017, Matthias Brennwald (brennmat@gmail.com)
+
+
+import sys
+import warnings
+import os
+import re
+import glob
+import numpy
+import concurrent.futures
+import multiprocessing
+import functools
+import mmap
+from os.path 		import expanduser
+
+from classes.misc	import misc
+from classes.datafile	import datafile
+
+# check Python version and print warning if we're running version < 3:
+if ( sys.version_info[0] < 3 ):
+	warnings.warn("ruediPy / datafile_reader class is running on Python version < 3. Version 3.0 or newer is recommended!")
+
+
+# data fields of the common data types ("fast path"): regular expression and (name,type) of the matched fields
+_FIELDS = {
+	'PEAK':        ( r'mz=(\S+) ; intensity=(\S+) (\S*) ; detector=(\S+) ; gate=(\S+) s' ,
+	                 [ ('mz','f8') , ('intensity','f8') , ('unit','U') , ('det','U') , ('gate','f8') ] ),
+	'ZERO':        ( r'mz=(\S+) ; (?:mz-offset=(\S+) ; )?intensity=(\S+) (\S*) ; detector=(\S+) ; gate=(\S+) s' ,
+	                 [ ('mz','f8') , ('mz_offset','f8') , ('intensity','f8') , ('unit','U') , ('det','U') , ('gate','f8') ] ),
+	'PRESSURE':    ( r'(\S+) ?(\S*)' ,
+	                 [ ('value','f8') , ('unit','U') ] ),
+	'TEMPERATURE': ( r'(\S+) ?(\S*)' ,
+	                 [ ('value','f8') , ('unit','U') ] ),
+	'POSITION':    ( r'(?:position=)?(\S+)' ,
+	                 [ ('position','f8') ] ),
+	'SCAN':        ( r'(mz=\[.*\] ; intensity=\[.*\]) ?(\S*) ?; detector=(\S+) ; gate=(\S+) s' ,
+	                 [ ('line','U') , ('unit','U') , ('det','U') , ('gate','f8') ] )
+}
+
+# data fields of complete data lines (EPOCHTIME DATASOURCE[LABEL] TYPE: DATA) of the common data types:
+_LINES = { typ: re.compile( r'^(\S+) \S+ ' + typ + r': ' + _FIELDS[typ][0] + r'\r?$' , re.MULTILINE ) for typ in _FIELDS }
+
+
+class datafile_reader:
+	"""
+	ruediPy class for reading ruediPy data files (see datafile class). The data of each data source (e.g. 'RGA_SRS[MS]') and data type (e.g. 'PEAK') are read into a table (numpy structured array), with one column for each data field (e.g. 't', 'mz', 'intensity', 'unit', 'det', 'gate').
+	
+	EXAMPLE:
+	R = datafile_reader('~/ruedi_data/2016-04-04_11-43-02.txt')
+	P = R.table('RGA_SRS[RGA-MS]','PEAK')
+	k = P['mz'] == 40
+	plot( P['t'][k] , P['intensity'][k] )
+	"""
+	
+	########################################################################################################
+	
+
+	def __init__(self,files,processes=None,select=None):
+		"""
+		obj = datafile_reader.__init__(files,processes=None,select=None)
+		
+		Initialize DATAFILE_READER object and read the data file(s)
+		
+		INPUT:
+		files: name of the data file (string), file name pattern with wildcards (string, e.g. '~/ruedi_data/2016-04-*.txt'), or list of file names. Compressed data files are decompressed (see datafile.set_compression). The data of all files are combined in the tables in the order of the file names (the 'file' column of the tables contains the index of the file in the list of files, see datafile_reader.files).
+		processes (optional): number of processes used to read the files in parallel. If processes = None, the number of CPU cores is used. If processes = 1, the files are read one after the other in the current process. Default: processes = None
+		select (optional): only read the data lines of the given data sources and types (list of (source,type) tuples, source = None for all data sources of a given type). Uncompressed files are then searched for these lines without reading the whole file into memory (see datafile_reader.read_file). Default: select = None (read all data lines)
+		
+		EXAMPLE:
+		R = datafile_reader( '~/ruedi_data/*.txt' , select = [ ('RGA_SRS[MS]','PEAK') , (None,'PRESSURE') ] )
+		
+		OUTPUT:
+		obj: datafile_reader object
+		"""
+
+		if isinstance(files,str):
+			files = [files]
+		
+		# expand tilde and wildcards:
+		names = []
+		for f in files:
+			f = f.strip()
+			if f[0] == '~':
+				f = f.replace("~", expanduser("~"))
+			u = sorted(glob.glob(f))
+			if len(u) == 0:
+				self.warning ('could not find file ' + f + '.')
+			names = names + u
+		self._files = names
+
+		# read the files:
+		if processes is None:
+			processes = os.cpu_count() or 1
+		processes = min( processes , len(self._files) )
+		if processes > 1:
+			# read files in parallel (the results are returned in the order of the files):
+			try:
+				if 'fork' in multiprocessing.get_all_start_methods():
+					ctx = multiprocessing.get_context('fork') # the ruediPy scripts are not protected by "if __name__ == '__main__'", so they can't be imported again by a spawned process
+				else:
+					ctx = None # default start method
+				with concurrent.futures.ProcessPoolExecutor(max_workers=processes,mp_context=ctx) as pool:
+					T = list( pool.map( functools.partial(datafile_reader.read_file,select=select) , self._files ) )
+			except (OSError,concurrent.futures.process.BrokenProcessPool) as e:
+				self.warning ('could not read files in parallel (' + str(e) + '), reading files one after the other...')
+				processes = 1
+		if processes <= 1:
+			T = [ datafile_reader.read_file(f,select) for f in self._files ]
+
+		# combine the tables of all files:
+		self._tables = {}
+		for key in sorted( set( [ k for t in T for k in t ] ) ):
+			u = [ datafile_reader._add_file_index(T[i][key],i) for i in range(len(T)) if key in T[i] ]
+			if len(u) == 1:
+				self._tables[key] = u[0]
+			else:
+				self._tables[key] = numpy.concatenate( datafile_reader._common_dtype(u) )
+		
+		self._scans = {} # parsed SCAN data (see datafile_reader.scan)
+
+	
+	########################################################################################################
+	
+
+	def label(self):
+		"""
+		lab = datafile_reader.label()
+		
+		Return label / name of the DATAFILE_READER object
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		lab: label / name (string)
+		"""
+		
+		return 'DATAFILE_READER'
+
+	
+	########################################################################################################
+	
+
+	def warning(self,msg):
+		"""
+		datafile_reader.warning(msg)
+		
+		Warn about issues related to DATAFILE_READER object
+		
+		INPUT:
+		msg: warning message (string)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		misc.warnmessage ('DATAFILE_READER',msg)
+
+	
+	########################################################################################################
+	
+
+	def files(self):
+		"""
+		f = datafile_reader.files()
+		
+		Return the names of the data files that were read
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		f: file names (list of strings)
+		"""
+		
+		return list(self._files)
+
+	
+	########################################################################################################
+	
+
+	def keys(self):
+		"""
+		k = datafile_reader.keys()
+		
+		Return the data sources and types available in the data
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		k: list of (source,type) tuples, e.g. [ ('RGA_SRS[MS]','PEAK') , ('RGA_SRS[MS]','ZERO') , ... ]
+		"""
+		
+		return list(self._tables.keys())
+
+	
+	########################################################################################################
+	
+
+	def table(self,source,typ):
+		"""
+		X = datafile_reader.table(source,typ)
+		
+		Return the table with the data of a given data source and type.
+		
+		INPUT:
+		source: data source (string, e.g. 'RGA_SRS[MS]', see datafile_reader.keys)
+		typ: data type (string, e.g. 'PEAK')
+		
+		OUTPUT:
+		X: numpy structured array with one entry for each data line. The columns depend on the data type:
+			'PEAK': t, mz, intensity, unit, det, gate
+			'ZERO': t, mz, mz_offset, intensity, unit, det, gate (mz_offset = NaN if not given in the data file)
+			'PRESSURE', 'TEMPERATURE': t, value, unit
+			'POSITION': t, position
+			'SCAN': t, unit, det, gate, line (the mz and intensity values are read on demand, see datafile_reader.scan)
+			other types: t, data (text of the data field)
+		All tables also have a 'file' column with the index of the data file that contained the data line (see datafile_reader.files).
+		If there are no data, an empty array is returned.
+		"""
+		
+		if (source,typ) in self._tables:
+			return self._tables[(source,typ)]
+		
+		self.warning ('no ' + typ + ' data from ' + source + '.')
+		return numpy.zeros( 0 , dtype = [ ('t','f8') , ('data','U1') , ('file','i4') ] )
+
+	
+	########################################################################################################
+	
+
+	def scan(self,source,i):
+		"""
+		mz,intensity = datafile_reader.scan(source,i)
+		
+		Return the mz and intensity values of a SCAN. The mz and intensity values of SCAN data lines are only read when they are needed (reading them for all SCANs may be slow).
+		
+		INPUT:
+		source: data source (string, e.g. 'RGA_SRS[MS]', see datafile_reader.keys)
+		i: index of the SCAN in the 'SCAN' table of the data source (see datafile_reader.table)
+		
+		OUTPUT:
+		mz: mz values (numpy array)
+		intensity: intensity values (numpy array, see the 'unit' column of the 'SCAN' table for the unit)
+		"""
+		
+		if not (source,i) in self._scans:
+			line = self.table(source,'SCAN')['line'][i]
+			u = line.split('[')
+			mz = numpy.array( u[1].split(']')[0].split(',') , dtype=float )
+			intensity = numpy.array( u[2].split(']')[0].split(',') , dtype=float )
+			self._scans[(source,i)] = ( mz , intensity )
+		
+		return self._scans[(source,i)]
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def read_file(filename,select=None):
+		"""
+		X = datafile_reader.read_file(filename,select=None)
+		
+		Read a data file into tables (see datafile_reader.table). The lines of the common data types (PEAK, ZERO, PRESSURE, TEMPERATURE, POSITION, SCAN) are split into their data fields with a regular expression that works on all lines of a data source and type at once, and the numbers are converted column by column. The mz and intensity values of SCAN lines are not converted (see datafile_reader.scan). Data lines that do not match the expected format are skipped (with a warning).
+		
+		INPUT:
+		filename: file name (string)
+		select (optional): only read the data lines of the given data sources and types (list of (source,type) tuples, source = None for all data sources of a given type). Uncompressed files are memory-mapped and searched for these lines, and only the matching lines are read (the memory needed does not depend on the size of the file, but on the amount of selected data). Default: select = None (read all data lines)
+		
+		OUTPUT:
+		X: dict with one table (numpy structured array) for each (source,type) pair
+		"""
+		
+		if ( select is not None ) and ( os.path.splitext(filename)[1] not in ('.gz','.xz','.zst') ):
+			lines = datafile_reader._select_lines(filename,select)
+		else:
+			lines = datafile.read_raw(filename).decode('utf-8',errors='replace').splitlines()
+
+		# sort lines by data source and type:
+		G = {}
+		bad = 0
+		for line in lines:
+			u = line.split(' ',3)
+			if ( len(u) < 3 ) or ( not u[2][-1:] == ':' ):
+				if line.strip():
+					bad = bad + 1
+				continue
+			key = ( u[1] , u[2][:-1] )
+			if key in G:
+				G[key].append(line)
+			else:
+				G[key] = [line]
+		del lines
+		
+		# remove data that were not selected:
+		if select is not None:
+			for key in list(G.keys()):
+				if not ( ( key in select ) or ( (None,key[1]) in select ) ):
+					del G[key]
+		if bad > 0:
+			misc.warnmessage ('DATAFILE_READER','Skipping ' + str(bad) + ' line(s) with unexpected format in ' + filename + '.')
+
+		X = {}
+		for key in G:
+			source,typ = key
+			lines = G[key]
+			
+			if typ in _FIELDS:
+				# common data types ("fast path"), split all lines into their data fields at once:
+				fields = [ ('t','f8') ] + _FIELDS[typ][1]
+				u = _LINES[typ].findall( '\n'.join(lines) )
+				if len(u) < len(lines):
+					misc.warnmessage ('DATAFILE_READER','Skipping ' + str(len(lines)-len(u)) + ' ' + typ + ' line(s) with unexpected format from ' + source + ' in ' + filename + '.')
+				n = len(u)
+				if n > 0:
+					u = [ numpy.array(c,dtype=str) for c in zip(*u) ] # one array for each field
+				else:
+					u = [ numpy.zeros(0,dtype='U1') ] * len(fields)
+				dt = []
+				for i in range(len(fields)):
+					if fields[i][1] == 'U':
+						dt.append( ( fields[i][0] , u[i].dtype ) )
+					else:
+						dt.append( fields[i] )
+				tab = numpy.zeros( n , dtype = dt )
+				for i in range(len(fields)):
+					if fields[i][1] == 'f8':
+						tab[fields[i][0]] = datafile_reader._to_float(u[i])
+					else:
+						tab[fields[i][0]] = u[i]
+			
+			else:
+				# other data types (COMMENT etc.), keep data text:
+				u = [ line.split(' ',3) for line in lines ]
+				t = numpy.array( [ v[0] for v in u ] )
+				data = numpy.array( [ v[3] if len(v) > 3 else '' for v in u ] , dtype=str )
+				tab = numpy.zeros( len(u) , dtype = [ ('t','f8') , ('data',data.dtype) ] )
+				tab['t'] = datafile_reader._to_float(t)
+				tab['data'] = data
+			
+			X[key] = tab
+
+		return X
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def _select_lines(filename,select):
+		"""
+		lines = datafile_reader._select_lines(filename,select)
+		
+		Search a data file for the data lines of given data sources and types, without reading the whole file into memory (the file is memory-mapped, and only the matching lines are decoded). If there is an index file for the data file (see datafile.set_index), the lines are read at the positions given in the index file without searching the file.
+		
+		INPUT:
+		filename: file name (string)
+		select: data sources and types (list of (source,type) tuples, source = None for all data sources of a given type)
+		
+		OUTPUT:
+		lines: data lines (list of strings, in the order of the file)
+		"""
+		
+		# use index file, if available and up to date (see datafile.set_index):
+		idx = datafile.read_index(filename)
+		if ( idx is not None ) and ( os.path.getmtime(filename+'.idx') < os.path.getmtime(filename) ):
+			idx = None
+
+		found = {} # data lines, keyed by the position of the line in the file (a line matching several selections is returned only once)
+		with open(filename,'rb') as f:
+			if os.fstat(f.fileno()).st_size == 0:
+				return []
+			with mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ) as mm:
+				if idx is not None:
+					# read the lines at the positions given in the index:
+					for key in idx['records']:
+						source,typ = key.split(' ',1)
+						if ( (source,typ) in select ) or ( (None,typ) in select ):
+							for start in idx['records'][key]['offset']:
+								end = mm.find(b'\n',start)
+								if end < 0:
+									end = len(mm)
+								found[start] = mm[start:end].decode('utf-8',errors='replace').rstrip('\r')
+					select = [] # done
+				
+				# search for the lines:
+				for source,typ in select:
+					if source is None:
+						key = b' ' + typ.encode('utf-8') + b': ' # any source, check the line start below
+					else:
+						key = b' ' + source.encode('utf-8') + b' ' + typ.encode('utf-8') + b': '
+					pos = mm.find(key)
+					while pos >= 0:
+						start = mm.rfind(b'\n',0,pos) + 1 # start of line
+						end = mm.find(b'\n',pos)
+						if end < 0:
+							end = len(mm)
+						head = mm[start:pos] # timestamp (and source)
+						if head.count(b' ') == ( 0 if source is not None else 1 ):
+							found[start] = mm[start:end].decode('utf-8',errors='replace').rstrip('\r')
+						pos = mm.find(key,end)
+		
+		return [ found[start] for start in sorted(found) ] # keep the order of the lines in the file
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def _to_float(v):
+		"""
+		x = datafile_reader._to_float(v)
+		
+		Convert strings to numbers. Empty strings (missing values, e.g. mz-offset in old data files) and strings that are not numbers are converted to NaN.
+		
+		INPUT:
+		v: strings (numpy array)
+		
+		OUTPUT:
+		x: numbers (numpy array)
+		"""
+		
+		try:
+			return v.astype(float)
+		except ValueError: # convert value by value
+			x = numpy.empty(len(v))
+			for i in range(len(v)):
+				try:
+					x[i] = float(v[i])
+				except ValueError: # empty or not a number
+					x[i] = numpy.nan
+			return x
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def _add_file_index(tab,i):
+		"""
+		T = datafile_reader._add_file_index(tab,i)
+		
+		Add 'file' column with file index to a table.
+		
+		INPUT:
+		tab: table (numpy structured array)
+		i: file index (integer)
+		
+		OUTPUT:
+		T: table with 'file' column (numpy structured array)
+		"""
+		
+		T = numpy.zeros( len(tab) , dtype = tab.dtype.descr + [ ('file','i4') ] )
+		for name in tab.dtype.names:
+			T[name] = tab[name]
+		T['file'] = i
+		
+		return T
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def _common_dtype(tables):
+		"""
+		T = datafile_reader._common_dtype(tables)
+		
+		Convert tables of the same data type to the same dtype (the string columns may have different lengths in different files), so they can be concatenated.
+		
+		INPUT:
+		tables: list of tables (numpy structured arrays with the same column names)
+		
+		OUTPUT:
+		T: list of tables with the same dtype
+		"""
+		
+		dt = []
+		for name in tables[0].dtype.names:
+			u = [ t.dtype[name] for t in tables ]
+			if u[0].kind == 'U':
+				dt.append( ( name , 'U' + str(max([ x.itemsize//4 for x in u ])) ) )
+			else:
+				dt.append( ( name , u[0] ) )
+		
+		return [ t.astype(dt) for t in tables ]
+
+
+	########################################################################################################
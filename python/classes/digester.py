@@ -0,0 +1,443 @@
+# Code for the digester class
+# 
+# DISCLAIMER:
+# This file is part of ruediPy, a toolbox for operation of RUEDI mass spectrometer systems.
+# 
+# ruediPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# ruediPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with ruediPy.  If not, see <http://www.gnu.org/licenses/>.
+# 
+# ruediPy: toolbox for operation of RUEDI mass spectrometer systems
+# Copyright (C) 2016  Matthias Brennwald
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2016, 2017, Matthias Brennwald (brennmat@gmail.com)
+
+
+import sys
+import warnings
+import time
+import numpy
+
+from classes.misc	import misc
+
+# check Python version and print warning if we're running version < 3:
+if ( sys.version_info[0] < 3 ):
+	warnings.warn("ruediPy / digester class is running on Python version < 3. Version 3.0 or newer is recommended!")
+
+
+class digester:
+	"""
+	ruediPy class for "digesting" PEAK and ZERO data while they are measured (streaming version of octave/rP_digest_step_RGA_SRS.m). For each mz / detector combination, the ZERO values are interpolated to the times of the PEAK values and subtracted from the PEAK values (net peak heights). The mean and the error of the mean of the net peak heights, and the means and variances of the PEAK and ZERO values, are updated with each new value (Welford's method), so the digester does not keep the data (only the PEAK values measured after the last ZERO are kept until the next ZERO is available for interpolation).
+	
+	The digester has the same write_peak and write_zero methods as the datafile class, so it can be used in place of a datafile object, or it can be attached to an rgams_SRS object (see rgams_SRS.set_digester).
+	
+	EXAMPLE:
+	D = digester()
+	MS.set_digester(D)
+	MS.peak_zero_loop ( ... )
+	D.print_summary()
+	D.clear() # start new step
+	"""
+	
+	########################################################################################################
+	
+
+	def __init__(self,label='DIGESTER'):
+		"""
+		obj = digester.__init__(label='DIGESTER')
+		
+		Initialize DIGESTER object
+		
+		INPUT:
+		label (optional): label / name of the DIGESTER object (string). Default: label = 'DIGESTER'
+		
+		OUTPUT:
+		obj: digester object
+		"""
+
+		self._label = label
+		self.clear()
+
+	
+	########################################################################################################
+	
+
+	def label(self):
+		"""
+		lab = digester.label()
+		
+		Return label / name of the DIGESTER object
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		lab: label / name (string)
+		"""
+		
+		return self._label
+
+	
+	########################################################################################################
+	
+
+	def warning(self,msg):
+		"""
+		digester.warning(msg)
+		
+		Warn about issues related to DIGESTER object
+		
+		INPUT:
+		msg: warning message (string)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		misc.warnmessage (self.label(),msg)
+
+	
+	########################################################################################################
+	
+
+	def clear(self):
+		"""
+		digester.clear()
+		
+		Clear all data (e.g. to start a new analysis step)
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		self._data = {} # data of each mz / detector combination (see digester._entry)
+
+	
+	########################################################################################################
+	
+
+	def _entry(self,source,mz,det,unit):
+		"""
+		X = digester._entry(source,mz,det,unit)
+		
+		Return the data of an mz / detector combination (new empty data if there are no data yet).
+		
+		INPUT:
+		source: data source (string, e.g. 'RGA_SRS[MS]')
+		mz: mz value
+		det: detector (string)
+		unit: unit of the intensity values (string)
+		
+		OUTPUT:
+		X: dict with the data of the mz / detector combination:
+			'unit': unit of the intensity values
+			'peak', 'zero': running statistics of PEAK and ZERO values ([N,mean,M2], see digester._welford)
+			'net': running statistics of net peak heights (PEAK-ZERO)
+			'time': running statistics of the PEAK times
+			'zero_last': time and value of the last ZERO ((t,val), or None if there was no ZERO yet)
+			'pending': PEAK values (t,val) measured after the last ZERO (waiting for the next ZERO)
+		"""
+		
+		key = ( source , float(mz) , det.replace(' ','') )
+		if not key in self._data:
+			self._data[key] = { 'unit': unit , 'peak': [0,0.0,0.0] , 'zero': [0,0.0,0.0] , 'net': [0,0.0,0.0] , 'time': [0,0.0,0.0] , 'zero_last': None , 'pending': [] }
+		X = self._data[key]
+		if not unit == X['unit']:
+			self.warning ('unit of mz=' + str(mz) + ' / detector=' + det + ' changed from ' + X['unit'] + ' to ' + unit + '!')
+		
+		return X
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def _welford(w,x):
+		"""
+		digester._welford(w,x)
+		
+		Add value to running statistics (Welford's method).
+		
+		INPUT:
+		w: running statistics [N,mean,M2] with the number of values, their mean, and the sum of squared differences from the mean (list, is updated)
+		x: value
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		w[0] = w[0] + 1
+		d = x - w[1]
+		w[1] = w[1] + d / w[0]
+		w[2] = w[2] + d * ( x - w[1] )
+
+	
+	########################################################################################################
+	
+
+	def write_peak(self,caller,label,mz,intensity,unit,det,gate,timestmp):
+		"""
+		digester.write_peak(caller,label,mz,intensity,unit,det,gate,timestmp)
+		
+		Add PEAK value (same arguments as datafile.write_peak).
+		
+		INPUT:
+		caller: type of calling object, i.e. the "data origin" (string)
+		label: name/label of the calling object (string)
+		mz: mz value (integer)
+		intensity: peak intensity value (float)
+		unit: unit of peak intensity value (string)
+		det: detector (string), e.g., det='F' for Faraday or det='M' for multiplier
+		gate: gate time (float)
+		timestmp: timestamp of the peak measurement (see misc.now_UNIX)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		X = self._entry( digester._source(caller,label) , mz , det , unit )
+		digester._welford( X['peak'] , intensity )
+		digester._welford( X['time'] , timestmp )
+		if X['zero_last'] is None:
+			X['pending'].append( (timestmp,intensity) ) # wait for first ZERO
+		elif timestmp <= X['zero_last'][0]:
+			digester._welford( X['net'] , intensity - X['zero_last'][1] ) # PEAK before last ZERO (data are not in chronological order)
+		else:
+			X['pending'].append( (timestmp,intensity) ) # wait for next ZERO for interpolation
+
+	
+	########################################################################################################
+	
+
+	def write_zero(self,caller,label,mz,mz_offset,intensity,unit,det,gate,timestmp):
+		"""
+		digester.write_zero(caller,label,mz,mz_offset,intensity,unit,det,gate,timestmp)
+		
+		Add ZERO value (same arguments as datafile.write_zero). The net peak heights of the PEAK values measured since the previous ZERO are determined using linear interpolation of the ZERO values. PEAK values measured before the first ZERO use the first ZERO value.
+		
+		INPUT:
+		caller: type of calling object, i.e. the "data origin" (string)
+		label: name/label of the calling object (string)
+		mz: mz value (integer)
+		mz_offset: mz offset value (integer)
+		intensity: zero intensity value (float)
+		unit: unit of peak intensity value (string)
+		det: detector (string), e.g., det='F' for Faraday or det='M' for multiplier
+		gate: gate time (float)
+		timestmp: timestamp of the zero measurement (see misc.now_UNIX)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		X = self._entry( digester._source(caller,label) , mz , det , unit )
+		digester._welford( X['zero'] , intensity )
+		
+		for tp,p in X['pending']:
+			if ( X['zero_last'] is None ) or ( timestmp <= X['zero_last'][0] ):
+				z = intensity
+			else: # interpolate between last and current ZERO
+				t0,z0 = X['zero_last']
+				z = z0 + ( intensity - z0 ) * ( tp - t0 ) / ( timestmp - t0 )
+			digester._welford( X['net'] , p - z )
+		X['pending'] = []
+		
+		X['zero_last'] = ( timestmp , intensity )
+
+	
+	########################################################################################################
+	
+
+	def add_tables(self,source,peaks,zeros):
+		"""
+		digester.add_tables(source,peaks,zeros)
+		
+		Add PEAK and ZERO data from tables (e.g. from a data file, see datafile_reader.table). The values are added in chronological order.
+		
+		INPUT:
+		source: data source (string, e.g. 'RGA_SRS[MS]')
+		peaks: PEAK table (numpy structured array with fields t, mz, intensity, unit, det, gate)
+		zeros: ZERO table (numpy structured array with fields t, mz, mz_offset, intensity, unit, det, gate)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		t = numpy.concatenate( ( peaks['t'] , zeros['t'] ) )
+		is_zero = numpy.concatenate( ( numpy.zeros(len(peaks),dtype=bool) , numpy.ones(len(zeros),dtype=bool) ) )
+		k = numpy.argsort(t,kind='stable')
+		for i in k:
+			if is_zero[i]:
+				z = zeros[i-len(peaks)]
+				self.write_zero( source , '' , z['mz'] , z['mz_offset'] , z['intensity'] , z['unit'] , z['det'] , z['gate'] , z['t'] )
+			else:
+				p = peaks[i]
+				self.write_peak( source , '' , p['mz'] , p['intensity'] , p['unit'] , p['det'] , p['gate'] , p['t'] )
+
+	
+	########################################################################################################
+	
+
+	def result(self):
+		"""
+		X = digester.result()
+		
+		Return the current results for all mz / detector combinations (same results as octave/rP_digest_step_RGA_SRS.m). PEAK values measured after the last ZERO use the last ZERO value. If there are no ZERO values for an mz / detector combination, the PEAK values are used without baseline correction.
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		X: numpy structured array with one entry for each data source and mz / detector combination, with the following fields:
+			source: data source (string)
+			mz: mz value
+			det: detector (string)
+			mean: mean of net peak heights (PEAK-ZERO)
+			mean_err: error of the mean (standard deviation / sqrt(N-1), as in rP_digest_step_RGA_SRS.m). NaN if N < 2.
+			unit: unit of mean and mean_err (string)
+			time: mean time of the PEAK values (epoch time)
+			N: number of PEAK values
+			peak_mean, peak_std: mean and standard deviation of the PEAK values
+			zero_mean, zero_std: mean and standard deviation of the ZERO values (NaN if there are no ZERO values)
+		"""
+		
+		R = []
+		for key in sorted(self._data.keys()):
+			X = self._data[key]
+			if X['peak'][0] == 0: # no PEAK values
+				continue
+			
+			net = list(X['net'])
+			if X['zero_last'] is None:
+				self.warning ('found no ZEROs for mz=' + str(int(key[1])) + ' and detector=' + key[2] + ', skipping baseline compensation...')
+				z = 0.0
+			else:
+				z = X['zero_last'][1]
+			for tp,p in X['pending']:
+				digester._welford( net , p - z )
+			
+			N = net[0]
+			if N > 1:
+				err = numpy.sqrt( net[2] / (N-1) ) / numpy.sqrt(N-1)
+			else:
+				err = numpy.nan
+			R.append( ( key[0] , key[1] , key[2] , net[1] , err , X['unit'] , X['time'][1] , N , X['peak'][1] , digester._std(X['peak']) , digester._mean(X['zero']) , digester._std(X['zero']) ) )
+		
+		return numpy.array( R , dtype = [ ('source','U64') , ('mz','f8') , ('det','U8') , ('mean','f8') , ('mean_err','f8') , ('unit','U8') , ('time','f8') , ('N','i8') , ('peak_mean','f8') , ('peak_std','f8') , ('zero_mean','f8') , ('zero_std','f8') ] )
+
+	
+	########################################################################################################
+	
+
+	def print_summary(self):
+		"""
+		digester.print_summary()
+		
+		Print the current results (see digester.result)
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		for r in self.result():
+			print ( 'mz=%i, detector=%s: MEAN = %g +/- %g %s (%s UTC)' % ( int(r['mz']) , r['det'] , r['mean'] , r['mean_err'] , r['unit'] , time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(r['time'])) ) )
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def _mean(w):
+		"""
+		m = digester._mean(w)
+		
+		Return mean of running statistics (see digester._welford)
+		
+		INPUT:
+		w: running statistics [N,mean,M2]
+		
+		OUTPUT:
+		m: mean (NaN if N = 0)
+		"""
+		
+		if w[0] == 0:
+			return numpy.nan
+		return w[1]
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def _std(w):
+		"""
+		s = digester._std(w)
+		
+		Return standard deviation of running statistics (see digester._welford)
+		
+		INPUT:
+		w: running statistics [N,mean,M2]
+		
+		OUTPUT:
+		s: standard deviation (NaN if N < 2)
+		"""
+		
+		if w[0] < 2:
+			return numpy.nan
+		return numpy.sqrt( w[2] / (w[0]-1) )
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def _source(caller,label):
+		"""
+		src = digester._source(caller,label)
+		
+		Return data source string (format: CALLER[LABEL], see datafile.writeln)
+		
+		INPUT:
+		caller: type of calling object, i.e. the "data origin" (string)
+		label: name/label of the calling object (string)
+		
+		OUTPUT:
+		src: data source (string)
+		"""
+		
+		caller = caller.replace(' ','')
+		label = label.replace(' ','')
+		if ( label == caller ) or ( label == '' ):
+			return caller
+		return caller + '[' + label + ']'
+
+
+	########################################################################################################
@@ -274,3 +274,125 @@ class misc:
 									
 
 ########################################################################################################
+
+
+	@staticmethod
+	def serial_read_available(ser,encoding=None):
+		'''
+		ans = misc.serial_read_available(ser,encoding=None)
+		
+		Read all data currently waiting in the input buffer of a serial port (in one go, without waiting for more data to arrive).
+		
+		INPUT:
+		ser: serial port object (see pyserial)
+		encoding (optional): encoding used to decode the data (string, e.g. 'utf-8' or 'ascii'). If encoding = None, the data are returned as bytes. Default: encoding = None
+		
+		OUTPUT:
+		ans: data read from the serial port (bytes or string)
+		'''
+		
+		buf = bytearray()
+		n = ser.inWaiting()
+		while n > 0: # read everything that's in the buffer (including data that arrived while reading)
+			buf += ser.read(n)
+			n = ser.inWaiting()
+
+		if encoding is None:
+			return bytes(buf)
+		else:
+			return buf.decode(encoding)
+
+
+	########################################################################################################
+	
+
+	@staticmethod
+	def serial_read_line(ser,eol=b'\r\n',timeout=None,encoding='utf-8'):
+		'''
+		ans = misc.serial_read_line(ser,eol=b'\r\n',timeout=None,encoding='utf-8')
+		
+		Read a line of data from a serial port, i.e. read until the line terminator is received or until the timeout has passed. The data are read in blocks (all bytes waiting in the input buffer at a time) and decoded once the full line has been received.
+		
+		INPUT:
+		ser: serial port object (see pyserial)
+		eol (optional): line terminator (bytes). Default: eol = b'\r\n'
+		timeout (optional): max. wait time for the full line (seconds). The serial port timeout is set to this value once, so a read that waits for the next byte shortly before the time is up may take up to one more timeout period. If timeout = None, the timeout of the serial port object is used (no time limit if this is also None). Default: timeout = None
+		encoding (optional): encoding used to decode the data (string). If encoding = None, the data are returned as bytes. Default: encoding = 'utf-8'
+		
+		OUTPUT:
+		ans: data read from the serial port, including the line terminator (bytes or string). The line terminator is missing if the line was not completed before the timeout. ans is empty if no data were received at all.
+		'''
+		
+		to = ser.timeout
+		if timeout is None:
+			timeout = to
+		elif not to == timeout: # only reconfigure serial port if necessary (once per call)
+			ser.timeout = timeout
+		if timeout is None: # no deadline, wait for the line terminator
+			t_end = None
+		else:
+			t_end = time.time() + timeout
+		
+		buf = bytearray()
+		try:
+			while buf.find(eol) < 0:
+				n = ser.inWaiting()
+				if n > 0: # read all bytes that are already waiting
+					buf += ser.read(n)
+				elif ( t_end is not None ) and ( time.time() >= t_end ): # give up waiting
+					break
+				else: # wait for the next byte (blocking read, returns after the port timeout at the latest)
+					u = ser.read(1)
+					if len(u) == 0: # timeout, give up waiting
+						break
+					buf += u
+		finally:
+			if not ser.timeout == to: # restore default timeout
+				ser.timeout = to
+
+		if encoding is None:
+			return bytes(buf)
+		else:
+			return buf.decode(encoding)
+
+
+	########################################################################################################
+	
+
+	@staticmethod
+	def serial_read_bytes(ser,n,timeout=None):
+		'''
+		ans = misc.serial_read_bytes(ser,n,timeout=None)
+		
+		Read a given number of bytes from a serial port. The data are read in large blocks as they arrive. Reading stops once all bytes have been received, or if no data arrive within the timeout period.
+		
+		INPUT:
+		ser: serial port object (see pyserial)
+		n: number of bytes to be read (integer)
+		timeout (optional): max. wait time for new data to arrive (seconds). If timeout = None, the timeout of the serial port object is used. Default: timeout = None
+		
+		OUTPUT:
+		ans: data read from the serial port (bytes). ans contains less than n bytes if the data did not arrive in time.
+		'''
+		
+		to = ser.timeout
+		if timeout is None:
+			timeout = to
+		elif not to == timeout: # only reconfigure serial port if necessary
+			ser.timeout = timeout
+		
+		buf = bytearray()
+		try:
+			while len(buf) < n:
+				u = ser.read(n-len(buf)) # returns early (with the data received so far) if the timeout has passed
+				if len(u) == 0: # no new data within timeout, give up waiting
+					break
+				buf += u
+		finally:
+			if not to == timeout: # restore default timeout
+				ser.timeout = to
+
+		return bytes(buf)
+
+
+	########################################################################################################
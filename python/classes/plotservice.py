@@ -0,0 +1,342 @@
+# Code for the plotservice class
+# 
+# DISCLAIMER:
+# This file is part of ruediPy, a toolbox for operation of RUEDI mass spectrometer systems.
+# 
+# ruediPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# ruediPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with ruediPy.  If not, see <http://www.gnu.org/licenses/>.
+# 
+# ruediPy: toolbox for operation of RUEDI mass spectrometer systems
+# Copyright (C) 2016  Matthias Brennwald
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2016, 2017, Matthias Brennwald (brennmat@gmail.com)
+
+
+import sys
+import warnings
+import time
+import multiprocessing
+import queue
+from classes.misc	import misc
+
+# check Python version and print warning if we're running version < 3:
+if ( sys.version_info[0] < 3 ):
+	warnings.warn("ruediPy / plotservice class is running on Python version < 3. Version 3.0 or newer is recommended!")
+
+
+class plotservice:
+	"""
+	ruediPy class for plotting of data in a separate process. Instrument objects (rgams_SRS, pressuresensor_WIKA, pressuresensor_OMEGA, temperaturesensor_MAXIM) that are set up with a plotservice object do not plot their data themselves. Instead, they send a copy of the data to be plotted ("frame") to the plotservice, which draws the plots in a separate process at its own frame rate. Sending a frame never blocks the measurement: if the plotservice cannot keep up, frames are dropped (only the newest frame of each plot is drawn anyway).
+	
+	NOTE: the plotservice object should be set up before any other plot windows are opened (the plotting process is forked from the current process where possible).
+	
+	EXAMPLE:
+	PLOT = plotservice( frame_rate = 2 )
+	MS   = rgams_SRS ( serialport = '/dev/ttyUSB0' , label = 'MS' , plot_service = PLOT )
+	"""
+	
+	########################################################################################################
+	
+
+	def __init__( self , frame_rate = 2 , queue_size = 20 ):
+		'''
+		plotservice.__init__( frame_rate = 2 , queue_size = 20 )
+		
+		Initialize PLOTSERVICE object and start the plotting process.
+		
+		INPUT:
+		frame_rate (optional): max. number of plot updates per second (default: frame_rate = 2)
+		queue_size (optional): max. number of frames waiting to be plotted. Further frames are dropped until the plotting process catches up. Default: queue_size = 20
+		
+		OUTPUT:
+		(none)
+		'''
+		
+		if 'fork' in multiprocessing.get_all_start_methods():
+			ctx = multiprocessing.get_context('fork') # the ruediPy scripts are not protected by "if __name__ == '__main__'", so they can't be imported again by a spawned process
+		else:
+			ctx = multiprocessing.get_context('spawn')
+		self._queue = ctx.Queue(maxsize=queue_size)
+		self._process = ctx.Process( target = plotservice.run , args = ( self._queue , frame_rate ) , daemon = True )
+		self._process.start()
+		self._dropped = 0
+
+	
+	########################################################################################################
+	
+
+	def label(self):
+		"""
+		label = plotservice.label()
+
+		Return label / name of the PLOTSERVICE object
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		label: label / name (string)
+		"""
+		
+		return 'PLOTSERVICE'
+
+	
+	########################################################################################################
+	
+
+	def warning(self,msg):
+		'''
+		plotservice.warning(msg)
+		
+		Issue warning about issues related to the PLOTSERVICE object.
+		
+		INPUT:
+		msg: warning message (string)
+		
+		OUTPUT:
+		(none)
+		'''
+		
+		misc.warnmessage (self.label(),msg)
+
+	
+	########################################################################################################
+	
+
+	def submit(self,name,frame):
+		'''
+		ok = plotservice.submit(name,frame)
+		
+		Send data to be plotted to the plotservice. This does not wait for the plot to be drawn. If the plotservice is busy, the frame is dropped.
+		
+		INPUT:
+		name: name of the plot (string). Each name is plotted in its own figure window, and a new frame replaces the previous frame with the same name.
+		frame: plot data (dict) with the following fields:
+			'window_title': title of the figure window (string)
+			'title': plot title (string)
+			'xlabel', 'ylabel': axis labels (strings)
+			'series': list of (key,label,x,y,style) tuples, one for each line in the plot. key: line identifier (the same key is used for the same line in later frames), label: legend text (string, or None if no legend is needed), x, y: data values (numpy arrays, these must not be changed after submitting the frame), style: matplotlib line style (string, e.g. 'ko-')
+			'ylim' (optional): (min,max) tuple with limits of the y-axis range. The y-axis is scaled to the data, but not beyond these limits.
+			'yformat' (optional): format string for the y-axis tick labels (e.g. '{:.1%}')
+		
+		OUTPUT:
+		ok: flag indicating if the frame was accepted (ok = False if the frame was dropped)
+		'''
+		
+		try:
+			self._queue.put_nowait( ( name , frame ) )
+			return True
+		except queue.Full:
+			self._dropped = self._dropped + 1
+			return False
+
+	
+	########################################################################################################
+	
+
+	def dropped(self):
+		'''
+		n = plotservice.dropped()
+		
+		Return the number of frames that were dropped because the plotservice was busy.
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		n: number of dropped frames (integer)
+		'''
+		
+		return self._dropped
+
+	
+	########################################################################################################
+	
+
+	def stop(self):
+		'''
+		plotservice.stop()
+		
+		Stop the plotting process (and close its figure windows).
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		(none)
+		'''
+		
+		if self._process.is_alive():
+			try:
+				self._queue.put( None , timeout = 5 )
+				self._process.join( timeout = 5 )
+			except queue.Full:
+				pass
+			if self._process.is_alive():
+				self._process.terminate()
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def run(q,frame_rate):
+		'''
+		plotservice.run(q,frame_rate)
+		
+		Main loop of the plotting process: collect the frames from the queue and draw the newest frame of each plot (at most frame_rate times per second). This is run in the plotting process started by plotservice.__init__, and is not meant to be called directly.
+		
+		INPUT:
+		q: queue with (name,frame) tuples (see plotservice.submit). The process is stopped if None is taken from the queue.
+		frame_rate: max. number of plot updates per second
+		
+		OUTPUT:
+		(none)
+		'''
+		
+		try:
+			import matplotlib
+			matplotlib.rcParams['legend.numpoints'] = 1
+			matplotlib.rcParams['axes.formatter.useoffset'] = False
+			matplotlib.use('TkAgg')
+			import matplotlib.pyplot as plt
+			plt.ion()
+		except:
+			misc.warnmessage ('PLOTSERVICE','Could not set up display environment.')
+			plt = None
+
+		plots  = {} # figures and lines of each plot
+		frames = {} # newest frame of each plot (not yet drawn)
+		dt = 1.0 / frame_rate
+		t_next = time.time()
+		running = True
+		
+		while running:
+
+			# collect frames from the queue (keep the newest frame of each plot):
+			try:
+				u = q.get( timeout = 0.05 )
+				while u is not None:
+					frames[u[0]] = u[1]
+					u = q.get_nowait() # take all frames waiting in the queue before drawing
+				running = False
+			except queue.Empty:
+				pass
+			
+			if plt is None:
+				frames = {} # can't plot, just empty the queue
+				continue
+			
+			# draw the plots:
+			if ( len(frames) > 0 ) and ( time.time() >= t_next ):
+				for name in frames:
+					try:
+						plotservice.draw( plt , plots , name , frames[name] )
+					except:
+						misc.warnmessage ('PLOTSERVICE','Error during plotting of ' + name + ' (' + str(sys.exc_info()[0]) + ').')
+				frames = {}
+				t_next = time.time() + dt
+
+			# keep the figure windows responsive:
+			for p in plots.values():
+				p['fig'].canvas.flush_events()
+
+		if plt is not None:
+			plt.close('all')
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def draw(plt,plots,name,frame):
+		'''
+		plotservice.draw(plt,plots,name,frame)
+		
+		Draw a frame in the plotting process (see plotservice.run). The figure and lines of each plot are kept and updated with the new data; the legend is only set up again if the lines in the plot have changed.
+		
+		INPUT:
+		plt: matplotlib.pyplot module
+		plots: figures and lines of all plots (dict, updated by plotservice.draw)
+		name: name of the plot (string)
+		frame: plot data (see plotservice.submit)
+		
+		OUTPUT:
+		(none)
+		'''
+		
+		if not name in plots: # set up new figure window
+			fig = plt.figure()
+			fig.canvas.manager.set_window_title(frame.get('window_title',name))
+			ax = fig.add_subplot(1,1,1)
+			if 'yformat' in frame:
+				from matplotlib.ticker import FuncFormatter
+				fmt = frame['yformat']
+				ax.yaxis.set_major_formatter( FuncFormatter( lambda y, _: fmt.format(y) ) )
+			fig.show()
+			plots[name] = { 'fig': fig , 'ax': ax , 'lines': {} , 'keys': [] }
+		
+		p = plots[name]
+		ax = p['ax']
+		keys = [ s[0] for s in frame['series'] ]
+		
+		# remove lines that are not in the frame anymore:
+		for key in list(p['lines'].keys()):
+			if not key in keys:
+				p['lines'].pop(key).remove()
+
+		# set line data (add new lines if necessary):
+		for key,label,x,y,style in frame['series']:
+			if not key in p['lines']:
+				p['lines'][key], = ax.plot( [] , [] , style , markersize = 10 )
+			p['lines'][key].set_data( x , y )
+		
+		# legend:
+		labels = [ s[1] for s in frame['series'] ]
+		if any( [ l is not None for l in labels ] ):
+			if ( keys == p['keys'] ) and ( ax.get_legend() is not None ): # same lines as before, only update the legend text
+				for txt,l in zip( ax.get_legend().get_texts() , labels ):
+					txt.set_text(l)
+			else:
+				ax.legend( [ p['lines'][k] for k in keys ] , labels , loc='best' , prop={'size':9} )
+		p['keys'] = keys
+		
+		# title and axis labels:
+		ax.set_title( frame.get('title','') )
+		ax.set_xlabel( frame.get('xlabel','') )
+		ax.set_ylabel( frame.get('ylabel','') )
+		
+		# scale axes:
+		ax.relim()
+		ax.autoscale_view()
+		if 'ylim' in frame:
+			yl = ax.get_ylim()
+			ax.set_ylim( [ max(yl[0],frame['ylim'][0]) , min(yl[1],frame['ylim'][1]) ] )
+		
+		p['fig'].canvas.draw_idle()
+
+
+	########################################################################################################
@@ -41,12 +41,14 @@ import time
 import struct
 import numpy
 import os
+import threading
 
 # check Python version and print warning if we're running version < 3:
 if ( sys.version_info[0] < 3 ):
 	warnings.warn("ruediPy / pressuresensor_OMEGA class is running on Python version < 3. Version 3.0 or newer is recommended!")
 
 from classes.misc	import misc
+from classes.ringbuffer	import ringbuffer
 
 
 havedisplay = "DISPLAY" in os.environ
@@ -74,9 +76,9 @@ class pressuresensor_OMEGA:
 	########################################################################################################
 	
 	
-	def __init__( self , serialport , label = 'PRESSURESENSOR' , plot_title = None , max_buffer_points = 500 , fig_w = 6.5 , fig_h = 5):
+	def __init__( self , serialport , label = 'PRESSURESENSOR' , plot_title = None , max_buffer_points = 500 , fig_w = 6.5 , fig_h = 5 , plot_service = None):
 		'''
-		pressuresensor_OMEGA.__init__( serialport , label = 'PRESSURESENSOR' , plot_title = None , max_buffer_points = 500 , fig_w = 3 , fig_h = 2 )
+		pressuresensor_OMEGA.__init__( serialport , label = 'PRESSURESENSOR' , plot_title = None , max_buffer_points = 500 , fig_w = 3 , fig_h = 2 , plot_service = None )
 		
 		Initialize PRESSURESENSOR object (OMEGA), configure serial port connection
 		
@@ -86,6 +88,7 @@ class pressuresensor_OMEGA:
 		plot_title (optional): title string for use in plot window. If plot_title = None, the sensor label is used. Default: label = None
 		max_buffer_points (optional): max. number of data points in the PEAKS buffer. Once this limit is reached, old data points will be removed from the buffer. Default value: max_buffer_points = 500
 		fig_w, fig_h (optional): width and height of figure window used to plot data (inches)
+		plot_service (optional): plotservice object used to plot the data in a separate process. If a plotservice object is given, the sensor object does not open its own plot window (default: plot_service = None)
 
 		
 		OUTPUT:
@@ -93,7 +96,9 @@ class pressuresensor_OMEGA:
 		'''
 	
 		self._label = label
-		self._has_display = havedisplay
+		self._read_lock = threading.Lock() # serial port access (the sensor may be read from several threads, e.g. by a sensorsampler, see sensorsampler class)
+		self._plotservice = plot_service
+		self._has_display = havedisplay and ( plot_service is None ) # plots are done by the plotservice if there is one
 
 		if plot_title == None:
 			self._plot_title = self._label
@@ -127,10 +132,7 @@ class pressuresensor_OMEGA:
 			self._serial_number = int(ans.rstrip().split('=')[1]) # parse response to integer number
 
 			# data buffer for PEAK values:
-			self._pressbuffer_t = numpy.array([])
-			self._pressbuffer_p = numpy.array([])
-			self._pressbuffer_unit = ['x'] * 0 # empty list
-			self._pressbuffer_max_len = max_buffer_points
+			self._pressbuffer = ringbuffer( max_buffer_points , [ ('t','f8') , ('p','f8') , ('unit','U12') ] )
 	
 			# set up plotting environment
 			if self._has_display: # prepare plotting environment and figure
@@ -216,36 +218,37 @@ class pressuresensor_OMEGA:
 		if not(hasattr(self,'ser')):
 			self.warning( 'sensor is not initialised, could not read data.' )
 		else:
-			try:
-				# get pressure reading from the sensor:
-				self.ser.write(('P\r').encode('utf-8')) # send command to serial port
-				ans =  self.ser.readline().decode('utf-8') # read response and decode ASCII
-				if ans[0] == '>':
-					# fix > character dangling in the serial buffer from previous reading
-					ans = ans[1:]
-				self.ser.flushInput() 	# make sure input is empty
+			with self._read_lock: # one thread at a time
+				try:
+					# get pressure reading from the sensor:
+					self.ser.write(('P\r').encode('utf-8')) # send command to serial port
+					ans =  self.ser.readline().decode('utf-8') # read response and decode ASCII
+					if ans[0] == '>':
+						# fix > character dangling in the serial buffer from previous reading
+						ans = ans[1:]
+					self.ser.flushInput() 	# make sure input is empty
 				
-				ans = ans.split(' ')
-				p = float( ans[0] ) # convert string to float
-				unit = ans[1]
-				if unit != 'bar':
-					raise ValueError( 'OMEGA pressure sensor returned unit = ' + unit + ', not bar!')
-				else:
-					# convert to mbar = hPa:
-					p = 1000 * p
-					unit = 'hPa'
+					ans = ans.split(' ')
+					p = float( ans[0] ) # convert string to float
+					unit = ans[1]
+					if unit != 'bar':
+						raise ValueError( 'OMEGA pressure sensor returned unit = ' + unit + ', not bar!')
+					else:
+						# convert to mbar = hPa:
+						p = 1000 * p
+						unit = 'hPa'
 						
-				# get timestamp
-				t = misc.now_UNIX()
+					# get timestamp
+					t = misc.now_UNIX()
 
-				# add data to peakbuffer
-				if add_to_pressbuffer:
-					self.pressbuffer_add(t,p,unit)
+					# add data to peakbuffer
+					if add_to_pressbuffer:
+						self.pressbuffer_add(t,p,unit)
 
-			except ValueError as e:
-				self.warning( e )
-			except:
-				self.warning( 'An unknown error occured while reading the OMEGA pressure sensor!' )
+				except ValueError as e:
+					self.warning( e )
+				except:
+					self.warning( 'An unknown error occured while reading the OMEGA pressure sensor!' )
 
 		# write data to datafile
 		if not ( f == 'nofile' ):
@@ -291,16 +294,7 @@ class pressuresensor_OMEGA:
 		(none)
 		"""
 				
-		self._pressbuffer_t = numpy.append( self._pressbuffer_t , t )
-		self._pressbuffer_p = numpy.append( self._pressbuffer_p , p )
-		self._pressbuffer_unit.append( unit )
-
-		N = self._pressbuffer_max_len
-		
-		if self._pressbuffer_t.shape[0] > N:
-			self._pressbuffer_t 	     = self._pressbuffer_t[-N:]
-			self._pressbuffer_p 	     = self._pressbuffer_p[-N:]
-			self._pressbuffer_unit       = self._pressbuffer_unit[-N:]
+		self._pressbuffer.add( (t,p,unit) ) # the oldest entry is removed once the buffer is full
 
 
 
@@ -321,7 +315,23 @@ class pressuresensor_OMEGA:
 		(none)
 		'''
 
-		if not self._has_display:
+		if self._plotservice is not None:
+			t0 = misc.now_UNIX()
+			b = self._pressbuffer.data() # buffer data (in chronological order)
+			t = ''
+			if self._plot_title:
+				t = ' (' + self._plot_title + ')'
+			u = ''
+			if len(b) > 0:
+				u = str(b['unit'][0])
+			self._plotservice.submit( self._label + ' pressbuffer' , {
+				'window_title': 'OMEGA PXM409' + t,
+				'title': 'PRESSBUFFER' + t + ' at ' + time.strftime("%b %d %Y %H:%M:%S", time.localtime(t0)),
+				'xlabel': 'Time (s)',
+				'ylabel': 'Pressure (' + u + ')',
+				'series': [ ( 'p' , None , b['t']-t0 , b['p'].copy() , 'ko-' ) ] } )
+
+		elif not self._has_display:
 			self.warning('Plotting of pressbuffer trend not possible (no display system available).')
 
 		else:
@@ -335,7 +345,8 @@ class pressuresensor_OMEGA:
 
 				# Set plot data:
 				t0 = misc.now_UNIX()
-				self._pressbuffer_ax.lines[0].set_data( self._pressbuffer_t - t0 , self._pressbuffer_p )
+				b = self._pressbuffer.data() # buffer data (in chronological order)
+				self._pressbuffer_ax.lines[0].set_data( b['t'] - t0 , b['p'] )
 
 				# Scale axes:
 				self._pressbuffer_ax.relim()
@@ -349,7 +360,7 @@ class pressuresensor_OMEGA:
 				self._pressbuffer_ax.set_title(t + ' at ' + t0)
 
 				# Get pressure units right:
-				self._pressbuffer_ax.set_ylabel('Pressure (' + str(self._pressbuffer_unit[0]) + ')' )
+				self._pressbuffer_ax.set_ylabel('Pressure (' + str(b['unit'][0]) + ')' )
 
 				# Update the plot:
 				# self._fig.canvas.draw()
@@ -379,9 +390,7 @@ class pressuresensor_OMEGA:
 		if not(hasattr(self,'ser')):
 			self.warning( 'sensor is not initialised, could not clear data buffer.' )
 		else:
-			self._pressbuffer_t = self._pressbuffer_t[[]]
-			self._pressbuffer_p = self._pressbuffer_p[[]]
-			self._pressbuffer_unit = ['x'] * 0 # empty list
+			self._pressbuffer.clear()
 
 
 
@@ -41,12 +41,14 @@ import time
 import struct
 import numpy
 import os
+import threading
 
 # check Python version and print warning if we're running version < 3:
 if ( sys.version_info[0] < 3 ):
 	warnings.warn("ruediPy / pressuresensor_WIKA class is running on Python version < 3. Version 3.0 or newer is recommended!")
 
 from classes.misc	import misc
+from classes.ringbuffer	import ringbuffer
 
 havedisplay = "DISPLAY" in os.environ
 if havedisplay: # prepare plotting environment
@@ -75,9 +77,9 @@ class pressuresensor_WIKA:
 	########################################################################################################
 	
 	
-	def __init__( self , serialport , label = 'PRESSURESENSOR' ,  plot_title = None , max_buffer_points = 500 , fig_w = 6.5 , fig_h = 5):
+	def __init__( self , serialport , label = 'PRESSURESENSOR' ,  plot_title = None , max_buffer_points = 500 , fig_w = 6.5 , fig_h = 5 , plot_service = None):
 		'''
-		pressuresensor_WIKA.__init__( serialport , label = 'PRESSURESENSOR' ,  plot_title = None , max_buffer_points = 500 , fig_w = 3 , fig_h = 2 )
+		pressuresensor_WIKA.__init__( serialport , label = 'PRESSURESENSOR' ,  plot_title = None , max_buffer_points = 500 , fig_w = 3 , fig_h = 2 , plot_service = None )
 		
 		Initialize PRESSURESENSOR object (WIKA), configure serial port connection
 		
@@ -87,6 +89,7 @@ class pressuresensor_WIKA:
 		plot_title (optional): title string for use in plot window. If plot_title = None, the sensor label is used. Default: label = None
 		max_buffer_points (optional): max. number of data points in the PEAKS buffer. Once this limit is reached, old data points will be removed from the buffer. Default value: max_buffer_points = 500
 		fig_w, fig_h (optional): width and height of figure window used to plot data (inches)
+		plot_service (optional): plotservice object used to plot the data in a separate process. If a plotservice object is given, the sensor object does not open its own plot window (default: plot_service = None)
 
 		
 		OUTPUT:
@@ -94,7 +97,9 @@ class pressuresensor_WIKA:
 		'''
 	
 		self._label = label
-		self._has_display = havedisplay
+		self._read_lock = threading.Lock() # serial port access (the sensor may be read from several threads, e.g. by a sensorsampler, see sensorsampler class)
+		self._plotservice = plot_service
+		self._has_display = havedisplay and ( plot_service is None ) # plots are done by the plotservice if there is one
 
 		if plot_title == None:
 			self._plot_title = self._label
@@ -138,10 +143,7 @@ class pressuresensor_WIKA:
 	
 
 			# data buffer for PEAK values:
-			self._pressbuffer_t = numpy.array([])
-			self._pressbuffer_p = numpy.array([])
-			self._pressbuffer_unit = ['x'] * 0 # empty list
-			self._pressbuffer_max_len = max_buffer_points
+			self._pressbuffer = ringbuffer( max_buffer_points , [ ('t','f8') , ('p','f8') , ('unit','U12') ] )
 	
 			# set up plotting environment
 			if self._has_display: # prepare plotting environment and figure
@@ -258,46 +260,47 @@ class pressuresensor_WIKA:
 		if not(hasattr(self,'ser')):
 			self.warning( 'sensor is not initialised, could not read data.' )
 		else:
-			try:
-				cmd = 'PZ\x00' # command string to set polling mode
-				cs = self.serial_checksum(cmd) # determine check sum
-				self.ser.write((cmd + chr(cs) + '\r').encode('utf-8')) # send command with check sum to serial port
-				ans = self.ser.read(1) # first byte (not used)
-				ans = self.ser.read(4) # four bytes of IEEE754 float number
-				p = struct.unpack('<f',ans)[0] # convert to 4 bytes to float
-				ans = self.ser.read(1) # unit
-				self.ser.read(2) # last two bytes (not used)
+			with self._read_lock: # one thread at a time
+				try:
+					cmd = 'PZ\x00' # command string to set polling mode
+					cs = self.serial_checksum(cmd) # determine check sum
+					self.ser.write((cmd + chr(cs) + '\r').encode('utf-8')) # send command with check sum to serial port
+					ans = self.ser.read(1) # first byte (not used)
+					ans = self.ser.read(4) # four bytes of IEEE754 float number
+					p = struct.unpack('<f',ans)[0] # convert to 4 bytes to float
+					ans = self.ser.read(1) # unit
+					self.ser.read(2) # last two bytes (not used)
 		
-				# get timestamp
-				t = misc.now_UNIX()
-
-				# get unit:
-				if ans == b'\xFF':
-					unit = 'bar'
-				elif ans == b'\xFE':
-					unit = 'bar-rel.'
-				elif ans == b'\x1F':
-					unit = 'Psi'
-				elif ans == b'\x1E':
-					unit = 'Psi-rel.'
-				elif ans == b'\xAF':
-					unit = 'MPa'
-				elif ans == b'\xAE':
-					unit = 'MPa-rel.'
-				elif ans == b'\xBF':
-					unit = 'kg/cm2'
-				elif ans == b'\xBE':
-					unit = 'kg/cm2-rel.'
-				else:
-					self.warning('WIKA pressure sensor returned unknown pressure unit')
-					unit = '???'
-
-				# add data to peakbuffer
-				if add_to_pressbuffer:
-					self.pressbuffer_add(t,p,unit)
-
-			except:
-				self.warning( 'could not read sensor!' )
+					# get timestamp
+					t = misc.now_UNIX()
+
+					# get unit:
+					if ans == b'\xFF':
+						unit = 'bar'
+					elif ans == b'\xFE':
+						unit = 'bar-rel.'
+					elif ans == b'\x1F':
+						unit = 'Psi'
+					elif ans == b'\x1E':
+						unit = 'Psi-rel.'
+					elif ans == b'\xAF':
+						unit = 'MPa'
+					elif ans == b'\xAE':
+						unit = 'MPa-rel.'
+					elif ans == b'\xBF':
+						unit = 'kg/cm2'
+					elif ans == b'\xBE':
+						unit = 'kg/cm2-rel.'
+					else:
+						self.warning('WIKA pressure sensor returned unknown pressure unit')
+						unit = '???'
+
+					# add data to peakbuffer
+					if add_to_pressbuffer:
+						self.pressbuffer_add(t,p,unit)
+
+				except:
+					self.warning( 'could not read sensor!' )
 
 		# write data to datafile
 		if not ( f == 'nofile' ):
@@ -343,16 +346,7 @@ class pressuresensor_WIKA:
 		(none)
 		"""
 				
-		self._pressbuffer_t = numpy.append( self._pressbuffer_t , t )
-		self._pressbuffer_p = numpy.append( self._pressbuffer_p , p )
-		self._pressbuffer_unit.append( unit )
-
-		N = self._pressbuffer_max_len
-		
-		if self._pressbuffer_t.shape[0] > N:
-			self._pressbuffer_t 	     = self._pressbuffer_t[-N:]
-			self._pressbuffer_p 	     = self._pressbuffer_p[-N:]
-			self._pressbuffer_unit       = self._pressbuffer_unit[-N:]
+		self._pressbuffer.add( (t,p,unit) ) # the oldest entry is removed once the buffer is full
 
 
 
@@ -373,7 +367,23 @@ class pressuresensor_WIKA:
 		(none)
 		'''
 
-		if not self._has_display:
+		if self._plotservice is not None:
+			t0 = misc.now_UNIX()
+			b = self._pressbuffer.data() # buffer data (in chronological order)
+			t = ''
+			if self._plot_title:
+				t = ' (' + self._plot_title + ')'
+			u = ''
+			if len(b) > 0:
+				u = str(b['unit'][0])
+			self._plotservice.submit( self._label + ' pressbuffer' , {
+				'window_title': 'WIKA P30' + t,
+				'title': 'PRESSBUFFER' + t + ' at ' + time.strftime("%b %d %Y %H:%M:%S", time.localtime(t0)),
+				'xlabel': 'Time (s)',
+				'ylabel': 'Pressure (' + u + ')',
+				'series': [ ( 'p' , None , b['t']-t0 , b['p'].copy() , 'ko-' ) ] } )
+
+		elif not self._has_display:
 			self.warning('Plotting of pressbuffer trend not possible (no display system available).')
 
 		else:
@@ -387,7 +397,8 @@ class pressuresensor_WIKA:
 
 				# Set plot data:
 				t0 = misc.now_UNIX()
-				self._pressbuffer_ax.lines[0].set_data( self._pressbuffer_t - t0 , self._pressbuffer_p )
+				b = self._pressbuffer.data() # buffer data (in chronological order)
+				self._pressbuffer_ax.lines[0].set_data( b['t'] - t0 , b['p'] )
 
 				# Scale axes:
 				self._pressbuffer_ax.relim()
@@ -401,7 +412,7 @@ class pressuresensor_WIKA:
 				self._pressbuffer_ax.set_title(t + ' at ' + t0)
 
 				# Get pressure units right:
-				self._pressbuffer_ax.set_ylabel('Pressure (' + str(self._pressbuffer_unit[0]) + ')' )
+				self._pressbuffer_ax.set_ylabel('Pressure (' + str(b['unit'][0]) + ')' )
 
 				# Update the plot:
 				# self._fig.canvas.draw()
@@ -431,9 +442,7 @@ class pressuresensor_WIKA:
 		if not(hasattr(self,'ser')):
 			self.warning( 'sensor is not initialised, could not clear data buffer.' )
 		else:
-			self._pressbuffer_t = self._pressbuffer_t[[]]
-			self._pressbuffer_p = self._pressbuffer_p[[]]
-			self._pressbuffer_unit = ['x'] * 0 # empty list
+			self._pressbuffer.clear()
 
 
 
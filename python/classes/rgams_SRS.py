@@ -44,6 +44,7 @@ import numpy
 import os
 from scipy.interpolate import interp1d
 from classes.misc	import misc
+from classes.ringbuffer	import ringbuffer
 
 # check Python version and print warning if we're running version < 3:
 if ( sys.version_info[0] < 3 ):
@@ -76,9 +77,9 @@ class rgams_SRS:
 	########################################################################################################
 
 
-	def __init__( self , serialport , label='MS' , cem_hv = 1400 , tune_default_RI = [] , tune_default_RS = [] , max_buffer_points = 500 , fig_w = 10 , fig_h = 8 , peakbuffer_plot_min=0.5 , peakbuffer_plot_max = 2 , has_plot_window = True ):
+	def __init__( self , serialport , label='MS' , cem_hv = 1400 , tune_default_RI = [] , tune_default_RS = [] , max_buffer_points = 500 , fig_w = 10 , fig_h = 8 , peakbuffer_plot_min=0.5 , peakbuffer_plot_max = 2 , has_plot_window = True , cache_max_age = 60 , plot_service = None ):
 		'''
-		rgams_SRS.__init__( serialport , label='MS' , cem_hv = 1400 , tune_default_RI = [] , tune_default_RS = [] , max_buffer_points = 500 , fig_w = 10 , fig_h = 8 , peakbuffer_plot_min=0.5 , peakbuffer_plot_max = 2 )
+		rgams_SRS.__init__( serialport , label='MS' , cem_hv = 1400 , tune_default_RI = [] , tune_default_RS = [] , max_buffer_points = 500 , fig_w = 10 , fig_h = 8 , peakbuffer_plot_min=0.5 , peakbuffer_plot_max = 2 , has_plot_window = True , cache_max_age = 60 , plot_service = None )
 		
 		Initialize mass spectrometer (SRS RGA), configure serial port connection.
 		
@@ -92,6 +93,8 @@ class rgams_SRS:
 		fig_w, fig_h (optional): width and height of figure window used to plot data (inches). 
 		peakbuffer_plot_min, peakbuffer_plot_max (optional): limits of y-axis range in peakbuffer plot (default: peakbuffer_plot_min=0.5 , peakbuffer_plot_max = 2)
 		has_plot_window (optional): flag to choose if a plot window should be opened for the rgams_SRS object (default: has_plot_window = True)
+		cache_max_age (optional): max. age (seconds) of the RGA parameter values kept in the parameter cache (detector HV, NF, RI, RS, DI, DS). Older values are read again from the RGA, so the cache catches up with RGA settings that were changed otherwise (e.g. after a reset or power cycle of the RGA). If cache_max_age = None, cached values never expire (default: cache_max_age = 60)
+		plot_service (optional): plotservice object used to plot the data in a separate process. If a plotservice object is given, the rgams_SRS object does not open its own plot window (default: plot_service = None)
 
 		OUTPUT:
 		(none)
@@ -136,6 +139,13 @@ class rgams_SRS:
 			# object name label:
 			self._label = label
 		
+			# parameter cache (RGA parameter values, updated by the set_... methods):
+			self._param_cache = {}
+			self._param_cache_max_age = cache_max_age
+			self._gate_NF = {} # NF values of the gate times used before (see rgams_SRS.set_gate_time)
+			self._NF_count = 0 # number of NF commands sent to the RGA
+			self._HV_count = 0 # number of HV commands sent to the RGA by rgams_SRS.set_detector
+
 			# get ID / serial number of SRS RGA:
 			sn = self.param_IO('ID?',1)
 			sn = sn.split('.')
@@ -147,25 +157,38 @@ class rgams_SRS:
 			self._tune_default_RS = tune_default_RS		
 
 			# data buffer for PEAK values:
-			self._peakbuffer_t = numpy.array([])
-			self._peakbuffer_mz = numpy.array([])
-			self._peakbuffer_intens = numpy.array([])
-			self._peakbuffer_det = ['x'] * 0 # empty list
-			self._peakbuffer_unit = ['x'] * 0 # empty list
-			self._peakbuffer_max_len = max_buffer_points
+			self._peakbuffer = ringbuffer( max_buffer_points , [ ('t','f8') , ('mz','f8') , ('intens','f8') , ('det','U1') , ('unit','U8') ] )
+
+			# digester for PEAK and ZERO values (see rgams_SRS.set_digester):
+			self._digester = None
+
+			# sensors read during RGA readings (see rgams_SRS.set_sensor_sampler):
+			self._sensor_sampler = None
 		
 			# set up plotting environment
+			self._plotservice = plot_service
 			self._has_display = has_plot_window # try opening a plot window
-			if has_plot_window: # should have a plot window
+			if plot_service is not None: # plots are done by the plotservice
+				self._has_display = False
+			elif has_plot_window: # should have a plot window
 				self._has_display = havedisplay # don't tryp opening a plot window if there is no plotting environment
 			else: # no plot window
 				self._has_display = False
+
+			# mz values and colors
+			### self._peakbufferplot_lines_mz = [] # empty list of mz values that are already in the plot (will be updated later)
+			self._peakbufferplot_colors = [(4,'c'),(14,'k'),(15,'g'),(28,'k'),(32,'r'),(40,'y'),(44,'b'),(84,'m')] # fixed colors for the more common mz values
+			self._peakbuffer_plot_min_y = peakbuffer_plot_min
+			self._peakbuffer_plot_max_y = peakbuffer_plot_max
 		
 			if self._has_display: # prepare plotting environment and figure
 
-				# mz values and colors
-				### self._peakbufferplot_lines_mz = [] # empty list of mz values that are already in the plot (will be updated later)
-				self._peakbufferplot_colors = [(4,'c'),(14,'k'),(15,'g'),(28,'k'),(32,'r'),(40,'y'),(44,'b'),(84,'m')] # fixed colors for the more common mz values
+				self._peakbufferplot_lines = {} # plot lines of the mz / detector pairs in the peakbuffer plot (will be updated later)
+				self._peakbufferplot_keys = [] # mz / detector pairs in the peakbuffer plot
+				self._peakbufferplot_legend = None
+				self._peakbufferplot_t0 = None # time reference of the peakbuffer plot
+				self._peakbufferplot_bg = None # background for blitting
+				self._scanplot_lines = None # plot lines of the scan plot (will be set up later)
 
 				# set up plotting environment
 				self._fig = plt.figure(figsize=(fig_w,fig_h))
@@ -180,11 +203,6 @@ class rgams_SRS:
 				self._peakbuffer_ax.set_title('PEAKBUFFER (' + self.label() + ')',loc="center")
 				plt.xlabel('Time')
 				plt.ylabel('Intensity')
-				self._peakbuffer_plot_min_y = peakbuffer_plot_min
-				self._peakbuffer_plot_max_y = peakbuffer_plot_max
-				# add (empty) line to plot (will be updated with data later):
-				self._peakbuffer_ax.plot( [], [] )
-
 				from matplotlib.ticker import FuncFormatter
 				yformatter = FuncFormatter(lambda y, _: '{:.1%}'.format(y))
 				self._peakbuffer_ax.yaxis.set_major_formatter(yformatter)
@@ -200,6 +218,11 @@ class rgams_SRS:
 
 				self._figwindow_is_shown = False
 				plt.ion()			
+
+				# use blitting for fast updates of the peakbuffer plot (if supported by the plot backend):
+				self._peakbufferplot_blit = getattr(self._fig.canvas,'supports_blit',False)
+				if self._peakbufferplot_blit:
+					self._fig.canvas.mpl_connect('draw_event',self._peakbuffer_on_draw)
 			
 			print( 'Successfully configured SRS RGA MS with serial number ' + str(self._serial_number) + ' on ' + serialport )
 
@@ -252,6 +275,79 @@ class rgams_SRS:
 	########################################################################################################
 	
 
+	def cache_clear(self):
+		'''
+		rgams_SRS.cache_clear()
+		
+		Clear the cache of RGA parameter values (detector HV, NF, RI, RS, DI, DS). The parameter values will be read again from the RGA the next time they are needed.
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		(none)
+		'''
+		
+		self._param_cache = {}
+
+	
+	########################################################################################################
+	
+
+	def set_cache_max_age(self,val):
+		'''
+		rgams_SRS.set_cache_max_age(val)
+		
+		Set max. age of the RGA parameter values in the parameter cache. Cached values that are older are read again from the RGA.
+		
+		INPUT:
+		val: max. age (seconds). If val = None, cached values never expire.
+		
+		OUTPUT:
+		(none)
+		'''
+		
+		self._param_cache_max_age = val
+
+	
+	########################################################################################################
+	
+
+	def param_cached(self,par):
+		'''
+		ans = rgams_SRS.param_cached(par)
+		
+		Return value of an RGA parameter. The value is taken from the parameter cache if available (and not expired), otherwise the value is read from the RGA and stored in the cache. Values that are not numbers (failed or garbled replies from the RGA) are not stored in the cache.
+		
+		INPUT:
+		par: parameter name (string, e.g. 'HV' or 'NF', see RGA manual)
+		
+		OUTPUT:
+		ans: parameter value as returned from RGA (string, or -1 if the RGA did not respond)
+		'''
+		
+		if par in self._param_cache:
+			ans,t = self._param_cache[par]
+			if self._param_cache_max_age is None:
+				return ans
+			if misc.now_UNIX() - t <= self._param_cache_max_age:
+				return ans
+
+		# read value from RGA:
+		ans = self.param_IO(par + '?',1)
+		try:
+			float(ans) # check for valid number
+			self._param_cache[par] = ( ans , misc.now_UNIX() )
+		except ( ValueError , TypeError ): # don't cache failed readings
+			if not ans == -1: # param_IO already warned about missing response
+				self.warning ('invalid ' + par + ' value received from RGA: ' + repr(ans))
+			self._param_cache.pop(par,None) # forget the old value
+		return ans
+
+	
+	########################################################################################################
+	
+
 	def param_IO(self,cmd,ansreq,timeout=10):
 		'''
 		ans = rgams_SRS.param_IO(cmd,ansreq)
@@ -263,7 +359,7 @@ class rgams_SRS:
 		ansreq: flag indicating if answer from RGA is expected:
 			ansreq = 1: answer expected, check for answer
 			ansreq = 0: no answer expected, don't check for answer
-		timeout (optional): max. wait time for answer from RGA (seconds), default: timeout = 10 seconds
+		timeout (optional): max. wait time for answer from RGA (seconds), default: timeout = 10 seconds. The answer is read until the <LF><CR> terminator is received, so there is no additional waiting time once the RGA has responded.
 
 		OUTPUT:
 		ans: answer / result returned from RGA
@@ -278,30 +374,19 @@ class rgams_SRS:
 		
 		if ansreq:
 
-			# wait for response
-			t = 0
-			dt = 0.1
-			doWait = 1
-			while doWait:
-				if self.ser.inWaiting() == 0: # wait
-					time.sleep(dt)
-					t = t + dt
-					if t > timeout: # give up waiting
-						doWait = 0
-						self.warning('could not determine parameter value or status (no response from RGA, command: ' + cmd + ')')
-						ans = -1
-				else:
-					doWait = 0
-					ans = ''
-		
-			# read back result:
-			if ans == -1:
+			# wait for response and read it back up to the <LF><CR> terminator used by the RGA (blocking read, returns as soon as the answer is complete):
+			u = misc.serial_read_line(self.ser,b'\n\r',timeout,'utf-8')
+
+			# parse result:
+			if len(u) == 0: # no response
+				self.warning('could not determine parameter value or status (no response from RGA, command: ' + cmd + ')')
 				self.warning('Execution of ' + cmd + ' did not produce a result (or took too long)!')
+				ans = -1
 			else:
-				while self.ser.inWaiting() > 0: # while there's something in the buffer...
-					ans = ans + self.ser.read().decode('utf-8') # read each byte
-				ans = ans.rstrip('\r\n') # remove newline characters at end
-		
+				if not u.endswith('\n\r'):
+					self.warning('incomplete response from RGA (no terminator received within timeout, command: ' + cmd + ')')
+				ans = u.rstrip('\r\n') # remove newline characters at end
+
 			# return the result:
 			return ans
 			
@@ -415,6 +500,7 @@ class rgams_SRS:
 		if self.has_multiplier():
 			# send command to serial port:
 			self.param_IO('HV' + str(val),1)
+			self._param_cache['HV'] = ( str(val) , misc.now_UNIX() ) # remember new HV value
 		else:
 			self.warning ('Cannot set multiplier (CEM) high voltage, because CEM option is not installed.')
 
@@ -437,8 +523,8 @@ class rgams_SRS:
 		
 		# check if CEM option is installed:
 		if self.has_multiplier():
-			# send command to serial port:
-			ans = self.param_IO('HV?',1)
+			# get value from parameter cache or RGA:
+			ans = self.param_cached('HV')
 		else:
 			self.warning ('Cannot get multiplier (CEM) high voltage, because CEM option is not installed.')
 			ans = ''
@@ -611,13 +697,18 @@ class rgams_SRS:
 		(none)
 		'''
 		
-		# send command to serial port:
+		# send command to serial port (only if the HV value is not already set):
 		if det == 'F':
-			self.param_IO('HV0',1)
+			if not self._hv_is_set(0):
+				self.param_IO('HV0',1)
+				self._HV_count = self._HV_count + 1
+				self._param_cache['HV'] = ( '0' , misc.now_UNIX() ) # remember new HV value
 		elif det == 'M':
 			if self.has_multiplier():
 				# self.param_IO('HV*',1)  <--- this uses the factory default value (HV = 1400 V)
-				self.set_multiplier_hv(self.get_multiplier_default_hv())
+				if not self._hv_is_set(self.get_multiplier_default_hv()):
+					self.set_multiplier_hv(self.get_multiplier_default_hv())
+					self._HV_count = self._HV_count + 1
 			else:
 				self.warning ('RGA has no electron multiplier installed!')
 		else:
@@ -627,6 +718,50 @@ class rgams_SRS:
 	########################################################################################################
 	
 
+	def _hv_is_set(self,val):
+		'''
+		ans = rgams_SRS._hv_is_set(val)
+		
+		Check if the CEM high voltage (HV) of the RGA is set to a given value (the HV value is taken from the parameter cache if available and not expired, see rgams_SRS.param_cached and rgams_SRS.set_cache_max_age).
+		
+		INPUT:
+		val: voltage
+		
+		OUTPUT:
+		ans: True if the HV value is set to val or if the RGA has no electron multiplier (no HV to be set), False otherwise (or if the HV value could not be determined, so that the HV value is sent to the RGA)
+		'''
+		
+		if str(self.has_multiplier()) == '0': # no CEM installed, don't ask the RGA for the HV value
+			return True
+		
+		try:
+			return float(self.param_cached('HV')) == float(val)
+		except ( ValueError , TypeError ):
+			return False
+
+	
+	########################################################################################################
+	
+
+	def get_detector_switch_count(self):
+		'''
+		val = rgams_SRS.get_detector_switch_count()
+		
+		Return the number of HV commands sent to the RGA by rgams_SRS.set_detector (for diagnostics: switching the detector takes time because the CEM high voltage needs to settle, so this number should be small).
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		val: number of detector switches (integer)
+		'''
+
+		return self._HV_count
+
+	
+	########################################################################################################
+	
+
 	def get_detector(self):
 		'''
 		det = rgams_SRS.get_detector()
@@ -645,7 +780,7 @@ class rgams_SRS:
 		if not self.has_multiplier(): # there is no Multiplier installed
 			det = 'F'
 		else:
-			hv = self.param_IO('HV?',1) # send command to serial port
+			hv = self.param_cached('HV') # get value from parameter cache or RGA
 			try:
 				hv = float(hv)
 				if hv == 0:
@@ -673,13 +808,34 @@ class rgams_SRS:
 		(none)
 		
 		OUTPUT:
-		val: NF noise floor parameter value, 0...7 (integer)
+		val: NF noise floor parameter value, 0...7 (integer). val = None if the NF value could not be read from the RGA.
 		'''
 
-		if hasattr(self, '_noisefloor') == 0: # never asked for noisefloor before
-			self._noisefloor = self.param_IO('NF?',1) # get current NF value
-			
-		return self._noisefloor
+		ans = self.param_cached('NF') # get current NF value from parameter cache or RGA
+		try:
+			return int(float(ans))
+		except ( ValueError , TypeError ):
+			self.warning ('could not determine noise floor (NF) value (RGA returned NF = ' + repr(ans) + ').')
+			return None
+
+	
+	########################################################################################################
+	
+
+	def get_noise_floor_count(self):
+		'''
+		val = rgams_SRS.get_noise_floor_count()
+		
+		Return the number of NF commands sent to the RGA (for diagnostics: changing the NF setting takes time, so this number should be small).
+				
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		val: number of NF commands (integer)
+		'''
+
+		return self._NF_count
 
 	
 	########################################################################################################
@@ -709,7 +865,8 @@ class rgams_SRS:
 		
 		if NF != self.get_noise_floor(): # only change NF setting if necessary
 			self.param_IO('NF' + str(NF),0)
-			self._noisefloor = NF # remember new NF value
+			self._NF_count = self._NF_count + 1
+			self._param_cache['NF'] = ( str(NF) , misc.now_UNIX() ) # remember new NF value
 
 	
 	########################################################################################################
@@ -752,14 +909,15 @@ class rgams_SRS:
 		  7	0.025 
 		'''
 		
-		gt = numpy.array([ 2.4 , 1.21 , 0.48 , 0.25 , 0.163 , 0.060 , 0.043 , 0.025 ])
-		NF  = (numpy.abs(gt-gate)).argmin() # index to closest gate time
-		if gate > gt.max():
-			self.warning('gate time cannot be more than ' + str(gt.max()) +'s! Using gate = ' + str(gt.max()) +'s...')
-		elif gate < gt.min():
-			self.warning('gate time cannot be less than ' + str(gt.min()) +'s! Using gate = ' + str(gt.min()) +'s...')
+		if not gate in self._gate_NF: # determine NF value for this gate time (only once)
+			gt = numpy.array([ 2.4 , 1.21 , 0.48 , 0.25 , 0.163 , 0.060 , 0.043 , 0.025 ])
+			self._gate_NF[gate] = int( (numpy.abs(gt-gate)).argmin() ) # index to closest gate time
+			if gate > gt.max():
+				self.warning('gate time cannot be more than ' + str(gt.max()) +'s! Using gate = ' + str(gt.max()) +'s...')
+			elif gate < gt.min():
+				self.warning('gate time cannot be less than ' + str(gt.min()) +'s! Using gate = ' + str(gt.min()) +'s...')
 			
-		self.set_noise_floor(NF)
+		self.set_noise_floor(self._gate_NF[gate])
 
 	
 	########################################################################################################
@@ -782,20 +940,7 @@ class rgams_SRS:
 		(none)
 		"""
 				
-		self._peakbuffer_t = numpy.append( self._peakbuffer_t , t )
-		self._peakbuffer_mz = numpy.append( self._peakbuffer_mz , mz )
-		self._peakbuffer_intens = numpy.append( self._peakbuffer_intens , intens )
-		self._peakbuffer_det.append( det )
-		self._peakbuffer_unit.append( unit )
-
-		N = self._peakbuffer_max_len
-		
-		if self._peakbuffer_t.shape[0] > N:
-			self._peakbuffer_t 		= self._peakbuffer_t[-N:]
-			self._peakbuffer_mz 		= self._peakbuffer_mz[-N:]
-			self._peakbuffer_intens	    = self._peakbuffer_intens[-N:]
-			self._peakbuffer_det	    = self._peakbuffer_det[-N:]
-			self._peakbuffer_unit       = self._peakbuffer_unit[-N:]
+		self._peakbuffer.add( (t,mz,intens,det,unit) ) # the oldest entry is removed once the buffer is full
 
 
 
@@ -816,11 +961,7 @@ class rgams_SRS:
 		(none)
 		"""
 
-		self._peakbuffer_t          = self._peakbuffer_t[[]]
-		self._peakbuffer_mz         = self._peakbuffer_mz[[]]
-		self._peakbuffer_intens     = self._peakbuffer_intens[[]]
-		self._peakbuffer_det = ['x'] * 0 # empty list
-		self._peakbuffer_unit       = ['x'] * 0 # empty list
+		self._peakbuffer.clear()
 
 
 
@@ -841,7 +982,56 @@ class rgams_SRS:
 		(none)
 		"""
 
-		self._peakbuffer_max_len = N
+		self._peakbuffer.set_length(N)
+
+
+
+	########################################################################################################
+
+
+
+	def peakbuffer_series(self):
+		"""
+		S = rgams_SRS.peakbuffer_series()
+
+		Group the data in the PEAKS data buffer by mz value and detector (one series for each mz / detector pair). The grouping is done in a single pass using sorting (no loops over the buffer data).
+
+		INPUT:
+		(none)
+
+		OUTPUT:
+		S: list of (mz,det,k,val_min,val_max) tuples, one for each mz / detector pair in the buffer (sorted by mz value and detector):
+			mz: mz value
+			det: detector (string)
+			k: index to the data of this series in the peakbuffer (numpy array, in chronological order, see ringbuffer.data())
+			val_min, val_max: min. and max. intensity values of the series
+		"""
+
+		pb = self._peakbuffer.data()
+		if len(pb) == 0:
+			return []
+
+		# combined key for mz / detector pairs:
+		u_mz,i_mz   = numpy.unique( pb['mz'] , return_inverse=True )
+		u_det,i_det = numpy.unique( pb['det'] , return_inverse=True )
+		key = i_mz.ravel() * len(u_det) + i_det.ravel()
+
+		# sort by key (stable sort keeps the data of each series in chronological order):
+		k = numpy.argsort( key , kind='stable' )
+		j = numpy.flatnonzero( numpy.diff(key[k]) ) + 1 # start of each series in k (except the first)
+		j0 = numpy.concatenate( ( [0] , j ) )
+
+		# min. and max. values of all series:
+		val = pb['intens'][k]
+		val_min = numpy.minimum.reduceat( val , j0 )
+		val_max = numpy.maximum.reduceat( val , j0 )
+
+		S = []
+		for i,kk in enumerate(numpy.split(k,j)):
+			u = key[kk[0]]
+			S.append( ( u_mz[u // len(u_det)] , str(u_det[u % len(u_det)]) , kk , val_min[i] , val_max[i] ) )
+
+		return S
 
 
 
@@ -891,51 +1081,198 @@ class rgams_SRS:
 			
 		else: # proceed with measurement
 			
-			# deal with gate times longer than 2.4 seconds (max. allowed with SRS-RGA):
-			v = 0.0;
-			if gate > 2.4:
-				N = int(round(gate/2.4))
-				gt = 2.4
-			else:
-				N = 1
-				gt = gate
-			for k in range(N):
-				# configure RGA (gate time):
-				self.set_gate_time(gt)
-				
-				# send command to RGA:
-				self.ser.write(('MR' + str(mz) + '\r\n').encode('utf-8'))
-				
-				# get timestamp
-				t = misc.now_UNIX()
-				
-				# read back data:
-				u = self.ser.read(4)
+			# read data (gate times longer than 2.4 seconds are dealt with by averaging multiple readings, the NF value is set only once):
+			v,t = self._read_masses([mz],gate)
+			val = float(v[0])
+			t = float(t[0])
+			unit = 'A'
+		
+		det = self.get_detector()
+		
+		self._store_peak(mz,val,unit,det,gate,t,f,add_to_peakbuffer)
 
-				while self.ser.inWaiting() > 0:
-					self.warning('DEBUGGING INFO: serial buffer not empty after PEAK reading!')
+		return val,unit
+		
+		
+	########################################################################################################
 	
-				# parse result:
-				u = struct.unpack('<i',u)[0] # unpack 4-byte data value
-				
-				v = v + u
-			
-			v = v/N
-			val = v * 1E-16 # multiply by 1E-16 to convert to Amperes
-			unit = 'A'
+
+	def peaks(self,mz,gate,f,add_to_peakbuffer=True):
+		'''
+		val,unit,t = rgams_SRS.peaks(mz,gate,f,add_to_peakbuffer=True)
 		
+		Read out detector signal at several masses (m/z values) in one go. This gives the same results as calling rgams_SRS.peak() for each m/z value, but the noise floor (NF) and detector are set / determined only once, the next reading is started immediately after the result of the previous reading is received from the RGA, and the data are written to the data file and the peakbuffer only after all readings are done. This reduces the dead time between the readings.
+		
+		INPUT:
+		mz: m/z values (list of integers)
+		gate: gate time (seconds), see rgams_SRS.peak()
+		f: file object for writing data (see datafile.py). If f = 'nofile', data is not written to any data file.
+		add_to_peakbuffer (optional): flag to choose if peak values are added to peakbuffer (default: add_to_peakbuffer=True)
+		
+		OUTPUT:
+		val: signal intensities (numpy array, NaN for invalid m/z values)
+		unit: unit (string)
+		t: timestamps of the readings (numpy array, epoch time)
+		'''
+		
+		mz = [ int(m) for m in mz ]
+		ok = [ self._check_mz(m) for m in mz ]
+		
+		val = numpy.full( len(mz) , numpy.nan )
+		t = numpy.full( len(mz) , numpy.nan )
+		unit = 'A'
+		k = [ i for i in range(len(mz)) if ok[i] ]
+		if len(k) == 0: # no valid m/z values, nothing to read from the RGA
+			return val,unit,t
+		val[k],t[k] = self._read_masses( [ mz[i] for i in k ] , gate )
+		
+		# write data after reading from the RGA:
 		det = self.get_detector()
+		for i in k:
+			self._store_peak(mz[i],val[i],unit,det,gate,t[i],f,add_to_peakbuffer)
+
+		return val,unit,t
+		
+		
+	########################################################################################################
+	
+
+	def _read_masses(self,mz,gate):
+		'''
+		val,t = rgams_SRS._read_masses(mz,gate)
+		
+		Read out detector signal at several masses (m/z values) with the same noise floor (NF) setting. The readings of each mass are done one after the other, without any other communication with the RGA in between.
+		
+		INPUT:
+		mz: m/z values (list of integers, must be valid m/z values)
+		gate: gate time (seconds). If gate is longer than 2.4 seconds, the multiple readings are averaged (see rgams_SRS.peak()).
+		
+		OUTPUT:
+		val: signal intensities (numpy array, Amperes)
+		t: timestamps of the (last) reading of each mass (numpy array, epoch time)
+		'''
+		
+		# deal with gate times longer than 2.4 seconds (max. allowed with SRS-RGA):
+		if gate > 2.4:
+			N = int(round(gate/2.4))
+			gt = 2.4
+		else:
+			N = 1
+			gt = gate
+		
+		# configure RGA (gate time):
+		self.set_gate_time(gt)
+		
+		cmd = [ ('MR' + str(m) + '\r\n').encode('utf-8') for m in mz ]
+		v = numpy.zeros( len(mz) )
+		t = numpy.zeros( len(mz) )
+		ser = self.ser
+		S = self._sensor_sampler
+		if S is not None:
+			S.start_cycle()
+		for i in range(len(mz)):
+			for k in range(N):
+				ser.write(cmd[i]) # send command to RGA
+				t[i] = misc.now_UNIX() # get timestamp
+				if S is not None: # read sensors while the RGA is busy
+					S.trigger()
+				v[i] = v[i] + struct.unpack('<i',ser.read(4))[0] # read back and unpack 4-byte data value
+
+		while self.ser.inWaiting() > 0:
+			self.warning('DEBUGGING INFO: serial buffer not empty after PEAK reading!')
+		
+		return v / N * 1E-16 , t # multiply by 1E-16 to convert to Amperes
+
+
+	########################################################################################################
+	
+
+	def _check_mz(self,mz):
+		'''
+		ok = rgams_SRS._check_mz(mz)
+		
+		Check if m/z value is in the range of the RGA (warn if not).
+		
+		INPUT:
+		mz: m/z value (integer)
+		
+		OUTPUT:
+		ok: True if the m/z value is valid (bool)
+		'''
+		
+		if mz < 1:
+			self.warning ('mz value must be positive! Skipping measurement...')
+			return False
+		elif mz > self.mz_max():
+			self.warning ('mz value must be ' + str(self.mz_max()) + ' or less! Skipping measurement...')
+			return False
+		return True
+
+
+	########################################################################################################
+	
+
+	def _store_peak(self,mz,val,unit,det,gate,t,f,add_to_peakbuffer=True):
+		'''
+		rgams_SRS._store_peak(mz,val,unit,det,gate,t,f,add_to_peakbuffer=True)
+		
+		Write PEAK value to data file and digester, and add it to the peakbuffer.
+		
+		INPUT:
+		mz: m/z value (integer)
+		val: signal intensity (float)
+		unit: unit (string)
+		det: detector (string)
+		gate: gate time (seconds)
+		t: timestamp (epoch time)
+		f: file object for writing data (see datafile.py). If f = 'nofile', data is not written to any data file.
+		add_to_peakbuffer (optional): flag to choose if peak value is added to peakbuffer (default: add_to_peakbuffer=True)
+		
+		OUTPUT:
+		(none)
+		'''
 		
 		if not ( f == 'nofile' ):
 			f.write_peak('RGA_SRS',self.label(),mz,val,unit,det,gate,t)
 		
+		if self._digester is not None:
+			self._digester.write_peak('RGA_SRS',self.label(),mz,val,unit,det,gate,t)
+		
 		# add data to peakbuffer
 		if add_to_peakbuffer:
 			self.peakbuffer_add(t,mz,val,det,unit)
 
-		return val,unit
+
+	########################################################################################################
+	
+
+	def _store_zero(self,mz,mz_offset,val,unit,det,gate,t,f):
+		'''
+		rgams_SRS._store_zero(mz,mz_offset,val,unit,det,gate,t,f)
+		
+		Write ZERO value to data file and digester.
+		
+		INPUT:
+		mz: m/z value (integer)
+		mz_offset: offset relative m/z value (integer)
+		val: signal intensity (float)
+		unit: unit (string)
+		det: detector (string)
+		gate: gate time (seconds)
+		t: timestamp (epoch time)
+		f: file object for writing data (see datafile.py). If f = 'nofile', data is not written to any data file.
 		
+		OUTPUT:
+		(none)
+		'''
 		
+		if not ( f == 'nofile' ):
+			f.write_zero('RGA_SRS',self.label(),mz,mz_offset,val,unit,det,gate,t)
+
+		if self._digester is not None:
+			self._digester.write_zero('RGA_SRS',self.label(),mz,mz_offset,val,unit,det,gate,t)
+
+
 	########################################################################################################
 	
 
@@ -983,43 +1320,13 @@ class rgams_SRS:
 			
 		else: # proceed with measurement
 		
-			# deal with gate times longer than 2.4 seconds (max. allowed with SRS-RGA):
-			v = 0.0;
-			if gate > 2.4:
-				N = int(round(gate/2.4))
-				gt = 2.4
-			else:
-				N = 1
-				gt = gate
-
-			for k in range(N):
-			
-				# configure RGA (gate time):
-				self.set_gate_time(gt)
-
-				# send command to RGA:
-				self.ser.write(('MR' + str(mz+mz_offset) + '\r\n').encode('utf-8'))
-
-				# get timestamp
-				t = misc.now_UNIX()
-
-				# read back data:
-				u = self.ser.read(4)
-
-				while self.ser.inWaiting() > 0:
-					self.warning('DEBUGGING INFO: serial buffer not empty after PEAK reading!')
-
-				# parse result:
-				u = struct.unpack('<i',u)[0] # unpack 4-byte data value
-				
-				v = v + u
-
-			v = v/N
-			val = v * 1E-16 # multiply by 1E-16 to convert to Amperes
+			# read data (gate times longer than 2.4 seconds are dealt with by averaging multiple readings, the NF value is set only once):
+			v,t = self._read_masses([mz+mz_offset],gate)
+			val = float(v[0])
+			t = float(t[0])
 			unit = 'A'
 
-		if not ( f == 'nofile' ):
-			f.write_zero('RGA_SRS',self.label(),mz,mz_offset,val,unit,self.get_detector(),gate,t)
+		self._store_zero(mz,mz_offset,val,unit,self.get_detector(),gate,t,f)
 
 		return val,unit
 
@@ -1045,8 +1352,8 @@ class rgams_SRS:
 			if f = 'nofile' (string), the scan data is not written to a datafile
 
 		OUTPUT:
-		M: mass values (mz, in amu)
-		Y: signal intensity values (float)
+		M: mass values (mz, in amu, numpy array)
+		Y: signal intensity values (float, numpy array)
 		unit: unit of Y (string)
 		'''
 
@@ -1096,38 +1403,14 @@ class rgams_SRS:
 		# get time stamp before scan
 		t1 = misc.now_UNIX()
 
-		# read back result from RGA:
-		Y = [] # init empty list
-
-		k = 0
-		while ( k < N+1 ): # read data points. Note: after scanning, the RGA also measures the total pressure and returns this as an extra data point, giving N+1 data points in total. All N+1 data points need to be read in order to empty the data buffer.
-
-			# wait for data in buffer:
-			t = 0
-			dt = 0.1
-			doWait = 1
-			while doWait > 0:
-				if self.ser.inWaiting() == 0: # wait
-					time.sleep(dt)
-					t = t + dt
-					if t > 10: # give up waiting
-						doWait = -1
-				else:
-					doWait = 0
-
-			# read back result:
-			if doWait == -1:
-				self.warning('RGA did not produce scan result (or took too long)!')
-			else:
-				u = self.ser.read(4)
-
-				if k < N: # if this was not the final data point (total pressure)
-					u = struct.unpack('<i',u)[0] # unpack 4-byte data value
-					u = u * 1E-16 # divide by 1E-16 to convert to Amperes
-					Y.append(u) # append value to list 'ans'
+		# read back result from RGA. Note: after scanning, the RGA also measures the total pressure and returns this as an extra data point, giving N+1 data points in total. All N+1 data points need to be read in order to empty the data buffer.
+		u = misc.serial_read_bytes(self.ser,4*(N+1),10) # 4 bytes per data point
+		n = min(len(u)//4,N) # number of complete data points (without total pressure)
+		if len(u) < 4*(N+1):
+			self.warning('RGA did not produce full scan result (or took too long)! Received ' + str(n) + ' of ' + str(N) + ' data points, discarding the missing data points...')
 
-				# prepare for next value:
-				k = k + 1
+		# parse result:
+		Y = numpy.frombuffer(u,dtype='<i4',count=n) * 1E-16 # unpack 4-byte data values and multiply by 1E-16 to convert to Amperes
 
 		# get time stamp after scan
 		t2 = misc.now_UNIX()
@@ -1138,17 +1421,21 @@ class rgams_SRS:
 		# determine scan mz values:
 		low = float(low)
 		high = float(high)
-		M = [low + x*(high-low)/N for x in range(N)]
+		M = low + numpy.arange(n)*(high-low)/N # same arithmetic as low + x*(high-low)/N for x = 0...n-1 (only the data points received from the RGA)
 		unit = 'A'
 
 		# discard data that are out of the desired mz range:
-		Y = [ Y[i] for i in range(len(M)) if (M[i] >= llow) & (M[i] <= hhigh) ]
-		M = [ m for m in M if (m >= llow) & (m <= hhigh) ]
+		k = (M >= llow) & (M <= hhigh)
+		M = M[k]
+		Y = Y[k]
 
 		# write to data file:
 		if not ( f == 'nofile' ):
-			det = self.get_detector()
-			f.write_scan('RGA_SRS',self.label(),M,Y,unit,det,gate,t)
+			if len(M) > 0:
+				det = self.get_detector()
+				f.write_scan('RGA_SRS',self.label(),M,Y,unit,det,gate,t)
+			else:
+				self.warning('No scan data, nothing written to the data file.')
 
 		return M,Y,unit
 
@@ -1264,7 +1551,11 @@ class rgams_SRS:
 				self.set_noise_floor(nf)
 				self.param_IO('CA',1) 
 			self.set_detector(DET) # set detector back to initial setting
-		self.set_noise_floor(NF) # set noise floor back to initial setting
+		if NF is not None:
+			self.set_noise_floor(NF) # set noise floor back to initial setting
+
+		# make sure parameter values are read again from the RGA after calibration:
+		self.cache_clear()
 
 
 ########################################################################################################
@@ -1353,19 +1644,18 @@ class rgams_SRS:
 				fit = numpy.polyfit([mL,mR],[yL,yR],1)
 				fit_fn = numpy.poly1d(fit)
 				Y = Y - fit_fn(MZ) # subtract baseline (straight trend line)
-				Y = Y - min(Y) # force min(Y) to zero (to avoid bad cum-sum data)
+				Y = Y - Y.min() # force min(Y) to zero (to avoid bad cum-sum data)
 
 				# analyse cumulative sum of peak (median center of peak):
 				CY = numpy.cumsum(Y)
 				dMZ = (MZ[1]-MZ[0])/2
-				CMZ = [u + dMZ for u in MZ] # MZ values of cumulative sum, offset by dMZ relative to MZ
+				CMZ = MZ + dMZ # MZ values of cumulative sum, offset by dMZ relative to MZ
 
 				self.plot_scan(MZ,Y,U , CMZ,CY )
 
-				CYmax = max(CY)
-				cy = [ x/CYmax for x in CY ]
-				a = [ i for i in range(0,len(cy)) if cy[i] > 0.5 ] # indices to all occurrences of cy > 0.5
-				b = [ i for i in range(0,len(cy)) if cy[i] <= 0.5 ] # indices to all occurrences of cy <= 0.5
+				cy = CY / CY.max()
+				a = numpy.flatnonzero( cy > 0.5 ) # indices to all occurrences of cy > 0.5
+				b = numpy.flatnonzero( cy <= 0.5 ) # indices to all occurrences of cy <= 0.5
 				if len(a) > 0:
 					a = a[0]
 				else:
@@ -1383,8 +1673,7 @@ class rgams_SRS:
 					m1 = numpy.nan
 
 				# use values close to peak maximum to find peak center:
-				m2 = [ MZ[j] for j,i in enumerate(Y) if i>=0.80*max(Y)] # mz values of YY values >= 0.75*max(YY)
-				m2 = sum(m2) / len(m2)
+				m2 = MZ[ Y >= 0.80*Y.max() ].mean() # mean of mz values of Y values >= 0.80*max(Y)
 				print ( '   Center of mass of values > 80% of peak-max: mz = ' + ' {:.3f}'.format(m2) )
 
 				# mean of m1 and m2:
@@ -1468,6 +1757,7 @@ class rgams_SRS:
 			x = '{:.4f}'.format(x)
 
 		self.param_IO('RI' + x,0)
+		self._param_cache['RI'] = ( x , misc.now_UNIX() ) # remember new RI value
 		print ('Set RI voltage to ' +  x + 'V')
 
 
@@ -1498,6 +1788,7 @@ class rgams_SRS:
 		x = '{:.4f}'.format(x)
 
 		self.param_IO('RS' + x,0)
+		self._param_cache['RS'] = ( x , misc.now_UNIX() ) # remember new RS value
 		print ( 'Set RS voltage to ' + x + 'V' )
 
 
@@ -1522,7 +1813,7 @@ class rgams_SRS:
 		See also the SRS RGA manual, chapter 7, section "Peak Tuning Procedure"
 		'''
 
-		x = float(self.param_IO('RI?',1))
+		x = float(self.param_cached('RI'))
 
 		if ( x < -86.0 ) or ( x > 86.0 ) :
 			error ('Could not determine current RI setting, or RI value returned was out of bounds (-86V...+86V)')
@@ -1551,7 +1842,7 @@ class rgams_SRS:
 		See also the SRS RGA manual, chapter 7, section "Peak Tuning Procedure"
 		'''
 
-		x = float(self.param_IO('RS?',1))
+		x = float(self.param_cached('RS'))
 
 		if ( x < 600.0 ) or ( x > 1600.0 ) :
 			error ('Could not determine current RS setting, or RS value returned was out of bounds (600V...1600V)')
@@ -1580,7 +1871,7 @@ class rgams_SRS:
 		See also the SRS RGA manual, chapter 7, section "Peak Tuning Procedure"
 		'''
 
-		x = float(self.param_IO('DI?',1))
+		x = float(self.param_cached('DI'))
 
 		if ( x < 0 ) or ( x > 255 ) :
 			error ('Could not determine current DI setting, or DI value returned was out of bounds (0...255)')
@@ -1609,7 +1900,7 @@ class rgams_SRS:
 		See also the SRS RGA manual, chapter 7, section "Peak Tuning Procedure"
 		'''
 
-		x = float(self.param_IO('DS?',1))
+		x = float(self.param_cached('DS'))
 
 		if ( x < -2.55 ) or ( x > 2.55 ) :
 			error ('Could not determine current DS setting, or DS value returned was out of bounds (-2.55...2.55)')
@@ -1643,6 +1934,7 @@ class rgams_SRS:
 		x = '{:.4f}'.format(x)
 
 		self.param_IO('DI' + x,0)
+		self._param_cache['DI'] = ( x , misc.now_UNIX() ) # remember new DI value
 		print ( 'Set DI value to ' + x + ' bit units' )
 
 
@@ -1673,6 +1965,7 @@ class rgams_SRS:
 		x = '{:.4f}'.format(x)
 
 		self.param_IO('DS' + x,0)
+		self._param_cache['DS'] = ( x , misc.now_UNIX() ) # remember new DS value
 		print ( 'Set DS value to ' + x + ' bit/amu' )
 
 
@@ -1686,6 +1979,7 @@ class rgams_SRS:
 		rgams_SRS.plot_peakbuffer()
 
 		Plot trend (or update plot) of values in PEAKs data buffer (e.g. after adding data)
+		The plot lines are kept and updated with the new data. The axes, title and legend are only redrawn if the set of mz / detector pairs has changed or if the data do not fit the current axis ranges anymore; otherwise only the lines and the legend are redrawn ("blitting", if supported by the plot backend). The time axis is relative to the time given in the plot title.
 		NOTE: plotting may be slow, and it may therefore be a good idea to keep the update interval low to avoid affecting the duty cycle.
 
 		INPUT:
@@ -1695,7 +1989,10 @@ class rgams_SRS:
 		(none)
 		'''
 
-		if not self._has_display:
+		if self._plotservice is not None:
+			self._peakbuffer_submit_plot()
+
+		elif not self._has_display:
 			self.warning('Plotting of peakbuffer trend not possible (no display system available).')
 
 		else:
@@ -1707,84 +2004,66 @@ class rgams_SRS:
 					self._fig.show()
 					self._figwindow_is_shown = True
 				
-				# remove all the lines that are currently in the plot:
-				self._peakbuffer_ax.lines = []
+				ax = self._peakbuffer_ax
+				canvas = self._fig.canvas
+				blit = self._peakbufferplot_blit
+
+				pb = self._peakbuffer.data() # peakbuffer data (in chronological order)
+				S = self.peakbuffer_series() # mz / detector pairs in the peakbuffer
+				keys = [ (s[0],s[1]) for s in S ]
 
-				# redo the plot by plotting line by line (mz by mz and detector by detector):
-				colors = ('b', 'g', 'r', 'c', 'm', 'y', 'k') # some colors for use with all 'other' mz values
+				# full redraw is needed if the mz / detector pairs have changed or if the background for blitting is not available:
+				redraw = not ( keys == self._peakbufferplot_keys ) or ( blit and ( self._peakbufferplot_bg is None ) )
+
+				# remove lines of mz / detector pairs that are not in the peakbuffer anymore:
+				for key in list(self._peakbufferplot_lines.keys()):
+					if not key in keys:
+						self._peakbufferplot_lines.pop(key).remove()
+
+				# data values of all lines (time values are absolute), legend entries and data range:
 				n = 0
 				leg = []
-				t0 = misc.now_UNIX()			
-				N = len(self._peakbuffer_mz)
-
+				lines = []
 				X_MIN = None
 				X_MAX = None
-
 				Y_MIN = 1
 				Y_MAX = 1
-
-				for mz in numpy.unique(self._peakbuffer_mz): # loop through all mz values in the peak buffer
-					for det in [ 'F' , 'M' ]: # loop through all detectors (Faraday and Multiplier)
-						k = [ i for i in range(N) if ((self._peakbuffer_mz[i] == mz) & (self._peakbuffer_det[i] == det)) ] # index to data with current mz / detector pair
-						if len(k) > 0: # if k is not empty
-							# col = colors[n%7]
-							intens0 = self._peakbuffer_intens[k[0]]
-							col = [c for c in self._peakbufferplot_colors if c[0] == mz]
-							if col:
-								col = col[0][1]
-							else:
-								col = colors[n%7]
-							if det == 'F':
-								style = 'o-'
-							elif det == 'M':
-								style = 's-'
-							else:
-								style = 'x-'
-							
-							yy = self._peakbuffer_intens[k]/intens0
-							tt = self._peakbuffer_t[k] - t0
-							self._peakbuffer_ax.plot( tt , yy , col + style , markersize = 10 )
-
-							val_min = self._peakbuffer_intens[k].min()
-							val_max = self._peakbuffer_intens[k].max()
-							min = "{:.2e}".format(val_min)
-							max = "{:.2e}".format(val_max)
-							leg.append( 'mz=' + str(int(mz)) + ' det=' + det + ': ' + min + ' ... ' + max + ' ' + self._peakbuffer_unit[k[0]] )
-							
-							if X_MIN == None:
-								X_MIN = tt.min()
-							if X_MAX == None:
-								X_MAX = tt.min()
-							if tt.min() < X_MIN:
-								X_MIN = tt.min()
-							if tt.max() > X_MAX:
-								X_MAX = tt.max()
-	
-							if yy.min() < Y_MIN:
-								Y_MIN = yy.min()
-							if yy.max() > Y_MAX:
-								Y_MAX =	yy.max()
-							
-							n = n+1
-			
-				if len(self._peakbuffer_ax.lines) > 0: # if the plot is not empty
-				
-					# set legend location:
-					self._peakbuffer_ax.legend( leg , loc='best' , prop={'size':9} )
-
-					# set title and axis labels:
-					t0 = time.strftime("%b %d %Y %H:%M:%S", time.localtime(t0))
-					self._peakbuffer_ax.set_title('PEAKBUFFER (' + self.label() + ') at ' + t0)
-					self._peakbuffer_ax.set_xlabel('Time (s)')
-					self._peakbuffer_ax.set_ylabel('Intensity (rel.)')
-
-					# Set x-axis scaling:
+				for mz,det,k,val_min,val_max in S: # loop through all mz / detector pairs in the peak buffer
+					if not (mz,det) in self._peakbufferplot_lines: # add new line to the plot
+						self._peakbufferplot_lines[(mz,det)], = ax.plot( [] , [] , self._peakbuffer_line_style(mz,det,n) , markersize = 10 , animated = blit )
+
+					intens0 = pb['intens'][k[0]]
+					yy = pb['intens'][k]/intens0
+					tt = pb['t'][k]
+					lines.append( ( self._peakbufferplot_lines[(mz,det)] , tt , yy ) )
+
+					min = "{:.2e}".format(val_min)
+					max = "{:.2e}".format(val_max)
+					leg.append( 'mz=' + str(int(mz)) + ' det=' + det + ': ' + min + ' ... ' + max + ' ' + pb['unit'][k[0]] )
+					
+					if X_MIN == None:
+						X_MIN = tt[0]
+						X_MAX = tt[-1]
+					if tt[0] < X_MIN:
+						X_MIN = tt[0]
+					if tt[-1] > X_MAX:
+						X_MAX = tt[-1]
+
+					if yy.min() < Y_MIN:
+						Y_MIN = yy.min()
+					if yy.max() > Y_MAX:
+						Y_MAX =	yy.max()
+					
+					n = n+1
+		
+				if len(lines) > 0: # if the plot is not empty
+
+					# x-axis range needed to show the data (absolute time):
 					DX = 0.05*(X_MAX-X_MIN);
 					if DX == 0:
 						DX = 5
-					self._peakbuffer_ax.set_xlim( [ X_MIN-DX , X_MAX+DX ] )
 
-					# Set y-axis scaling:
+					# y-axis range needed to show the data:
 					if Y_MIN < self._peakbuffer_plot_min_y:
 						Y_MIN = self._peakbuffer_plot_min_y
 					if Y_MAX > self._peakbuffer_plot_max_y:
@@ -1793,10 +2072,66 @@ class rgams_SRS:
 						DY = 0.05*(Y_MAX-Y_MIN)
 					else:
 						DY = 0.001
-					self._peakbuffer_ax.set_ylim( [ Y_MIN-DY , Y_MAX+DY ] )
+
+					# check if the data still fit the current axis ranges (and if the axis ranges are not too wide):
+					if not redraw:
+						t0 = self._peakbufferplot_t0
+						xl = ax.get_xlim()
+						yl = ax.get_ylim()
+						if ( X_MIN < xl[0]+t0 ) or ( X_MAX > xl[1]+t0 ) or ( xl[1]-xl[0] > 1.5*(X_MAX-X_MIN+2*DX) ):
+							redraw = True
+						elif ( Y_MIN < yl[0] ) or ( Y_MAX > yl[1] ) or ( yl[1]-yl[0] > 1.5*(Y_MAX-Y_MIN+2*DY) ):
+							redraw = True
+
+					if redraw:
+						# new time reference:
+						self._peakbufferplot_t0 = misc.now_UNIX()
+						t0 = self._peakbufferplot_t0
+
+						# set legend location:
+						if self._peakbufferplot_legend is not None:
+							self._peakbufferplot_legend.remove()
+						self._peakbufferplot_legend = ax.legend( [ l[0] for l in lines ] , leg , loc='best' , prop={'size':9} )
+						self._peakbufferplot_legend.set_animated(blit)
+
+						# set title and axis labels:
+						ax.set_title('PEAKBUFFER (' + self.label() + ') at ' + time.strftime("%b %d %Y %H:%M:%S", time.localtime(t0)))
+						ax.set_xlabel('Time (s)')
+						ax.set_ylabel('Intensity (rel.)')
+
+						# Set axis scaling (leave some space for new data on the time axis):
+						ax.set_xlim( [ X_MIN-DX-t0 , X_MAX+DX-t0 + 0.25*(X_MAX-X_MIN+2*DX) ] )
+						ax.set_ylim( [ Y_MIN-DY , Y_MAX+DY ] )
+
+					else:
+						# update legend text:
+						for txt,l in zip( self._peakbufferplot_legend.get_texts() , leg ):
+							txt.set_text(l)
+
+					# set line data:
+					for l,tt,yy in lines:
+						l.set_data( tt-t0 , yy )
+
+				else: # empty plot
+					if self._peakbufferplot_legend is not None:
+						self._peakbufferplot_legend.remove()
+						self._peakbufferplot_legend = None
+					redraw = True
+
+				self._peakbufferplot_keys = keys
 
 				# Update the plot:
-				self._fig.canvas.flush_events()
+				if redraw:
+					canvas.draw() # full redraw (this also takes a new background for blitting, see self._peakbuffer_on_draw)
+					if blit:
+						canvas.blit(self._fig.bbox)
+				elif blit:
+					canvas.restore_region(self._peakbufferplot_bg) # restore background
+					self._peakbuffer_draw_artists() # draw lines and legend
+					canvas.blit(self._fig.bbox)
+				else:
+					canvas.draw_idle()
+				canvas.flush_events()
 
 			except:
 				self.warning( 'Error during plotting of peakbuffer trend (' + str(sys.exc_info()[0]) + ').' )
@@ -1807,6 +2142,193 @@ class rgams_SRS:
 
 
 
+	def _peakbuffer_line_style(self,mz,det,n):
+		'''
+		style = rgams_SRS._peakbuffer_line_style(mz,det,n)
+
+		Return line style for an mz / detector pair in the peakbuffer plot. Common mz values have fixed colors, other mz values get a color according to their position in the plot. The marker indicates the detector.
+
+		INPUT:
+		mz: mz value
+		det: detector (string, 'F' or 'M')
+		n: index of the mz / detector pair in the plot
+
+		OUTPUT:
+		style: matplotlib line style (string)
+		'''
+
+		colors = ('b', 'g', 'r', 'c', 'm', 'y', 'k') # some colors for use with all 'other' mz values
+		col = [c for c in self._peakbufferplot_colors if c[0] == mz]
+		if col:
+			col = col[0][1]
+		else:
+			col = colors[n%7]
+		if det == 'F':
+			style = 'o-'
+		elif det == 'M':
+			style = 's-'
+		else:
+			style = 'x-'
+		return col + style
+
+
+
+	########################################################################################################
+
+
+
+	def _peakbuffer_submit_plot(self):
+		'''
+		rgams_SRS._peakbuffer_submit_plot()
+
+		Send a copy of the peakbuffer data to the plotservice for plotting (see rgams_SRS.plot_peakbuffer). The time axis is relative to the current time.
+
+		INPUT:
+		(none)
+
+		OUTPUT:
+		(none)
+		'''
+
+		try:
+			t0 = misc.now_UNIX()
+			pb = self._peakbuffer.data()
+			series = []
+			n = 0
+			for mz,det,k,val_min,val_max in self.peakbuffer_series():
+				min = "{:.2e}".format(val_min)
+				max = "{:.2e}".format(val_max)
+				leg = 'mz=' + str(int(mz)) + ' det=' + det + ': ' + min + ' ... ' + max + ' ' + pb['unit'][k[0]]
+				# indexing with k returns copies of the data (the peakbuffer may change before the plotservice draws the plot):
+				series.append( ( (mz,det) , leg , pb['t'][k]-t0 , pb['intens'][k]/pb['intens'][k[0]] , self._peakbuffer_line_style(mz,det,n) ) )
+				n = n+1
+			self._plotservice.submit( self.label() + ' peakbuffer' , {
+				'window_title': 'SRS RGA (' + self.label() + ') PEAKBUFFER',
+				'title': 'PEAKBUFFER (' + self.label() + ') at ' + time.strftime("%b %d %Y %H:%M:%S", time.localtime(t0)),
+				'xlabel': 'Time (s)',
+				'ylabel': 'Intensity (rel.)',
+				'ylim': ( self._peakbuffer_plot_min_y , self._peakbuffer_plot_max_y ),
+				'yformat': '{:.1%}',
+				'series': series } )
+
+		except:
+			self.warning( 'Error during plotting of peakbuffer trend (' + str(sys.exc_info()[0]) + ').' )
+
+
+
+	########################################################################################################
+
+
+
+	def _peakbuffer_draw_artists(self):
+		'''
+		rgams_SRS._peakbuffer_draw_artists()
+
+		Draw the lines and the legend of the peakbuffer plot (used for blitting, see rgams_SRS.plot_peakbuffer).
+
+		INPUT:
+		(none)
+
+		OUTPUT:
+		(none)
+		'''
+
+		for l in self._peakbufferplot_lines.values():
+			self._peakbuffer_ax.draw_artist(l)
+		if self._peakbufferplot_legend is not None:
+			self._peakbuffer_ax.draw_artist(self._peakbufferplot_legend)
+
+
+
+	########################################################################################################
+
+
+
+	def _peakbuffer_on_draw(self,event):
+		'''
+		rgams_SRS._peakbuffer_on_draw(event)
+
+		Callback function for the 'draw_event' of the plot figure (used for blitting, see rgams_SRS.plot_peakbuffer). Take a copy of the figure without the lines and the legend of the peakbuffer plot (background for blitting), and draw the lines and the legend.
+
+		INPUT:
+		event: matplotlib draw event
+
+		OUTPUT:
+		(none)
+		'''
+
+		self._peakbufferplot_bg = self._fig.canvas.copy_from_bbox(self._fig.bbox)
+		self._peakbuffer_draw_artists()
+
+
+
+	########################################################################################################
+
+
+
+	def set_digester(self,d):
+		'''
+		rgams_SRS.set_digester(d)
+
+		Set digester object used to process the PEAK and ZERO values while they are measured (see digester class).
+
+		INPUT:
+		d: digester object. If d = None, no digester is used.
+
+		OUTPUT:
+		(none)
+		'''
+
+		self._digester = d
+
+
+
+	########################################################################################################
+
+
+
+	def set_sensor_sampler(self,S):
+		'''
+		rgams_SRS.set_sensor_sampler(S)
+
+		Set sensorsampler object used to read sensors (pressure, temperature) in a worker thread while the RGA is integrating PEAK and ZERO readings (see sensorsampler class).
+
+		INPUT:
+		S: sensorsampler object. If S = None, no sensors are read during the RGA readings.
+
+		OUTPUT:
+		(none)
+		'''
+
+		self._sensor_sampler = S
+
+
+
+	########################################################################################################
+
+
+
+	def get_sensor_sampler(self):
+		'''
+		S = rgams_SRS.get_sensor_sampler()
+
+		Return sensorsampler object used to read sensors during the RGA readings (see rgams_SRS.set_sensor_sampler).
+
+		INPUT:
+		(none)
+
+		OUTPUT:
+		S: sensorsampler object (None if no sensorsampler is set)
+		'''
+
+		return self._sensor_sampler
+
+
+
+	########################################################################################################
+
+
+
 	def set_peakbuffer_plot_min_y(self,val):
 		'''
 		rgams_SRS.set_peakbuffer_plot_min_y(val)
@@ -1855,8 +2377,8 @@ class rgams_SRS:
 		Plot scan data
 
 		INPUT:
-		mz: mz values (x-axis)
-		intens: intensity values (y-axis)
+		mz: mz values (x-axis, list or numpy array)
+		intens: intensity values (y-axis, list or numpy array)
 		unit: intensity unit (string)
 		cumsum_mz,cumsum_val (optional): cumulative sum of peak data (mz and sum values), as used for peak centering
 
@@ -1864,7 +2386,21 @@ class rgams_SRS:
 		(none)
 		'''
 
-		if not self._has_display:
+		if self._plotservice is not None:
+			series = [ ( 'scan' , None , numpy.array(mz,dtype=float) , numpy.array(intens,dtype=float) , 'k.-' ) ]
+			if len(cumsum_mz) > 0:
+				# normalize cumulative sum values to intens (to match plot scales):
+				cumsum_val = numpy.asarray(cumsum_val) / numpy.max(cumsum_val) * numpy.max(intens)
+				series.append( ( 'cumsum' , None , numpy.array(cumsum_mz,dtype=float) , cumsum_val , 'r.-' ) )
+			t0 = time.strftime("%b %d %Y %H:%M:%S", time.localtime(misc.now_UNIX()))
+			self._plotservice.submit( self.label() + ' scan' , {
+				'window_title': 'SRS RGA (' + self.label() + ') SCAN',
+				'title': 'SCAN (' + self.label() + ')' + ' at ' + t0,
+				'xlabel': 'mz',
+				'ylabel': 'Intensity (' + unit +')',
+				'series': series } )
+
+		elif not self._has_display:
 			self.warning('Plotting of scan data not possible (no display system available).')
 
 		else:
@@ -1876,27 +2412,31 @@ class rgams_SRS:
 					self._fig.show()
 					self._figwindow_is_shown = True
 
-				# remove all the lines that are currently in the plot:
-				self._scan_ax.lines = []
+				if self._scanplot_lines is None:
+					# add lines to the plot (these will be reused for later scans):
+					self._scanplot_lines = ( self._scan_ax.plot( [] , [] , 'k.-' )[0] , self._scan_ax.plot( [] , [] , 'r.-' )[0] )
+					self._scan_ax.set_xlabel('mz')
+					self._fig.tight_layout(pad=1.5)
 
-				self._scan_ax.plot( mz , intens , 'k.-' )
-				if cumsum_mz:
+				self._scanplot_lines[0].set_data( mz , intens )
+				if len(cumsum_mz) > 0:
 					# normalize cumulative sum values to intens (to match plot scales):
-					cumsum_val = cumsum_val / max(cumsum_val) * max(intens)
+					cumsum_val = numpy.asarray(cumsum_val) / numpy.max(cumsum_val) * numpy.max(intens)
 					# add cumulative sum data to plot:
-					self._scan_ax.plot( cumsum_mz , cumsum_val , 'r.-' )
+					self._scanplot_lines[1].set_data( cumsum_mz , cumsum_val )
+				else:
+					self._scanplot_lines[1].set_data( [] , [] )
 
-				self._scan_ax.set_xlabel('mz')
 				self._scan_ax.set_ylabel('Intensity (' + unit +')')
 				t0 = time.strftime("%b %d %Y %H:%M:%S", time.localtime(misc.now_UNIX()))
 				self._scan_ax.set_title('SCAN (' + self.label() + ')' + ' at ' + t0)
-				self._fig.tight_layout(pad=1.5)
 
 				# Set axis scaling (automatic):
 				self._scan_ax.relim()
 				self._scan_ax.autoscale_view()
 
 				# update the plot:
+				self._fig.canvas.draw_idle()
 				self._fig.canvas.flush_events()
 
 			except:
@@ -1967,10 +2507,25 @@ class rgams_SRS:
 
 
 		def pz_cycle (m,g,f,add_to_peakbuffer=True):
+			# list of readings (PEAK and ZERO values, in the order given by m):
+			r = []
 			for i in range(len(m)):
-				self.peak(m[i][0],g,f,add_to_peakbuffer) # read PEAK value
+				if self._check_mz(int(m[i][0])):
+					r.append( ( int(m[i][0]) , 0 ) ) # PEAK value
 				if not m[i][1] == 0:
-					self.zero(m[i][0],m[i][1],g,f) # read ZERO value
+					if self._check_mz(int(m[i][0])+int(m[i][1])):
+						r.append( ( int(m[i][0]) , int(m[i][1]) ) ) # ZERO value (also if the PEAK mz is invalid, as with rgams_SRS.zero)
+			
+			# read all values in one go, then write the data:
+			if len(r) == 0: # no valid m/z values, nothing to read from the RGA
+				return
+			val,t = self._read_masses( [ u[0]+u[1] for u in r ] , g )
+			det = self.get_detector()
+			for i in range(len(r)):
+				if r[i][1] == 0:
+					self._store_peak(r[i][0],val[i],'A',det,g,t[i],f,add_to_peakbuffer)
+				else:
+					self._store_zero(r[i][0],r[i][1],val[i],'A',det,g,t[i],f)
 			if add_to_peakbuffer:
 				self.plot_peakbuffer()
 
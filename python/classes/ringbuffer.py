@@ -0,0 +1,300 @@
+# Code for the ringbuffer class
+# 
+# DISCLAIMER:
+# This file is part of ruediPy, a toolbox for operation of RUEDI mass spectrometer systems.
+# 
+# ruediPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# ruediPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with ruediPy.  If not, see <http://www.gnu.org/licenses/>.
+# 
+# ruediPy: toolbox for operation of RUEDI mass spectrometer systems
+# Copyright (C) 2016  Matthias Brennwald
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2016, 2017, Matthias Brennwald (brennmat@gmail.com)
+
+
+import sys
+import warnings
+import numpy
+
+# check Python version and print warning if we're running version < 3:
+if ( sys.version_info[0] < 3 ):
+	warnings.warn("ruediPy / ringbuffer class is running on Python version < 3. Version 3.0 or newer is recommended!")
+
+
+class ringbuffer:
+	"""
+	ruediPy class for data buffers with a fixed max. number of entries (ring buffer). Each entry consists of one or more data fields (e.g., time, mz value, intensity, etc.). Once the buffer is full, new entries replace the oldest entries. Adding an entry does not copy or reallocate the buffer data, and the buffered data can be accessed in chronological order without copying (the data are stored twice internally, so that the entries are always available as a contiguous block).
+	"""
+	
+	########################################################################################################
+	
+
+	def __init__(self,max_len,fields):
+		"""
+		obj = ringbuffer.__init__(max_len,fields)
+		
+		Initialize RINGBUFFER object
+		
+		INPUT:
+		max_len: max. number of entries in the buffer (integer)
+		fields: data fields of the buffer entries (list of (name,type) tuples, see numpy structured arrays / numpy.dtype)
+		
+		EXAMPLE:
+		B = ringbuffer( 500 , [ ('t','f8') , ('p','f8') , ('unit','U12') ] )
+		
+		OUTPUT:
+		obj: ringbuffer object
+		"""
+		
+		self._dtype = numpy.dtype(fields)
+		self._alloc(max_len)
+
+	
+	########################################################################################################
+	
+
+	def _alloc(self,max_len):
+		"""
+		ringbuffer._alloc(max_len)
+		
+		Allocate (empty) buffer memory
+		
+		INPUT:
+		max_len: max. number of entries in the buffer (integer)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		self._max_len = max(int(max_len),0)
+		self._data = numpy.zeros(2*self._max_len,dtype=self._dtype) # each entry is stored twice (at index i and i+max_len)
+		self._start = 0 # index to oldest entry
+		self._count = 0 # number of entries in the buffer
+
+	
+	########################################################################################################
+	
+
+	def add(self,entry):
+		"""
+		ringbuffer.add(entry)
+		
+		Add entry to the buffer. If the buffer is full, the oldest entry is removed from the buffer.
+		
+		INPUT:
+		entry: tuple with values of the data fields (in the same order as the fields given to ringbuffer.__init__)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		N = self._max_len
+		if N > 0:
+			i = (self._start + self._count) % N
+			self._data[i] = entry
+			self._data[i+N] = entry
+			if self._count < N:
+				self._count = self._count + 1
+			else: # buffer was full, the oldest entry was replaced
+				self._start = (self._start + 1) % N
+
+	
+	########################################################################################################
+	
+
+	def data(self):
+		"""
+		x = ringbuffer.data()
+		
+		Return the buffer entries in chronological order (oldest entry first). The data are not copied, i.e. x is a view of the buffer memory, which will change if new entries are added to the buffer (use x.copy() to keep the data). The data fields can be accessed by name, e.g. x['t'].
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		x: buffer entries (numpy structured array)
+		"""
+		
+		return self._data[self._start:self._start+self._count]
+
+	
+	########################################################################################################
+	
+
+	def last(self,n):
+		"""
+		x = ringbuffer.last(n)
+		
+		Return the n newest buffer entries in chronological order (view of the buffer memory, see ringbuffer.data()).
+		
+		INPUT:
+		n: number of entries (integer)
+		
+		OUTPUT:
+		x: buffer entries (numpy structured array)
+		"""
+		
+		n = min(max(int(n),0),self._count)
+		return self._data[self._start+self._count-n:self._start+self._count]
+
+	
+	########################################################################################################
+	
+
+	def window(self,field,low,high):
+		"""
+		x = ringbuffer.window(field,low,high)
+		
+		Return the buffer entries with values of a given data field within a given range (view of the buffer memory, see ringbuffer.data()). The values of the data field must be increasing from the oldest to the newest entry (e.g., time values).
+		
+		INPUT:
+		field: name of the data field (string, e.g. 't')
+		low, high: range of field values (inclusive). Use low = None or high = None to select all entries below or above a given value.
+		
+		OUTPUT:
+		x: buffer entries (numpy structured array)
+		"""
+		
+		x = self.data()
+		i = 0
+		j = len(x)
+		if low is not None:
+			i = numpy.searchsorted(x[field],low,side='left')
+		if high is not None:
+			j = numpy.searchsorted(x[field],high,side='right')
+		return x[i:max(i,j)]
+
+	
+	########################################################################################################
+	
+
+	def decimated(self,max_points):
+		"""
+		x = ringbuffer.decimated(max_points)
+		
+		Return a subset of the buffer entries with at most max_points entries, taken at regular intervals (every k-th entry) and including the newest entry. The data are not copied (view of the buffer memory, see ringbuffer.data()). This is useful to speed up plotting of long buffers.
+		
+		INPUT:
+		max_points: max. number of entries (integer)
+		
+		OUTPUT:
+		x: buffer entries (numpy structured array)
+		"""
+		
+		x = self.data()
+		n = len(x)
+		max_points = max(int(max_points),1)
+		if n <= max_points:
+			return x
+		k = -(-n // max_points) # step size (rounded up)
+		return x[(n-1)%k::k]
+
+	
+	########################################################################################################
+	
+
+	def length(self):
+		"""
+		n = ringbuffer.length()
+		
+		Return the number of entries in the buffer.
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		n: number of entries (integer)
+		"""
+		
+		return self._count
+
+	
+	########################################################################################################
+	
+
+	def max_length(self):
+		"""
+		n = ringbuffer.max_length()
+		
+		Return the max. number of entries in the buffer.
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		n: max. number of entries (integer)
+		"""
+		
+		return self._max_len
+
+	
+	########################################################################################################
+	
+
+	def clear(self):
+		"""
+		ringbuffer.clear()
+		
+		Remove all entries from the buffer.
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		self._start = 0
+		self._count = 0
+
+	
+	########################################################################################################
+	
+
+	def set_length(self,max_len):
+		"""
+		ringbuffer.set_length(max_len)
+		
+		Set the max. number of entries in the buffer. If the buffer contains more entries than the new max. number, the oldest entries are removed.
+		
+		INPUT:
+		max_len: max. number of entries (integer)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		x = self.data().copy()
+		self._alloc(max_len)
+		if self._max_len > 0:
+			x = x[-self._max_len:] # keep the newest entries
+			n = len(x)
+			self._data[0:n] = x
+			self._data[self._max_len:self._max_len+n] = x
+			self._count = n
+
+
+	########################################################################################################
@@ -216,26 +216,13 @@ class selectorvalve_VICI:
 		# send command to serial port:
 		self.ser.write('CP\r\n'.encode('ascii'))
 		
-		# wait for response
-		t = 0
-		dt = 0.1
-		doWait = 1
-		while doWait:
-			if self.ser.inWaiting() == 0: # wait
-				time.sleep(dt)
-				t = t + dt
-				if t > 5: # give up waiting
-					doWait = 0
-					self.warning('could not determine valve position (no response from valve)')
-					ans = '-1'
-			else:
-				doWait = 0
-				ans = ''
-		
-		# read back result:
-		if (ans != '-1'):
-			while self.ser.inWaiting() > 0: # while there's something in the buffer...
-				ans = ans + self.ser.read().decode('ascii') # read each byte
+		# wait for response and read back result (full line, terminated by <CR>):
+		ans = misc.serial_read_line(self.ser,b'\r',5,'ascii')
+		if len(ans) == 0: # no response
+			self.warning('could not determine valve position (no response from valve)')
+			ans = '-1'
+		else:
+			ans = ans + misc.serial_read_available(self.ser,'ascii') # read remaining bytes (if any)
 		
 		try:
 			# print ans
@@ -0,0 +1,358 @@
+# Code for the sensorsampler class
+# 
+# DISCLAIMER:
+# This file is part of ruediPy, a toolbox for operation of RUEDI mass spectrometer systems.
+# 
+# ruediPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# ruediPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with ruediPy.  If not, see <http://www.gnu.org/licenses/>.
+# 
+# ruediPy: toolbox for operation of RUEDI mass spectrometer systems
+# Copyright (C) 2016  Matthias Brennwald
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2016, 2017, Matthias Brennwald (brennmat@gmail.com)
+
+
+import sys
+import warnings
+import threading
+import numpy
+
+from classes.misc	import misc
+from classes.ringbuffer	import ringbuffer
+
+# check Python version and print warning if we're running version < 3:
+if ( sys.version_info[0] < 3 ):
+	warnings.warn("ruediPy / sensorsampler class is running on Python version < 3. Version 3.0 or newer is recommended!")
+
+
+class sensorsampler:
+	"""
+	ruediPy class for reading sensors (pressuresensor_WIKA, pressuresensor_OMEGA, temperaturesensor_MAXIM) in a worker thread while the RGA is integrating the ion current of a PEAK or ZERO reading (see rgams_SRS.set_sensor_sampler). The sensors are read whenever the RGA starts a new reading and the worker thread is not busy with the previous sensor readings, so the sensor readings do not add to the duration of the RGA measurement cycles. The sensor data are written to the data file (as if the sensors were read directly), and are also kept in a buffer together with the number and start time of the RGA cycle (call of rgams_SRS.peak, rgams_SRS.zero, rgams_SRS.peaks, or PEAK/ZERO cycle of rgams_SRS.peak_zero_loop) during which they were read. The RGA cycle number and start time are only kept in the buffer (see sensorsampler.samples), they are not written to the data file.
+	
+	The sensors may still be read directly (e.g. P1.pressure(DATAFILE)) while the sensorsampler is running: each sensor object reads its serial port from one thread at a time, so a direct reading waits until the worker thread is done with that sensor (and vice versa).
+	
+	EXAMPLE:
+	S = sensorsampler( [ P1 , P2 , T ] , DATAFILE )
+	MS.set_sensor_sampler(S)
+	MS.peak_zero_loop ( ... )
+	S.stop()
+	"""
+	
+	########################################################################################################
+	
+
+	def __init__(self,sensors,f='nofile',min_interval=0,max_buffer_points=1000):
+		"""
+		obj = sensorsampler.__init__(sensors,f='nofile',min_interval=0,max_buffer_points=1000)
+		
+		Initialize SENSORSAMPLER object and start the worker thread
+		
+		INPUT:
+		sensors: sensor objects (list of pressuresensor_WIKA, pressuresensor_OMEGA, or temperaturesensor_MAXIM objects)
+		f (optional): file object for writing the sensor data (see datafile.py). If f = 'nofile', data is not written to any data file. Default: f = 'nofile'
+		min_interval (optional): minimum time between the start of two sensor readings (seconds). Default: min_interval = 0 (read the sensors as often as possible)
+		max_buffer_points (optional): max. number of sensor readings kept in the buffer (see sensorsampler.samples). Default: max_buffer_points = 1000
+		
+		OUTPUT:
+		obj: sensorsampler object
+		"""
+
+		self._sensors = list(sensors)
+		self._f = f
+		self._min_interval = min_interval
+		self._samples = ringbuffer( max_buffer_points , [ ('cycle','i8') , ('t_cycle','f8') , ('t','f8') , ('sensor','U32') , ('value','f8') , ('unit','U16') ] )
+		self._lock = threading.Lock() # lock for the samples buffer
+		self._read_lock = threading.Lock() # held by the worker thread while reading a batch of sensor readings (see sensorsampler.pause and sensorsampler.set_datafile)
+		
+		self._cycle = 0 # number of the current RGA cycle
+		self._t_cycle = numpy.nan # start time of the current RGA cycle
+		self._t_last = -numpy.inf # start time of the last sensor readings
+		self._skipped = 0 # number of RGA readings during which the sensors were not read because the worker thread was busy
+		
+		self._go = threading.Event() # tells the worker thread to read the sensors
+		self._busy = False
+		self._paused = False
+		self._stop = False
+		self._thread = threading.Thread( target = self._run , daemon = True )
+		self._thread.start()
+
+	
+	########################################################################################################
+	
+
+	def label(self):
+		"""
+		lab = sensorsampler.label()
+		
+		Return label / name of the SENSORSAMPLER object
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		lab: label / name (string)
+		"""
+		
+		return 'SENSORSAMPLER'
+
+	
+	########################################################################################################
+	
+
+	def warning(self,msg):
+		"""
+		sensorsampler.warning(msg)
+		
+		Warn about issues related to SENSORSAMPLER object
+		
+		INPUT:
+		msg: warning message (string)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		misc.warnmessage ('SENSORSAMPLER',msg)
+
+	
+	########################################################################################################
+	
+
+	def set_datafile(self,f):
+		"""
+		sensorsampler.set_datafile(f)
+		
+		Set file object for writing the sensor data. Waits until the worker thread is done with the current sensor readings, which are written to the previous file object. The new file object is used from the next sensor readings.
+		
+		INPUT:
+		f: file object for writing data (see datafile.py). If f = 'nofile', data is not written to any data file.
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		with self._read_lock:
+			self._f = f
+
+	
+	########################################################################################################
+	
+
+	def pause(self):
+		"""
+		sensorsampler.pause()
+		
+		Pause the sensor readings, e.g. while starting a new data file (see datafile.next). Waits until the worker thread is done with the current sensor readings. The sensors are not read until sensorsampler.resume() is called.
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		with self._read_lock:
+			self._paused = True
+			self._go.clear()
+
+	
+	########################################################################################################
+	
+
+	def resume(self):
+		"""
+		sensorsampler.resume()
+		
+		Resume the sensor readings after sensorsampler.pause().
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		self._paused = False
+
+	
+	########################################################################################################
+	
+
+	def start_cycle(self):
+		"""
+		sensorsampler.start_cycle()
+		
+		Start a new RGA cycle (called by rgams_SRS before the RGA readings of a cycle).
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		self._cycle = self._cycle + 1
+		self._t_cycle = misc.now_UNIX()
+
+	
+	########################################################################################################
+	
+
+	def trigger(self):
+		"""
+		sensorsampler.trigger()
+		
+		Tell the worker thread to read the sensors (called by rgams_SRS when the RGA starts integrating a reading). Nothing is done if the worker thread is still busy with the previous sensor readings, or if the last sensor readings started less than min_interval seconds ago. This method does not wait for the sensor readings.
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		if self._paused:
+			return
+		
+		if self._busy or self._go.is_set():
+			self._skipped = self._skipped + 1
+			return
+		
+		t = misc.now_UNIX()
+		if t - self._t_last >= self._min_interval:
+			self._t_last = t
+			self._go.set()
+
+	
+	########################################################################################################
+	
+
+	def _run(self):
+		"""
+		sensorsampler._run()
+		
+		Worker thread: read the sensors whenever triggered (see sensorsampler.trigger).
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		while True:
+			self._go.wait()
+			if self._stop:
+				return
+			self._busy = True
+			with self._read_lock:
+				self._go.clear()
+				if not self._paused:
+					f = self._f # same file object for all readings of this batch
+					cycle = self._cycle
+					t_cycle = self._t_cycle
+					for s in self._sensors:
+						try:
+							if hasattr(s,'pressure'):
+								val,unit = s.pressure(f)
+							else:
+								val,unit = s.temperature(f)
+							if val is None:
+								val = numpy.nan
+							with self._lock:
+								self._samples.add( ( cycle , t_cycle , misc.now_UNIX() , s.label() , val , unit ) )
+						except Exception as e:
+							self.warning ('could not read sensor ' + str(s.label()) + ': ' + str(e))
+			self._busy = False
+
+	
+	########################################################################################################
+	
+
+	def samples(self):
+		"""
+		X = sensorsampler.samples()
+		
+		Return the sensor readings in the buffer
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		X: numpy structured array with one entry for each sensor reading (oldest first), with the following fields:
+			cycle: number of the RGA cycle during which the sensor was read (1, 2, 3, ...)
+			t_cycle: start time of the RGA cycle (epoch time)
+			t: time of the sensor reading (epoch time)
+			sensor: label / name of the sensor (string)
+			value: sensor value (float, NaN if the sensor could not be read)
+			unit: unit of the sensor value (string)
+		"""
+		
+		with self._lock:
+			return self._samples.data().copy()
+
+	
+	########################################################################################################
+	
+
+	def skipped(self):
+		"""
+		n = sensorsampler.skipped()
+		
+		Return the number of RGA readings during which the sensors were not read because the worker thread was still busy with the previous sensor readings.
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		n: number of skipped RGA readings (integer)
+		"""
+		
+		return self._skipped
+
+	
+	########################################################################################################
+	
+
+	def stop(self):
+		"""
+		sensorsampler.stop()
+		
+		Stop the worker thread (after the current sensor readings are done).
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		self._stop = True
+		self._go.set()
+		self._thread.join()
+
+
+	########################################################################################################
@@ -0,0 +1,361 @@
+# Code for the sequencer class
+# 
+# DISCLAIMER:
+# This file is part of ruediPy, a toolbox for operation of RUEDI mass spectrometer systems.
+# 
+# ruediPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# ruediPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with ruediPy.  If not, see <http://www.gnu.org/licenses/>.
+# 
+# ruediPy: toolbox for operation of RUEDI mass spectrometer systems
+# Copyright (C) 2016  Matthias Brennwald
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2016, 2017, Matthias Brennwald (brennmat@gmail.com)
+
+
+import sys
+import warnings
+import time
+
+from classes.misc	import misc
+
+# check Python version and print warning if we're running version < 3:
+if ( sys.version_info[0] < 3 ):
+	warnings.warn("ruediPy / sequencer class is running on Python version < 3. Version 3.0 or newer is recommended!")
+
+
+class sequencer:
+	"""
+	ruediPy class for running a sequence of analysis steps from a declarative plan (instead of a script chaining selectorvalve_VICI.setpos, misc.sleep, rgams_SRS.peak_zero_loop, and datafile.next).
+	
+	The plan is a list of steps. Each step is a dict with the following keys (all keys except 'peaks' are optional):
+		'type': analysis type ('SAMPLE', 'STANDARD', 'BLANK', or 'MISC', see datafile.next). A new data file is started for each step with a 'type'.
+		'samplename': sample name (string, only used with type = 'SAMPLE')
+		'standardconc': standard gas information (only used with type = 'STANDARD', see datafile.next)
+		'valve': valve position (integer, see selectorvalve_VICI.setpos)
+		'wait': waiting time after switching the valve (seconds), e.g. for flushing the gas lines. If the step does not switch the valve, the waiting time is counted from the start of the step. Default: 0
+		'peaks': PEAK / ZERO readings (list of tuples (mz,mz_offset,detector,gate), see rgams_SRS.peak_zero_loop). If mz_offset = 0, no ZERO value is read.
+		'cycles': number of PEAK / ZERO cycles written to the data file. Default: 1
+		'conditioning': number of PEAK / ZERO cycles used for conditioning of the detector before recording the data (not written to the data file). Default: 0
+	
+	The PEAK / ZERO readings of each step are grouped by detector and gate time (one rgams_SRS.peak_zero_loop for each group). The groups are ordered such that each step starts with the detector and gate time used at the end of the previous step, which minimises the number of detector switches (with the CEM high voltage settling time) and noise floor (NF) changes. The detector needed at the beginning of a step is switched on right after switching the valve, so the CEM high voltage settles during the waiting time. Waiting times are counted from the valve switch of the step, or from the start of the step if the step does not switch the valve (not from the end of the commands that follow it).
+	
+	EXAMPLE:
+	plan = [
+		{ 'type': 'STANDARD' , 'standardconc': [ ('N2',0.781,28) , ('Ar-40',0.009303,40) ] , 'valve': 1 , 'wait': 300 , 'peaks': [ (28,-1,'F',0.5) , (40,-1,'F',0.5) , (84,-1,'M',2.4) ] , 'cycles': 10 , 'conditioning': 2 } ,
+		{ 'type': 'SAMPLE' , 'samplename': 'Lake-1' , 'valve': 3 , 'wait': 600 , 'peaks': [ (28,-1,'F',0.5) , (40,-1,'F',0.5) , (84,-1,'M',2.4) ] , 'cycles': 10 , 'conditioning': 2 }
+	]
+	S = sequencer( plan , MS , valve = VALVE , f = DATAFILE )
+	S.print_schedule()
+	S.run()
+	"""
+	
+	########################################################################################################
+	
+
+	def __init__(self,plan,ms,valve=None,f='nofile'):
+		"""
+		obj = sequencer.__init__(plan,ms,valve=None,f='nofile')
+		
+		Initialize SEQUENCER object and determine the command schedule of the plan.
+		
+		INPUT:
+		plan: list of analysis steps (see above)
+		ms: rgams_SRS object
+		valve (optional): selectorvalve_VICI object (needed if the plan uses valve positions). Default: valve = None
+		f (optional): file object for writing data (see datafile.py). If f = 'nofile', data is not written to any data file. Default: f = 'nofile'
+		
+		OUTPUT:
+		obj: sequencer object
+		"""
+
+		self._ms = ms
+		self._valve = valve
+		self._f = f
+		self._plan = list(plan)
+		
+		for i in range(len(self._plan)):
+			step = self._plan[i]
+			if not 'peaks' in step:
+				raise ValueError( 'Step ' + str(i+1) + ' of the plan has no PEAK / ZERO readings.' )
+			if ( 'valve' in step ) and ( valve is None ):
+				raise ValueError( 'Step ' + str(i+1) + ' of the plan uses valve position ' + str(step['valve']) + ', but there is no valve.' )
+			for p in step['peaks']:
+				if not ( len(p) == 4 ):
+					raise ValueError( 'Step ' + str(i+1) + ' of the plan has a PEAK / ZERO reading that is not a tuple (mz,mz_offset,detector,gate): ' + str(p) )
+		
+		self._schedule = sequencer._make_schedule(self._plan)
+
+	
+	########################################################################################################
+	
+
+	def label(self):
+		"""
+		lab = sequencer.label()
+		
+		Return label / name of the SEQUENCER object
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		lab: label / name (string)
+		"""
+		
+		return 'SEQUENCER'
+
+	
+	########################################################################################################
+	
+
+	def warning(self,msg):
+		"""
+		sequencer.warning(msg)
+		
+		Warn about issues related to SEQUENCER object
+		
+		INPUT:
+		msg: warning message (string)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		misc.warnmessage ('SEQUENCER',msg)
+
+	
+	########################################################################################################
+	
+
+	def schedule(self):
+		"""
+		S = sequencer.schedule()
+		
+		Return the command schedule of the plan.
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		S: list of commands (tuples), in the order of execution:
+			('STEP',i): start of step i of the plan (i = 1, 2, 3, ...)
+			('NEXT',typ,samplename,standardconc): start new data file (see datafile.next)
+			('VALVE',pos): switch valve to position pos
+			('DETECTOR',det): switch to detector det ('F' or 'M')
+			('WAIT',wait): wait until wait seconds after the valve switch of the step (or after the start of the step if the step does not switch the valve)
+			('PEAKZERO',mz,det,gate,cycles,conditioning): PEAK / ZERO cycles (see rgams_SRS.peak_zero_loop), mz is a list of (mz,mz_offset) tuples
+		"""
+		
+		return list(self._schedule)
+
+	
+	########################################################################################################
+	
+
+	def switches(self):
+		"""
+		n_det,n_gate = sequencer.switches()
+		
+		Return the number of detector switches and gate time (NF) changes in the command schedule (the numbers of commands actually sent to the RGA are printed by sequencer.run).
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		n_det: number of detector switches (integer)
+		n_gate: number of gate time changes (integer)
+		"""
+		
+		n_det = 0
+		n_gate = 0
+		det = None
+		gate = None
+		for c in self._schedule:
+			if c[0] == 'DETECTOR':
+				if ( det is not None ) and ( not c[1] == det ):
+					n_det = n_det + 1
+				det = c[1]
+			elif c[0] == 'PEAKZERO':
+				if ( gate is not None ) and ( not c[3] == gate ):
+					n_gate = n_gate + 1
+				gate = c[3]
+		
+		return n_det,n_gate
+
+	
+	########################################################################################################
+	
+
+	def print_schedule(self):
+		"""
+		sequencer.print_schedule()
+		
+		Print the command schedule of the plan.
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		for c in self._schedule:
+			if c[0] == 'STEP':
+				print ( 'Step ' + str(c[1]) + ':' )
+			elif c[0] == 'NEXT':
+				print ( '  New data file (' + c[1] + ( ': ' + c[2] if c[2] else '' ) + ')' )
+			elif c[0] == 'VALVE':
+				print ( '  Valve position ' + str(c[1]) )
+			elif c[0] == 'DETECTOR':
+				print ( '  Detector ' + c[1] )
+			elif c[0] == 'WAIT':
+				print ( '  Wait until ' + str(c[1]) + ' s after valve switch (or start of step)' )
+			elif c[0] == 'PEAKZERO':
+				print ( '  PEAK/ZERO ' + str(c[1]) + ', detector=' + c[2] + ', gate=' + str(c[3]) + ' s, ' + str(c[4]) + ' cycles (' + str(c[5]) + ' conditioning cycles)' )
+		n_det,n_gate = self.switches()
+		print ( str(n_det) + ' detector switches, ' + str(n_gate) + ' gate time changes.' )
+
+	
+	########################################################################################################
+	
+
+	def run(self):
+		"""
+		sequencer.run()
+		
+		Execute the command schedule of the plan, and print the number of detector switches and gate time (NF) changes sent to the RGA (the commands are only sent if the RGA setting changes, see rgams_SRS.set_detector and rgams_SRS.set_noise_floor).
+		
+		INPUT:
+		(none)
+		
+		OUTPUT:
+		(none)
+		"""
+		
+		n_det = self._ms.get_detector_switch_count()
+		n_gate = self._ms.get_noise_floor_count()
+		t_valve = time.time() # time of the valve switch of the current step (or start of the step)
+		pos = None
+		for c in self._schedule:
+			if c[0] == 'STEP':
+				t_valve = time.time()
+			elif c[0] == 'NEXT':
+				if not ( self._f == 'nofile' ):
+					S = self._ms.get_sensor_sampler() if hasattr(self._ms,'get_sensor_sampler') else None
+					if S is not None:
+						S.pause() # finish the current sensor readings before starting the new file
+					try:
+						self._f.next( typ = c[1] , samplename = c[2] , standardconc = c[3] )
+					finally:
+						if S is not None:
+							S.resume()
+			elif c[0] == 'VALVE':
+				self._valve.setpos(c[1],self._f)
+				t_valve = time.time()
+				pos = c[1]
+			elif c[0] == 'DETECTOR':
+				self._ms.set_detector(c[1])
+			elif c[0] == 'WAIT':
+				dt = t_valve + c[1] - time.time()
+				if dt > 0:
+					misc.sleep(dt,'valve position ' + str(pos) if pos is not None else '')
+			elif c[0] == 'PEAKZERO':
+				self._ms.peak_zero_loop( c[1] , c[2] , c[3] , c[4] , c[5] , self._f )
+		
+		n_det = self._ms.get_detector_switch_count() - n_det
+		n_gate = self._ms.get_noise_floor_count() - n_gate
+		print ( str(n_det) + ' detector switches, ' + str(n_gate) + ' gate time changes sent to the RGA.' )
+
+	
+	########################################################################################################
+	
+
+	@staticmethod
+	def _make_schedule(plan):
+		"""
+		S = sequencer._make_schedule(plan)
+		
+		Determine the command schedule of a plan (see sequencer.schedule).
+		
+		INPUT:
+		plan: list of analysis steps (see sequencer class)
+		
+		OUTPUT:
+		S: list of commands
+		"""
+		
+		S = []
+		det = None # detector at the end of the previous step
+		gate = None # gate time at the end of the previous step
+		for i in range(len(plan)):
+			step = plan[i]
+			
+			# group PEAK / ZERO readings by detector and gate time (keep the mz order within each group):
+			groups = {}
+			for mz,mz_offset,d,g in step['peaks']:
+				key = ( d , g )
+				if not key in groups:
+					groups[key] = []
+				groups[key].append( ( mz , mz_offset ) )
+			
+			# order the groups: start with the current detector (and gate time), then the other detector(s):
+			keys = list(groups.keys()) # order of first appearance in the plan
+			dets = []
+			for d,g in keys:
+				if not d in dets:
+					dets.append(d)
+			if det in dets:
+				dets.remove(det)
+				dets.insert(0,det)
+			order = []
+			for d in dets:
+				u = [ k for k in keys if k[0] == d ]
+				if ( len(order) == 0 ) and ( (d,gate) in u ): # start with the current gate time
+					u.remove( (d,gate) )
+					u.insert( 0 , (d,gate) )
+				order = order + u
+			
+			# commands of this step:
+			S.append( ( 'STEP' , i+1 ) )
+			if 'type' in step:
+				S.append( ( 'NEXT' , step['type'] , step.get('samplename','') , step.get('standardconc',[]) ) )
+			if 'valve' in step:
+				S.append( ( 'VALVE' , step['valve'] ) )
+			if ( len(order) > 0 ) and ( not order[0][0] == det ):
+				S.append( ( 'DETECTOR' , order[0][0] ) ) # switch detector before waiting, so the CEM high voltage settles during the waiting time
+				det = order[0][0]
+			if step.get('wait',0) > 0:
+				S.append( ( 'WAIT' , step['wait'] ) )
+			for k in order:
+				if not k[0] == det:
+					S.append( ( 'DETECTOR' , k[0] ) )
+				S.append( ( 'PEAKZERO' , groups[k] , k[0] , k[1] , step.get('cycles',1) , step.get('conditioning',0) ) )
+				det,gate = k
+		
+		return S
+
+
+	########################################################################################################
@@ -40,8 +40,10 @@ import warnings
 import numpy
 import os
 import time
+import threading
 
 from classes.misc	 import misc
+from classes.ringbuffer	 import ringbuffer
 from digitemp.master import UART_Adapter
 from digitemp.device import AddressableDevice
 from digitemp.device import DS18B20
@@ -76,9 +78,9 @@ class temperaturesensor_MAXIM:
 	########################################################################################################
 	
 	
-	def __init__( self , serialport , romcode = '', label = 'TEMPERATURESENSOR' , plot_title = None , max_buffer_points = 500 , fig_w = 6.5 , fig_h = 5):
+	def __init__( self , serialport , romcode = '', label = 'TEMPERATURESENSOR' , plot_title = None , max_buffer_points = 500 , fig_w = 6.5 , fig_h = 5 , plot_service = None):
 		'''
-		temperaturesensor_MAXIM.__init__( serialport , romcode, label = 'TEMPERATURESENSOR' , plot_title = None , max_buffer_points = 500 , fig_w = 6.5 , fig_h = 5 )
+		temperaturesensor_MAXIM.__init__( serialport , romcode, label = 'TEMPERATURESENSOR' , plot_title = None , max_buffer_points = 500 , fig_w = 6.5 , fig_h = 5 , plot_service = None )
 		
 		Initialize TEMPERATURESENSOR object (MAXIM), configure serial port / 1-wire bus for connection to DS18B20 temperature sensor chip
 		
@@ -89,13 +91,16 @@ class temperaturesensor_MAXIM:
 		plot_title (optional): title string for use in plot window. If plot_title = None, the sensor label is used. Default: label = None
 		max_buffer_points (optional): max. number of data points in the PEAKS buffer. Once this limit is reached, old data points will be removed from the buffer. Default value: max_buffer_points = 500
 		fig_w, fig_h (optional): width and height of figure window used to plot data (inches)
+		plot_service (optional): plotservice object used to plot the data in a separate process. If a plotservice object is given, the sensor object does not open its own plot window (default: plot_service = None)
 		
 		OUTPUT:
 		(none)
 		'''
 		
 		self._label = label
-		self._has_display = havedisplay
+		self._read_lock = threading.Lock() # serial port access (the sensor may be read from several threads, e.g. by a sensorsampler, see sensorsampler class)
+		self._plotservice = plot_service
+		self._has_display = havedisplay and ( plot_service is None ) # plots are done by the plotservice if there is one
 		
 		if plot_title == None:
 			self._plot_title = self._label
@@ -125,10 +130,7 @@ class temperaturesensor_MAXIM:
 					self._ROMcode = romcode
 		
 			# data buffer for temperature values:
-			self._tempbuffer_t = numpy.array([])
-			self._tempbuffer_T = numpy.array([])
-			self._tempbuffer_unit = ['x'] * 0 # empty list
-			self._tempbuffer_max_len = max_buffer_points
+			self._tempbuffer = ringbuffer( max_buffer_points , [ ('t','f8') , ('T','f8') , ('unit','U12') ] )
 	
 			# set up plotting environment
 			if self._has_display: # prepare plotting environment and figure
@@ -215,15 +217,16 @@ class temperaturesensor_MAXIM:
 		if not(hasattr(self,'_sensor')):
 			self.warning( 'sensor is not initialised, could not read data.' )
 		else:
-			try:
-				temp = self._sensor.get_temperature()
-				unit = 'deg.C'
+			with self._read_lock: # one thread at a time
+				try:
+					temp = self._sensor.get_temperature()
+					unit = 'deg.C'
 		
-				# add data to peakbuffer
-				if add_to_tempbuffer:
-					self.tempbuffer_add(t,temp,unit)
-			except:
-				self.warning( 'could not read sensor!' )
+					# add data to peakbuffer
+					if add_to_tempbuffer:
+						self.tempbuffer_add(t,temp,unit)
+				except:
+					self.warning( 'could not read sensor!' )
 
 		# write data to datafile
 		if not ( f == 'nofile' ):
@@ -271,16 +274,7 @@ class temperaturesensor_MAXIM:
 		(none)
 		"""
 				
-		self._tempbuffer_t = numpy.append( self._tempbuffer_t , t )
-		self._tempbuffer_T = numpy.append( self._tempbuffer_T , T )
-		self._tempbuffer_unit.append( unit )
-
-		N = self._tempbuffer_max_len
-		
-		if self._tempbuffer_t.shape[0] > N:
-			self._tempbuffer_t 	     = self._tempbuffer_t[-N:]
-			self._tempbuffer_T 	     = self._tempbuffer_T[-N:]
-			self._tempbuffer_unit        = self._tempbuffer_unit[-N:]
+		self._tempbuffer.add( (t,T,unit) ) # the oldest entry is removed once the buffer is full
 
 
 	########################################################################################################
@@ -300,7 +294,23 @@ class temperaturesensor_MAXIM:
 		(none)
 		'''
 
-		if not self._has_display:
+		if self._plotservice is not None:
+			t0 = misc.now_UNIX()
+			b = self._tempbuffer.data() # buffer data (in chronological order)
+			t = ''
+			if self._plot_title:
+				t = ' (' + self._plot_title + ')'
+			u = ''
+			if len(b) > 0:
+				u = str(b['unit'][0])
+			self._plotservice.submit( self._label + ' tempbuffer' , {
+				'window_title': 'MAXIM DS1820' + t,
+				'title': 'TEMPBUFFER' + t + ' at ' + time.strftime("%b %d %Y %H:%M:%S", time.localtime(t0)),
+				'xlabel': 'Time (s)',
+				'ylabel': 'Temperature (' + u + ')',
+				'series': [ ( 'T' , None , b['t']-t0 , b['T'].copy() , 'ko-' ) ] } )
+
+		elif not self._has_display:
 			self.warning('Plotting of tempbuffer trend not possible (no display system available).')
 
 		else:
@@ -314,7 +324,8 @@ class temperaturesensor_MAXIM:
 
 				# Set plot data:
 				t0 = misc.now_UNIX()
-				self._tempbuffer_ax.lines[0].set_data( self._tempbuffer_t - t0 , self._tempbuffer_T )
+				b = self._tempbuffer.data() # buffer data (in chronological order)
+				self._tempbuffer_ax.lines[0].set_data( b['t'] - t0 , b['T'] )
 
 				# Scale axes:
 				self._tempbuffer_ax.relim()
@@ -328,7 +339,7 @@ class temperaturesensor_MAXIM:
 				self._tempbuffer_ax.set_title(t + ' at ' + t0)
 
 				# Get temperature units right:
-				self._tempbuffer_ax.set_ylabel('Temperature (' + str(self._tempbuffer_unit[0]) + ')' )
+				self._tempbuffer_ax.set_ylabel('Temperature (' + str(b['unit'][0]) + ')' )
 
 				# Update the plot:
 				# self._fig.canvas.draw()
@@ -359,9 +370,7 @@ class temperaturesensor_MAXIM:
 		if not(hasattr(self,'_sensor')):
 			self.warning( 'sensor is not initialised, could not clear data buffer.' )
 		else:
-			self._tempbuffer_t = self._tempbuffer_t[[]]
-			self._tempbuffer_T = self._tempbuffer_T[[]]
-			self._tempbuffer_unit = ['x'] * 0 # empty list
+			self._tempbuffer.clear()
 
 
 
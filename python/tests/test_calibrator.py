@@ -0,0 +1,172 @@
+# Tests for the calibrator class
+# 
+# DISCLAIMER:
+# This file is part of ruediPy, a toolbox for operation of RUEDI mass spectrometer systems.
+# 
+# ruediPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# ruediPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with ruediPy.  If not, see <http://www.gnu.org/licenses/>.
+# 
+# ruediPy: toolbox for operation of RUEDI mass spectrometer systems
+# Copyright (C) 2016  Matthias Brennwald
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2016, 2017, Matthias Brennwald (brennmat@gmail.com)
+
+
+import numpy
+
+from classes.datafile import datafile
+from classes.calibrator import calibrator
+
+
+PEAK_DTYPE = [ ('t','f8') , ('mz','f8') , ('intensity','f8') , ('unit','U1') , ('det','U1') , ('gate','f8') , ('file','i4') ]
+
+
+def table(rows):
+	X = numpy.zeros( len(rows) , dtype = PEAK_DTYPE )
+	for i in range(len(rows)):
+		X[i] = rows[i]
+	return X
+
+
+def test_digest_interpolates_zeros():
+	# file 0, mz=28 F: ZEROs 1.0 at t=0 and 3.0 at t=10, PEAKs 12.0 at t=5 and 14.5 at t=7.5 --> net 10 and 12
+	peaks = table( [ (5,28,12.0,'A','F',1,0) , (7.5,28,14.5,'A','F',1,0) ] )
+	zeros = table( [ (0,28,1.0,'A','F',1,0) , (10,28,3.0,'A','F',1,0) ] )
+	X = calibrator.digest(peaks,zeros)
+	assert len(X) == 1
+	assert X['file'][0] == 0 and X['mz'][0] == 28 and X['det'][0] == 'F'
+	assert X['N'][0] == 2
+	assert numpy.isclose( X['mean'][0] , 11.0 )
+	assert numpy.isclose( X['mean_err'][0] , numpy.std([10.0,12.0],ddof=1) )
+	assert numpy.isclose( X['time'][0] , 6.25 )
+
+
+def test_digest_groups_and_outside_zeros():
+	peaks = table( [
+		(0,40,11.0,'A','M',1,0) , # before first ZERO: use first ZERO
+		(3,40,13.0,'A','M',1,0) , # after last ZERO: use last ZERO
+		(0,40,5.0,'A','M',1,1) , # other file, no ZEROs
+		(1,40,7.0,'A','M',1,1) ,
+		(0,28,2.0,'A','F',1,0) ] ) # other mz, single value
+	zeros = table( [ (1,40,1.0,'A','M',1,0) , (2,40,3.0,'A','M',1,0) , (0.5,28,0.5,'A','F',1,0) ] )
+	X = calibrator.digest(peaks,zeros)
+	X = { ( int(x['file']) , int(x['mz']) , str(x['det']) ): x for x in X }
+	assert sorted(X.keys()) == [ (0,28,'F') , (0,40,'M') , (1,40,'M') ]
+	assert numpy.isclose( X[(0,40,'M')]['mean'] , 10.0 )
+	assert numpy.isclose( X[(1,40,'M')]['mean'] , 6.0 ) # no baseline correction
+	assert numpy.isclose( X[(0,28,'F')]['mean'] , 1.5 )
+	assert numpy.isnan( X[(0,28,'F')]['mean_err'] ) # N = 1
+
+
+def test_sensor_means():
+	X = numpy.zeros( 5 , dtype = [ ('t','f8') , ('value','f8') , ('unit','U4') , ('file','i4') ] )
+	X['t'] = [1,2,3,10,20]
+	X['value'] = [1000,1002,1004,990,980]
+	X['unit'] = 'hPa'
+	X['file'] = [0,0,0,2,2]
+	val,err,t,unit = calibrator._sensor_means(X,3)
+	assert numpy.allclose( val[[0,2]] , [1002,985] )
+	assert numpy.isnan( val[1] )
+	assert numpy.isclose( err[0] , numpy.std([1000,1002,1004],ddof=1) / numpy.sqrt(2) )
+	assert numpy.allclose( t[[0,2]] , [2,15] )
+	assert unit == 'hPa'
+
+
+def test_match():
+	assert calibrator._match('RGA_SRS[MS]',[])
+	assert calibrator._match('RGA_SRS[MS]',['MS'])
+	assert calibrator._match('RGA_SRS[MS]','RGA_SRS[MS]')
+	assert not calibrator._match('RGA_SRS[MS]',['MS2'])
+
+
+def test_format_triple():
+	assert calibrator._format_triple(1500000000.123,1.5,0.25) == ';1500000000.12;1.5;0.25'
+	assert calibrator._format_triple(numpy.nan,numpy.nan,1) == ';NA;NA;1'
+
+
+def write_step(pth,typ,T,peak,zero=0.5,pressure=None):
+	# data file of one analysis step: PEAKs at T+1, T+3, T+5 and ZEROs at T, T+2, T+4, T+6 (mz=28, Faraday)
+	d = pth / ( typ + str(T) )
+	d.mkdir()
+	f = datafile( str(d) )
+	if typ == 'STANDARD':
+		f.next( typ , standardconc = [ ('N2',0.5,28) ] )
+	else:
+		f.next( typ , samplename = 'S' + str(T) )
+	for k in range(4):
+		f.write_zero( 'RGA_SRS' , 'MS' , 28 , -1 , zero , 'A' , 'F' , 1 , T+2*k )
+		if k < 3:
+			f.write_peak( 'RGA_SRS' , 'MS' , 28 , peak[k] , 'A' , 'F' , 1 , T+2*k+1 )
+	if pressure is not None:
+		f.write_pressure( 'PRESSURESENSOR_WIKA' , 'P' , pressure , 'hPa' , T+7 )
+	f.close()
+	return f.name()
+
+
+def batch(tmp_path):
+	names = [
+		write_step( tmp_path , 'BLANK'    ,   0 , [1.5,1.5,1.5] ) , # net 1.0
+		write_step( tmp_path , 'STANDARD' , 100 , [100.5,101.5,102.5] ) , # net 101 --> blank corrected 100, sensitivity 100/(1000*0.5) = 0.2
+		write_step( tmp_path , 'SAMPLE'   , 200 , [51.5,51.5,51.5] , pressure = 990 ) , # net 51 --> blank corrected 50
+		write_step( tmp_path , 'STANDARD' , 300 , [201.5,201.5,201.5] ) , # sensitivity 0.4
+		write_step( tmp_path , 'BLANK'    , 400 , [1.5,1.5,1.5] ) ]
+	return calibrator( names , standardgas_pressure = 1000 , standardgas_pressure_unit = 'hPa' , processes = 1 )
+
+
+def test_calibration_matrices(tmp_path):
+	C = batch(tmp_path)
+	assert C.species() == [ 'N2 (28_F)' ]
+	assert C.samples() == [ 'S200' ]
+	
+	S_val,S_err,S_time = C.sensitivities()
+	assert S_val.shape == (2,1)
+	assert numpy.allclose( numpy.sort(S_val[:,0]) , [0.2,0.4] )
+	assert numpy.allclose( numpy.sort(S_time[:,0]) , [103,303] )
+	i = numpy.argmin(S_time[:,0])
+	assert numpy.isclose( S_err[i,0] , numpy.std([100,101,102],ddof=1) / numpy.sqrt(2) / 500 ) # blank error is zero
+	
+	P_val,P_err,P_time = C.partial_pressures()
+	assert P_val.shape == (1,1)
+	assert numpy.isclose( P_val[0,0] , 50 / 0.3 ) # sensitivity interpolated to the SAMPLE time
+	assert numpy.isclose( P_time[0,0] , 203 )
+	assert numpy.isfinite( P_err[0,0] )
+
+
+def test_write_csv(tmp_path):
+	C = batch(tmp_path)
+	fn = str( tmp_path / 'results' )
+	C.write_csv(fn)
+	lines = open(fn+'.csv').read().split('\n')
+	assert len(lines) == 2
+	header = lines[0].split(';')
+	assert header[0] == 'SAMPLE'
+	assert header[1:4] == [ 'N2 (28_F) TIME (EPOCH)' , 'N2 (28_F) PARTIALPRESSURE (hPa)' , 'N2 (28_F) PARTIALPRESSURE ERR (hPa)' ]
+	assert header[4:7] == [ 'PRESSURESENSOR_WIKA[P] TIME (EPOCH)' , 'PRESSURESENSOR_WIKA[P] (hPa)' , 'PRESSURESENSOR_WIKA[P] ERR (hPa)' ]
+	row = lines[1].split(';')
+	assert row[0] == 'S200'
+	assert float(row[1]) == 203
+	assert numpy.isclose( float(row[2]) , 50 / 0.3 , rtol=1E-5 )
+	assert row[4:7] == [ '207.00' , '990' , 'NA' ] # one pressure reading, no error
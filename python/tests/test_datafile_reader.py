@@ -0,0 +1,166 @@
+# Tests for the datafile_reader class (data files written with the datafile class and read back)
+# 
+# DISCLAIMER:
+# This file is part of ruediPy, a toolbox for operation of RUEDI mass spectrometer systems.
+# 
+# ruediPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# ruediPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with ruediPy.  If not, see <http://www.gnu.org/licenses/>.
+# 
+# ruediPy: toolbox for operation of RUEDI mass spectrometer systems
+# Copyright (C) 2016  Matthias Brennwald
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2016, 2017, Matthias Brennwald (brennmat@gmail.com)
+
+
+import os
+import numpy
+
+from classes.datafile import datafile
+from classes.datafile_reader import datafile_reader
+
+
+SRC = 'RGA_SRS[MS]'
+
+
+def write_file(pth,n=5,t0=1500000000.0,**kw):
+	# write a data file with n PEAK / ZERO cycles and some sensor data, return the file name:
+	f = datafile( str(pth) , **kw )
+	f.next( typ = 'SAMPLE' , samplename = 'TEST' )
+	for i in range(n):
+		t = t0 + 10*i
+		f.write_peak( 'RGA_SRS' , 'MS' , 28 , 1E-9*(i+1) , 'A' , 'F' , 0.5 , t )
+		f.write_peak( 'RGA_SRS' , 'MS' , 40 , 2E-11*(i+1) , 'A' , 'M' , 2.4 , t+1 )
+		f.write_zero( 'RGA_SRS' , 'MS' , 28 , -1 , 1E-13 , 'A' , 'F' , 0.5 , t+2 )
+		f.write_pressure( 'PRESSURESENSOR_WIKA' , 'P' , 1000.0+i , 'hPa' , t+3 )
+		f.write_temperature( 'TEMPERATURESENSOR_MAXIM' , 'T' , 20.5 , 'deg.C' , t+4 )
+	f.write_valve_pos( 'SELECTORVALVE_VICI' , 'VALVE' , 3 , t0+100 )
+	f.write_scan( 'RGA_SRS' , 'MS' , numpy.array([27.9,28.0,28.1]) , numpy.array([1E-10,5E-10,2E-10]) , 'A' , 'F' , 0.1 , t0+200 )
+	f.close()
+	return f.name()
+
+
+def test_round_trip(tmp_path):
+	fn = write_file(tmp_path)
+	R = datafile_reader( fn , processes = 1 )
+	assert R.files() == [fn]
+	assert ( SRC , 'PEAK' ) in R.keys()
+	
+	P = R.table(SRC,'PEAK')
+	assert len(P) == 10
+	assert numpy.all( numpy.diff(P['t']) > 0 ) # order of the file
+	k = P['mz'] == 28
+	assert numpy.allclose( P['intensity'][k] , 1E-9*numpy.arange(1,6) )
+	assert set(P['det'][k]) == {'F'}
+	assert set(P['det'][~k]) == {'M'}
+	assert numpy.allclose( P['gate'][~k] , 2.4 )
+	assert set(P['unit']) == {'A'}
+	assert numpy.all( P['file'] == 0 )
+	
+	Z = R.table(SRC,'ZERO')
+	assert len(Z) == 5
+	assert numpy.all( Z['mz_offset'] == -1 )
+	assert numpy.allclose( Z['intensity'] , 1E-13 )
+	
+	X = R.table('PRESSURESENSOR_WIKA[P]','PRESSURE')
+	assert numpy.allclose( X['value'] , 1000+numpy.arange(5) )
+	assert set(X['unit']) == {'hPa'}
+	assert numpy.allclose( R.table('TEMPERATURESENSOR_MAXIM[T]','TEMPERATURE')['value'] , 20.5 )
+	assert R.table('SELECTORVALVE_VICI[VALVE]','POSITION')['position'][0] == 3
+	
+	mz,y = R.scan(SRC,0)
+	assert numpy.allclose( mz , [27.9,28.0,28.1] )
+	assert numpy.allclose( y , [1E-10,5E-10,2E-10] )
+
+
+def test_missing_table_is_empty_with_file_column(tmp_path):
+	R = datafile_reader( write_file(tmp_path) , processes = 1 )
+	X = R.table(SRC,'NOSUCHTYPE')
+	assert len(X) == 0
+	assert 'file' in X.dtype.names
+
+
+def test_select_matches_full_read(tmp_path):
+	fn = write_file(tmp_path)
+	A = datafile_reader( fn , processes = 1 )
+	B = datafile_reader( fn , processes = 1 , select = [ (SRC,'PEAK') , (None,'PRESSURE') ] )
+	assert sorted(B.keys()) == [ ('PRESSURESENSOR_WIKA[P]','PRESSURE') , (SRC,'PEAK') ]
+	assert numpy.array_equal( A.table(SRC,'PEAK') , B.table(SRC,'PEAK') )
+	assert numpy.array_equal( A.table('PRESSURESENSOR_WIKA[P]','PRESSURE') , B.table('PRESSURESENSOR_WIKA[P]','PRESSURE') )
+
+
+def test_overlapping_select_returns_lines_once(tmp_path):
+	fn = write_file(tmp_path)
+	lines = datafile_reader._select_lines( fn , [ (SRC,'PEAK') , (None,'PEAK') ] )
+	assert len(lines) == 10
+	assert len(set(lines)) == 10
+
+
+def test_index_path(tmp_path):
+	fn = write_file( tmp_path , index = True )
+	assert os.path.isfile(fn+'.idx')
+	idx = datafile.read_index(fn)
+	assert len( idx['records'][SRC+' PEAK']['offset'] ) == 10
+	
+	select = [ (SRC,'PEAK') , (None,'ZERO') , (SRC,'ZERO') ]
+	with_index = datafile_reader._select_lines(fn,select)
+	os.remove(fn+'.idx')
+	without_index = datafile_reader._select_lines(fn,select)
+	assert with_index == without_index
+	assert len(with_index) == 15
+	
+	A = datafile_reader( fn , processes = 1 )
+	assert len( A.table(SRC,'PEAK') ) == 10
+
+
+def test_stale_index_is_ignored(tmp_path):
+	fn = write_file( tmp_path , index = True )
+	t = os.path.getmtime(fn)
+	os.utime( fn+'.idx' , (t-100,t-100) ) # index older than data file
+	with open(fn+'.idx','w') as f: # broken index, must not be used
+		f.write('{"format": "ruediPy-index", "version": 1, "records": {}}')
+	os.utime( fn+'.idx' , (t-100,t-100) )
+	assert len( datafile_reader._select_lines( fn , [ (SRC,'PEAK') ] ) ) == 10
+
+
+def test_compressed_round_trip(tmp_path):
+	fn = write_file( tmp_path , compression = 'gzip' )
+	assert fn.endswith('.gz')
+	R = datafile_reader( fn , processes = 1 , select = [ (SRC,'PEAK') ] )
+	assert len( R.table(SRC,'PEAK') ) == 10
+
+
+def test_several_files(tmp_path):
+	names = []
+	for i in range(3):
+		d = tmp_path / str(i)
+		d.mkdir()
+		names.append( write_file( d , n = i+1 , t0 = 1500000000.0 + 1000*i ) )
+	for processes in (1,2):
+		R = datafile_reader( names , processes = processes )
+		P = R.table(SRC,'PEAK')
+		assert len(P) == 2*(1+2+3)
+		assert list( numpy.bincount(P['file']) ) == [2,4,6]
+		assert R.files() == names
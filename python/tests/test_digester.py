@@ -0,0 +1,148 @@
+# Tests for the digester class
+# 
+# DISCLAIMER:
+# This file is part of ruediPy, a toolbox for operation of RUEDI mass spectrometer systems.
+# 
+# ruediPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# ruediPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with ruediPy.  If not, see <http://www.gnu.org/licenses/>.
+# 
+# ruediPy: toolbox for operation of RUEDI mass spectrometer systems
+# Copyright (C) 2016  Matthias Brennwald
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2016, 2017, Matthias Brennwald (brennmat@gmail.com)
+
+
+import numpy
+
+from classes.digester import digester
+
+
+def test_welford_matches_numpy():
+	x = numpy.random.default_rng(1).normal( 1E-9 , 3E-12 , 1000 )
+	w = [0,0.0,0.0]
+	for v in x:
+		digester._welford(w,v)
+	assert w[0] == 1000
+	assert numpy.isclose( digester._mean(w) , x.mean() , rtol=1E-12 )
+	assert numpy.isclose( digester._std(w) , x.std(ddof=1) , rtol=1E-9 )
+
+
+def test_welford_few_values():
+	w = [0,0.0,0.0]
+	assert numpy.isnan( digester._mean(w) )
+	assert numpy.isnan( digester._std(w) )
+	digester._welford(w,5.0)
+	assert digester._mean(w) == 5.0
+	assert numpy.isnan( digester._std(w) )
+
+
+def test_zero_interpolation():
+	D = digester()
+	D.write_zero( 'RGA_SRS' , 'MS' , 28 , -1 , 1.0 , 'A' , 'F' , 0.5 , 0.0 )
+	D.write_peak( 'RGA_SRS' , 'MS' , 28 , 12.0 , 'A' , 'F' , 0.5 , 5.0 ) # ZERO interpolated to 2.0, net = 10
+	D.write_peak( 'RGA_SRS' , 'MS' , 28 , 14.5 , 'A' , 'F' , 0.5 , 7.5 ) # ZERO interpolated to 2.5, net = 12
+	D.write_zero( 'RGA_SRS' , 'MS' , 28 , -1 , 3.0 , 'A' , 'F' , 0.5 , 10.0 )
+	R = D.result()
+	assert len(R) == 1
+	r = R[0]
+	assert r['source'] == 'RGA_SRS[MS]'
+	assert r['mz'] == 28 and r['det'] == 'F' and r['unit'] == 'A'
+	assert r['N'] == 2
+	assert numpy.isclose( r['mean'] , 11.0 )
+	net = numpy.array([10.0,12.0])
+	assert numpy.isclose( r['mean_err'] , net.std(ddof=1) / numpy.sqrt(1) ) # std / sqrt(N-1)
+	assert numpy.isclose( r['time'] , 6.25 )
+	assert numpy.isclose( r['peak_mean'] , 13.25 )
+	assert numpy.isclose( r['zero_mean'] , 2.0 )
+
+
+def test_peaks_outside_zero_range_use_nearest_zero():
+	D = digester()
+	D.write_peak( 'RGA_SRS' , 'MS' , 40 , 11.0 , 'A' , 'M' , 2.4 , 0.0 ) # before first ZERO: use first ZERO (1.0)
+	D.write_zero( 'RGA_SRS' , 'MS' , 40 , 1 , 1.0 , 'A' , 'M' , 2.4 , 1.0 )
+	D.write_zero( 'RGA_SRS' , 'MS' , 40 , 1 , 3.0 , 'A' , 'M' , 2.4 , 2.0 )
+	D.write_peak( 'RGA_SRS' , 'MS' , 40 , 13.0 , 'A' , 'M' , 2.4 , 3.0 ) # after last ZERO: use last ZERO (3.0)
+	r = D.result()[0]
+	assert r['N'] == 2
+	assert numpy.isclose( r['mean'] , 10.0 )
+	assert numpy.isclose( r['mean_err'] , 0.0 )
+
+
+def test_no_zeros_uses_raw_peaks():
+	D = digester()
+	for i,v in enumerate([1.0,2.0,3.0]):
+		D.write_peak( 'RGA_SRS' , 'MS' , 4 , v , 'A' , 'F' , 0.5 , i )
+	r = D.result()[0]
+	assert numpy.isclose( r['mean'] , 2.0 )
+	assert numpy.isnan( r['zero_mean'] )
+
+
+def test_separate_entries_per_mz_and_detector():
+	D = digester()
+	D.write_peak( 'RGA_SRS' , 'MS' , 28 , 1.0 , 'A' , 'F' , 0.5 , 0 )
+	D.write_peak( 'RGA_SRS' , 'MS' , 28 , 1.0 , 'A' , 'M' , 0.5 , 1 )
+	D.write_peak( 'RGA_SRS' , 'MS' , 40 , 1.0 , 'A' , 'F' , 0.5 , 2 )
+	D.write_zero( 'RGA_SRS' , 'MS' , 44 , -1 , 1.0 , 'A' , 'F' , 0.5 , 3 ) # ZERO without PEAK: no result
+	R = D.result()
+	assert sorted( zip( R['mz'] , R['det'] ) ) == [ (28,'F') , (28,'M') , (40,'F') ]
+	D.clear()
+	assert len(D.result()) == 0
+
+
+def test_add_tables_matches_streaming():
+	rng = numpy.random.default_rng(2)
+	n = 20
+	peaks = numpy.zeros( n , dtype = [ ('t','f8') , ('mz','f8') , ('intensity','f8') , ('unit','U1') , ('det','U1') , ('gate','f8') ] )
+	zeros = numpy.zeros( n , dtype = [ ('t','f8') , ('mz','f8') , ('mz_offset','f8') , ('intensity','f8') , ('unit','U1') , ('det','U1') , ('gate','f8') ] )
+	peaks['t'] = 10*numpy.arange(n)
+	zeros['t'] = 10*numpy.arange(n) + 5
+	peaks['mz'] = zeros['mz'] = 28
+	zeros['mz_offset'] = -1
+	peaks['intensity'] = rng.normal(1E-9,1E-12,n)
+	zeros['intensity'] = rng.normal(1E-13,1E-15,n)
+	peaks['unit'] = zeros['unit'] = 'A'
+	peaks['det'] = zeros['det'] = 'F'
+	peaks['gate'] = zeros['gate'] = 0.5
+	
+	A = digester()
+	A.add_tables( 'RGA_SRS[MS]' , peaks , zeros[::-1] ) # order of the tables does not matter
+	
+	B = digester()
+	for i in range(n):
+		B.write_peak( 'RGA_SRS' , 'MS' , 28 , peaks['intensity'][i] , 'A' , 'F' , 0.5 , peaks['t'][i] )
+		B.write_zero( 'RGA_SRS' , 'MS' , 28 , -1 , zeros['intensity'][i] , 'A' , 'F' , 0.5 , zeros['t'][i] )
+	
+	a = A.result()[0]
+	b = B.result()[0]
+	assert a['source'] == b['source'] == 'RGA_SRS[MS]'
+	for field in ('mean','mean_err','N','time','peak_mean','zero_mean'):
+		assert numpy.isclose( a[field] , b[field] , rtol=1E-12 )
+
+
+def test_source():
+	assert digester._source('RGA_SRS','MS') == 'RGA_SRS[MS]'
+	assert digester._source('RGA_SRS','') == 'RGA_SRS'
+	assert digester._source('RGA_SRS','RGA_SRS') == 'RGA_SRS'
@@ -0,0 +1,145 @@
+# Tests for the ringbuffer class
+# 
+# DISCLAIMER:
+# This file is part of ruediPy, a toolbox for operation of RUEDI mass spectrometer systems.
+# 
+# ruediPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# ruediPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with ruediPy.  If not, see <http://www.gnu.org/licenses/>.
+# 
+# ruediPy: toolbox for operation of RUEDI mass spectrometer systems
+# Copyright (C) 2016  Matthias Brennwald
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2016, 2017, Matthias Brennwald (brennmat@gmail.com)
+
+
+import numpy
+
+from classes.ringbuffer import ringbuffer
+
+
+FIELDS = [ ('t','f8') , ('val','f8') , ('unit','U4') ]
+
+
+def filled(max_len,n):
+	B = ringbuffer( max_len , FIELDS )
+	for i in range(n):
+		B.add( ( i , 10.0*i , 'A' ) )
+	return B
+
+
+def test_empty():
+	B = ringbuffer( 5 , FIELDS )
+	assert B.length() == 0
+	assert B.max_length() == 5
+	assert len(B.data()) == 0
+	assert len(B.last(3)) == 0
+	assert len(B.window('t',None,None)) == 0
+	assert len(B.decimated(10)) == 0
+
+
+def test_add_below_capacity():
+	B = filled(5,3)
+	assert B.length() == 3
+	assert list(B.data()['t']) == [0,1,2]
+	assert list(B.data()['unit']) == ['A','A','A']
+
+
+def test_wraparound_keeps_newest_in_order():
+	B = filled(5,12)
+	assert B.length() == 5
+	assert list(B.data()['t']) == [7,8,9,10,11]
+	assert list(B.data()['val']) == [70,80,90,100,110]
+	assert list(B.last(2)['t']) == [10,11]
+	assert list(B.last(10)['t']) == [7,8,9,10,11]
+	assert len(B.last(0)) == 0
+
+
+def test_wraparound_at_every_start_index():
+	for n in range(1,15):
+		B = filled(4,n)
+		assert list(B.data()['t']) == list(range(max(0,n-4),n))
+
+
+def test_zero_length_buffer_ignores_entries():
+	B = filled(0,3)
+	assert B.length() == 0
+	assert len(B.data()) == 0
+
+
+def test_window():
+	B = filled(10,15) # t = 5 ... 14
+	assert list(B.window('t',7,9)['t']) == [7,8,9]
+	assert list(B.window('t',7.5,9.5)['t']) == [8,9]
+	assert list(B.window('t',None,6)['t']) == [5,6]
+	assert list(B.window('t',13,None)['t']) == [13,14]
+	assert list(B.window('t',None,None)['t']) == list(range(5,15))
+	assert len(B.window('t',20,30)) == 0
+	assert len(B.window('t',9,7)) == 0 # empty range
+
+
+def test_decimated():
+	B = filled(100,100)
+	x = B.decimated(10)
+	assert len(x) <= 10
+	assert x['t'][-1] == 99 # newest entry is always included
+	assert numpy.all( numpy.diff(x['t']) == numpy.diff(x['t'])[0] ) # regular intervals
+	assert len(B.decimated(1000)) == 100
+	assert list(B.decimated(1)['t']) == [99]
+
+
+def test_decimated_after_wraparound():
+	B = filled(7,30) # t = 23 ... 29
+	x = B.decimated(3)
+	assert list(x['t']) == [23,26,29]
+
+
+def test_data_is_a_view():
+	B = filled(3,3)
+	x = B.data()
+	y = x.copy()
+	B.add( ( 99 , 0 , 'A' ) )
+	assert list(y['t']) == [0,1,2]
+	assert list(B.data()['t']) == [1,2,99]
+
+
+def test_clear():
+	B = filled(5,8)
+	B.clear()
+	assert B.length() == 0
+	B.add( ( 1 , 2 , 'A' ) )
+	assert list(B.data()['t']) == [1]
+
+
+def test_set_length():
+	B = filled(5,8) # t = 3 ... 7
+	B.set_length(3)
+	assert B.max_length() == 3
+	assert list(B.data()['t']) == [5,6,7]
+	B.set_length(6)
+	assert list(B.data()['t']) == [5,6,7]
+	for i in range(8,12):
+		B.add( ( i , 0 , 'A' ) )
+	assert list(B.data()['t']) == [6,7,8,9,10,11]
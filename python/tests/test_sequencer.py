@@ -0,0 +1,128 @@
+# Tests for the sequencer class (command schedule, and run with stand-ins for the instruments)
+# 
+# DISCLAIMER:
+# This file is part of ruediPy, a toolbox for operation of RUEDI mass spectrometer systems.
+# 
+# ruediPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# ruediPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with ruediPy.  If not, see <http://www.gnu.org/licenses/>.
+# 
+# ruediPy: toolbox for operation of RUEDI mass spectrometer systems
+# Copyright (C) 2016  Matthias Brennwald
+# 
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Copyright 2016, 2017, Matthias Brennwald (brennmat@gmail.com)
+
+
+import pytest
+
+from classes.sequencer import sequencer
+from classes.misc import misc
+
+
+PEAKS = [ (28,-1,'F',0.5) , (40,-1,'F',0.5) , (84,-1,'M',2.4) , (4,1,'M',0.5) ]
+
+
+def commands(S,name):
+	return [ c for c in S if c[0] == name ]
+
+
+def test_groups_by_detector_and_gate():
+	S = sequencer._make_schedule( [ { 'peaks': PEAKS , 'cycles': 3 , 'conditioning': 1 } ] )
+	P = commands(S,'PEAKZERO')
+	assert [ (c[2],c[3]) for c in P ] == [ ('F',0.5) , ('M',2.4) , ('M',0.5) ]
+	assert P[0][1] == [ (28,-1) , (40,-1) ] # mz order of the plan
+	assert all( c[4] == 3 and c[5] == 1 for c in P )
+
+
+def test_step_order_of_commands():
+	plan = [ { 'type': 'STANDARD' , 'standardconc': [ ('N2',0.781,28) ] , 'valve': 1 , 'wait': 300 , 'peaks': PEAKS } ]
+	S = sequencer._make_schedule(plan)
+	assert [ c[0] for c in S[:5] ] == [ 'STEP' , 'NEXT' , 'VALVE' , 'DETECTOR' , 'WAIT' ] # detector switched on before waiting
+	assert S[1] == ( 'NEXT' , 'STANDARD' , '' , [ ('N2',0.781,28) ] )
+
+
+def test_next_step_starts_with_current_detector_and_gate():
+	plan = [ { 'peaks': PEAKS } , { 'peaks': PEAKS } ]
+	S = sequencer._make_schedule(plan)
+	P = commands(S,'PEAKZERO')
+	assert [ (c[2],c[3]) for c in P[3:] ] == [ ('M',0.5) , ('M',2.4) , ('F',0.5) ] # step 2 continues with M / 0.5 s
+	assert commands(S,'STEP') == [ ('STEP',1) , ('STEP',2) ]
+	assert [ c[1] for c in commands(S,'DETECTOR') ] == [ 'F' , 'M' , 'F' ]
+
+
+def test_switches():
+	one = sequencer( [ { 'peaks': PEAKS } ] , ms = None )
+	assert one.switches() == (1,2)
+	two = sequencer( [ { 'peaks': PEAKS } , { 'peaks': PEAKS } ] , ms = None )
+	assert two.switches() == (2,4) # instead of (3,5) without reordering
+
+
+def test_invalid_plans():
+	with pytest.raises(ValueError):
+		sequencer( [ { 'valve': 1 } ] , ms = None )
+	with pytest.raises(ValueError):
+		sequencer( [ { 'valve': 1 , 'peaks': PEAKS } ] , ms = None ) # no valve object
+	with pytest.raises(ValueError):
+		sequencer( [ { 'peaks': [ (28,'F',0.5) ] } ] , ms = None )
+
+
+class fake_ms:
+	def __init__(self):
+		self.log = []
+		self.det = None
+		self.n_det = 0
+	def get_detector_switch_count(self):
+		return self.n_det
+	def get_noise_floor_count(self):
+		return 0
+	def get_sensor_sampler(self):
+		return None
+	def set_detector(self,det):
+		self.log.append( ('DETECTOR',det) )
+		if not det == self.det:
+			self.n_det = self.n_det + 1
+			self.det = det
+	def peak_zero_loop(self,mz,det,gate,ND,NC,f):
+		self.log.append( ('PEAKZERO',det,gate) )
+
+
+class fake_valve:
+	def __init__(self,ms):
+		self.ms = ms
+	def setpos(self,pos,f):
+		self.ms.log.append( ('VALVE',pos) )
+
+
+def test_run(monkeypatch):
+	waits = []
+	monkeypatch.setattr( misc , 'sleep' , staticmethod( lambda dt,msg='': waits.append(dt) ) )
+	ms = fake_ms()
+	plan = [ { 'valve': 1 , 'wait': 100 , 'peaks': PEAKS } , { 'wait': 50 , 'peaks': PEAKS } ]
+	sequencer( plan , ms , valve = fake_valve(ms) ).run()
+	assert ms.log[0:2] == [ ('VALVE',1) , ('DETECTOR','F') ]
+	assert [ u for u in ms.log if u[0] == 'PEAKZERO' ] == [ ('PEAKZERO','F',0.5) , ('PEAKZERO','M',2.4) , ('PEAKZERO','M',0.5) , ('PEAKZERO','M',0.5) , ('PEAKZERO','M',2.4) , ('PEAKZERO','F',0.5) ]
+	assert len(waits) == 2
+	assert 99 < waits[0] <= 100
+	assert 49 < waits[1] <= 50 # step without valve switch: wait counted from the start of the step